@@ -0,0 +1,77 @@
+'''
+Benchmark the cold import time of utilities.py. Each scenario runs in a fresh interpreter so nothing is cached in sys.modules.
+Headless scenarios, which need neither plotting nor scipy, must import within HEADLESS_BUDGET_MS of numpy and pandas alone, or the
+script exits with status 1.
+
+Usage (from the src directory):
+    python benchmarks/import_time.py [--repeats 7]
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the import every scenario pays for, which the budgets are measured from
+BASELINE = 'import numpy, pandas'
+
+# milliseconds a headless scenario may take beyond BASELINE
+HEADLESS_BUDGET_MS = 100
+
+# scenario: (statement, whether it is headless)
+SCENARIOS = {
+    'import utilities': ('import utilities', True),
+    'headless LEM script': ('from utilities import load_dataset, run_lem', True),
+    'headless periodicity': ('from utilities import run_periodicity, run_dlxjtk', True),
+    'network analysis': ('from utilities import lem_signed_adjacency, find_feedback_loops', False),
+    'plotting': ('from utilities import plot_heatmap', False),
+    'everything (old eager import)': ('import bioclocks\nfor name in bioclocks.__all__: getattr(bioclocks, name)', False),
+}
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{statement}
+print((time.perf_counter() - start) * 1000)
+'''
+
+
+def time_statement(statement, repeats):
+    '''Milliseconds taken by statement in each of repeats fresh interpreters.'''
+
+    timings = list()
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', TIMER.format(statement=statement)], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=7, help='fresh interpreters per scenario')
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_statement(BASELINE, args.repeats))
+    print(f'{"scenario":<32}{"median ms":>12}{"min ms":>12}')
+    print(f'{"numpy and pandas (baseline)":<32}{baseline:>12.1f}')
+    over_budget = list()
+    for scenario, (statement, headless) in SCENARIOS.items():
+        timings = time_statement(statement, args.repeats)
+        print(f'{scenario:<32}{statistics.median(timings):>12.1f}{min(timings):>12.1f}')
+        if headless and statistics.median(timings) > baseline + HEADLESS_BUDGET_MS:
+            over_budget.append(scenario)
+
+    if over_budget:
+        print(f'-- Over the headless budget of {HEADLESS_BUDGET_MS} ms beyond numpy and pandas: {", ".join(over_budget)}')
+        return 1
+    print(f'-- Every headless scenario is within {HEADLESS_BUDGET_MS} ms of numpy and pandas')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+'''
+Compare the 'fast' (Press-Rybicki) and 'exact' Lomb-Scargle periodograms on every bundled dataset: run time, the largest difference
+in normalized power, and the fraction of genes whose peak period agrees to within one frequency step. Periods are scanned from 2.5
+times the median sampling interval, just above the Nyquist period where the periodogram of evenly sampled data is 0/0, up to the
+length of each time series. Exits with status 1 if the largest difference exceeds FAST_TOLERANCE, checked by default at the
+4 test frequencies per time point of run_ls.
+
+Usage (from the src directory):
+    python benchmarks/lomb_scargle.py [--test-freq 4] [--filter Scerevisiae]
+'''
+
+import argparse
+import os
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+import pandas as pd
+
+from bioclocks import io as dataset_io
+from bioclocks.lombscargle import FAST_TOLERANCE, test_frequencies, lomb_scargle_periodogram
+
+dataset_io.DATADIR = os.path.join(os.path.dirname(SRC_DIR), 'datasets')
+
+
+def compare(dataset_df, test_freq):
+    '''Time both methods on one dataset and measure how far apart their periodograms are.'''
+
+    time_points = pd.to_numeric(dataset_df.columns).to_numpy(dtype=float)
+    values = dataset_df.dropna().to_numpy(dtype=float)
+    values = values[values.var(axis=1) > 0]
+    sorted_time_points = np.sort(time_points)
+    min_period = 2.5 * np.median(np.diff(sorted_time_points))
+    max_period = sorted_time_points[-1] - sorted_time_points[0]
+    frequencies = test_frequencies(min_period, max_period, test_freq, len(time_points))
+
+    timings = dict()
+    power = dict()
+    for method in ('exact', 'fast'):
+        start = time.perf_counter()
+        power[method] = lomb_scargle_periodogram(time_points, values, frequencies, method=method)
+        timings[method] = time.perf_counter() - start
+
+    peak_steps = np.abs(power['exact'].argmax(axis=1) - power['fast'].argmax(axis=1))
+
+    return {'genes': len(values), 'time points': len(time_points), 'exact s': timings['exact'], 'fast s': timings['fast'],
+            'max power difference': np.abs(power['fast'] - power['exact']).max(), 'peaks agree': (peak_steps <= 1).mean()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--test-freq', type=float, default=4, help='number of test frequencies per time point. Default: 4, as run_ls')
+    parser.add_argument('--filter', default=None, help='only datasets whose name contains this string')
+    args = parser.parse_args()
+
+    datasets = sorted(file[:-len('.tsv')] for file in os.listdir(dataset_io.DATADIR) if file.endswith('.tsv'))
+    results = dict()
+    for dataset_name in datasets:
+        if args.filter is not None and args.filter not in dataset_name:
+            continue
+        results[dataset_name] = compare(dataset_io.load_dataset(dataset_name), args.test_freq)
+
+    results_df = pd.DataFrame(results).T
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results_df)
+    print(f'-- Largest power difference {results_df["max power difference"].max():.2e} (documented tolerance {FAST_TOLERANCE:.0e})')
+
+    return 0 if results_df['max power difference'].max() < FAST_TOLERANCE else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
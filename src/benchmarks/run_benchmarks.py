@@ -0,0 +1,264 @@
+'''
+Offline benchmark suite for the hot paths of the bioclocks package (utilities.py). Each benchmark is run on a bundled fixture from
+datasets/ or ODE_model_LEM/ and on a synthetic, scaled-up input. Wall time and peak traced memory are recorded, each run is appended
+to a JSON-lines history, and results more than --threshold slower or larger than the last run of an earlier commit on the same machine
+are flagged as regressions (exit code 1).
+
+Usage (from the src directory):
+    python benchmarks/run_benchmarks.py [--repeats 5] [--filter qn_normalize] [--threshold 0.2] [--no-save]
+
+Load the history with:
+    pd.read_json('benchmarks/history.jsonl', lines=True)
+'''
+
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+import numpy as np
+import pandas as pd
+
+import bioclocks
+from bioclocks import io as dataset_io
+
+HISTORY_PATH = os.path.join(SRC_DIR, 'benchmarks', 'history.jsonl')
+BUNDLED_DATASET = 'Athaliana_LL'
+LEM_FIXTURE = os.path.join(ROOT_DIR, 'ODE_model_LEM', 'Okimflemingiae_DD_RPKM_20')
+
+# ignore differences below these when flagging regressions, they are noise
+MIN_TIME_DIFFERENCE = 0.002
+MIN_MEMORY_DIFFERENCE = 1.0
+
+
+############ Synthetic inputs ############
+
+def synthetic_lem_results(results_dir, nr_targets, nr_regulators, seed=0):
+    '''Write a LEMpy results directory with one target file per target, scoring an activation and a repression model per regulator.'''
+
+    rng = np.random.default_rng(seed)
+    targets_dir = os.path.join(results_dir, 'targets', 'ts0')
+    os.makedirs(targets_dir, exist_ok=True)
+    regulators = [f'gene{i}' for i in range(nr_regulators)]
+    models = [f'tf_{mode}({regulator})' for regulator in regulators for mode in ('act', 'rep')] + ['null_model']
+    for target_nr in range(nr_targets):
+        target_df = pd.DataFrame({'loss': rng.uniform(100, 500, len(models)), 'pld': rng.dirichlet(np.ones(len(models)))},
+                                 index=pd.Index(models, name='model'))
+        with open(os.path.join(targets_dir, f'target_gene{target_nr}_ts0.tsv'), 'w') as target_file:
+            target_file.write(f'# LEMpy target file for gene{target_nr}, replicate 0 \n \n')
+            target_df.to_csv(target_file, sep='\t')
+
+    return results_dir
+
+
+def synthetic_periodicity_results(genes, seed=0):
+    '''pyJTK and pyDL style results with random p-values.'''
+
+    rng = np.random.default_rng(seed)
+    jtk_df = pd.DataFrame({'p-value': rng.uniform(size=len(genes))}, index=genes)
+    dl_df = pd.DataFrame({'p_reg': rng.uniform(size=len(genes)), 'p_reg_norm': rng.uniform(size=len(genes))}, index=genes)
+
+    return jtk_df, dl_df
+
+
+def lem_edge_list(lem_results):
+    '''LEM edge strings ('target=tf_act(regulator)') of an aggregated LEM results dataframe.'''
+
+    return (lem_results['target'] + '=' + lem_results['model']).tolist()
+
+
+############ Benchmarks ############
+
+def build_benchmarks(sandbox):
+    '''
+    Set up every benchmark case. Returns a list of (benchmark, case, function) tuples, where function runs the timed code once.
+    Setup work (loading fixtures, generating synthetic inputs) happens here and is not timed.
+    '''
+
+    # relative paths used by the package ('../results', '../tmp') resolve inside the sandbox
+    shutil.copy(os.path.join(ROOT_DIR, 'datasets', BUNDLED_DATASET + '.tsv'), os.path.join(sandbox, 'datasets'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        bioclocks.generate_synthetic_dataset('synthetic_50k', 50000, np.arange(48) * 4, seed=1)
+    large_df = bioclocks.load_dataset('synthetic_50k')
+    bundled_df = bioclocks.load_dataset(BUNDLED_DATASET)
+
+    benchmarks = list()
+    for case, dataset_name, dataset_df in [('bundled', BUNDLED_DATASET, bundled_df), ('synthetic 50k x 48', 'synthetic_50k', large_df)]:
+        time_points = pd.to_numeric(dataset_df.columns).to_numpy()
+        midpoints = [str(tp) for tp in (time_points[:-1] + time_points[1:]) / 2]
+        benchmarks += [
+            ('load_dataset', case, lambda dataset_name=dataset_name: bioclocks.load_dataset(dataset_name)),
+            ('normalize_data', case, lambda dataset_df=dataset_df: bioclocks.normalize_data(dataset_df)),
+            ('qn_normalize', case, lambda dataset_df=dataset_df: bioclocks.qn_normalize(dataset_df)),
+            ('interpolate_timepoints', case, lambda dataset_df=dataset_df, midpoints=midpoints: bioclocks.interpolate_timepoints(dataset_df, midpoints)),
+        ]
+
+    bundled_lem = glob.glob(os.path.join(LEM_FIXTURE, 'results_tfs', '*_lempy'))[0]
+    synthetic_lem = synthetic_lem_results(os.path.join(sandbox, 'results', 'synthetic_lempy'), 200, 200)
+    for case, lem_path in [('bundled', bundled_lem), ('synthetic 200 targets x 400 models', synthetic_lem)]:
+        lem_results = bioclocks.aggregate_lem_results(lem_path)
+        edges = lem_edge_list(lem_results)
+        benchmarks += [
+            ('aggregate_lem_results', case, lambda lem_path=lem_path: bioclocks.aggregate_lem_results(lem_path)),
+            ('filter_top_regulators_per_target', case, lambda lem_results=lem_results: bioclocks.filter_top_regulators_per_target(lem_results, 3)),
+            ('df_edges_to_ipycytoscape', case, lambda edges=edges: bioclocks.df_edges_to_ipycytoscape(edges)),
+        ]
+
+    for case, genes in [('bundled', bundled_df.index), ('synthetic 50k genes', large_df.index)]:
+        jtk_df, dl_df = synthetic_periodicity_results(genes)
+        # run_dlxjtk renames columns in place, so give it fresh copies
+        benchmarks.append(('run_dlxjtk', case, lambda jtk_df=jtk_df, dl_df=dl_df: bioclocks.run_dlxjtk(jtk_df.copy(), dl_df.copy(), 'benchmark')))
+
+    network = bioclocks.load_lem_ode_network(os.path.join(LEM_FIXTURE, 'targets_tfs'), os.path.join(LEM_FIXTURE, 'annot_tfs.tsv'))
+    nr_nodes = len(network['nodes'])
+    arguments = (nr_nodes, network['gamma'], network['beta'], network['alpha'], network['K'], network['n'], network['type_reg'], network['reg_nr'])
+    state = np.random.default_rng(0).uniform(0, 2, size=nr_nodes)
+    states = np.random.default_rng(1).uniform(0, 2, size=(4096, nr_nodes))
+
+    def single_states():
+        for _ in range(2000):
+            bioclocks.vectorfield(state, 0.0, *arguments)
+
+    benchmarks += [
+        ('vectorfield', 'bundled network, 2000 single states', single_states),
+        ('vectorfield', 'bundled network, batch of 4096 states', lambda: bioclocks.vectorfield(states, 0.0, *arguments)),
+    ]
+
+    return benchmarks
+
+
+def measure(function, repeats):
+    '''Run function once to warm up, then repeats times for timing and once more under tracemalloc for peak memory.'''
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+        timings = list()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'median_s': statistics.median(timings), 'min_s': min(timings), 'peak_mb': peak / 2**20}
+
+
+############ History ############
+
+def git_commit():
+    '''The current commit and whether the work tree has uncommitted changes.'''
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+
+    return commit, dirty
+
+
+def machine_id():
+    '''Identifies the machine, so results are only compared with results from the same machine.'''
+
+    return f'{platform.node()} {platform.machine()} {os.cpu_count()} cpus'
+
+
+def load_history(history_path=HISTORY_PATH):
+    '''Every recorded benchmark result as a list of dicts.'''
+
+    if not os.path.exists(history_path):
+        return list()
+    with open(history_path) as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def find_regressions(records, history, threshold):
+    '''
+    Compare each new record with the latest record of the same benchmark, case and machine from a different commit.
+    Returns the records that are more than threshold slower (min time) or larger (peak memory) than that baseline, with the baseline.
+    '''
+
+    regressions = list()
+    for record in records:
+        baselines = [old for old in history if (old['benchmark'], old['case'], old['machine']) == (record['benchmark'], record['case'], record['machine'])
+                     and old['commit'] != record['commit']]
+        if not baselines:
+            continue
+        baseline = max(baselines, key=lambda old: old['timestamp'])
+        slower = record['min_s'] > baseline['min_s'] * (1 + threshold) and record['min_s'] - baseline['min_s'] > MIN_TIME_DIFFERENCE
+        larger = record['peak_mb'] > baseline['peak_mb'] * (1 + threshold) and record['peak_mb'] - baseline['peak_mb'] > MIN_MEMORY_DIFFERENCE
+        if slower or larger:
+            regressions.append((record, baseline))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs per benchmark case')
+    parser.add_argument('--filter', default=None, help='only run benchmarks whose name contains this string')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown or memory growth flagged as a regression')
+    parser.add_argument('--history', default=HISTORY_PATH, help='JSON-lines file the results are appended to')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to the history')
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+    machine = machine_id()
+
+    records = list()
+    cwd = os.getcwd()
+    datadir = dataset_io.DATADIR
+    with tempfile.TemporaryDirectory() as sandbox:
+        for folder in ('work', 'datasets', 'results', 'tmp'):
+            os.makedirs(os.path.join(sandbox, folder))
+        os.chdir(os.path.join(sandbox, 'work'))
+        dataset_io.DATADIR = os.path.join(sandbox, 'datasets')
+        try:
+            benchmarks = build_benchmarks(sandbox)
+            print(f'{"benchmark":<34}{"case":<40}{"median s":>10}{"min s":>10}{"peak MB":>10}')
+            for benchmark, case, function in benchmarks:
+                if args.filter is not None and args.filter not in benchmark:
+                    continue
+                result = measure(function, args.repeats)
+                print(f'{benchmark:<34}{case:<40}{result["median_s"]:>10.4f}{result["min_s"]:>10.4f}{result["peak_mb"]:>10.1f}')
+                records.append({'timestamp': timestamp, 'commit': commit, 'dirty': dirty, 'machine': machine,
+                                'python': platform.python_version(), 'benchmark': benchmark, 'case': case, 'repeats': args.repeats,
+                                **result})
+        finally:
+            os.chdir(cwd)
+            dataset_io.DATADIR = datadir
+
+    regressions = find_regressions(records, load_history(args.history), args.threshold)
+    for record, baseline in regressions:
+        print(f'REGRESSION {record["benchmark"]} [{record["case"]}]: {baseline["min_s"]:.4f}s -> {record["min_s"]:.4f}s, '
+              f'{baseline["peak_mb"]:.1f}MB -> {record["peak_mb"]:.1f}MB (baseline {str(baseline["commit"])[:10]})')
+
+    if not args.no_save:
+        with open(args.history, 'a') as history_file:
+            history_file.writelines(json.dumps(record) + '\n' for record in records)
+        print(f'-- Results appended to {args.history}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
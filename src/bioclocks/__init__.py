@@ -0,0 +1,86 @@
+'''
+Functions for the Biological Clocks class, split into submodules that are only imported when one of their names is first used:
+
+io             loading datasets and saved results
+preprocessing  cleaning, normalizing and interpolating datasets
+periodicity    pyJTK, pyDL, Lomb-Scargle and DLxJTK
+dl             de Lichtenberg regulation and periodicity tests with fixed or adaptive Monte Carlo p-values
+jtk            JTK_CYCLE in Python with null distributions cached by sampling design
+lombscargle    exact and fast (Press-Rybicki) Lomb-Scargle periodograms in Python
+replicates     joint and per-replicate periodicity of replicate datasets
+distributed    JTK, DL and Lomb-Scargle split over MPI processes or nodes
+batch          periodicity runs over the whole dataset catalog on a pool of processes
+streaming      JTK and Lomb-Scargle updated as time points of a running experiment arrive
+fdr            permutation q-values for JTK, Lomb-Scargle and DLxJTK
+lem            running LEMpy and collecting its results
+ode            simulating and analysing LEM ODE networks
+network        building, drawing and analysing LEM networks
+tf_catalog     transcription factor families for LEM regulator lists
+synthetic      synthetic oscillatory datasets with a known ground truth
+tracing        per-stage timing and resource traces of the periodicity and LEM runs
+viz            heatmaps, line plots and histograms
+plasmodb       PlasmoDB gene records
+
+Every public name can be imported from the package directly, e.g. `from bioclocks import load_dataset, run_lem` only imports
+bioclocks.io and bioclocks.lem, so headless scripts do not pay for matplotlib, seaborn, ipycytoscape or requests.
+'''
+
+import importlib
+
+# the public names of each submodule. Keep in sync when adding functions to a submodule
+SUBMODULE_EXPORTS = {
+    'io': ['DATADIR', 'view_data_toc', 'load_dataset', 'load_results'],
+    'preprocessing': ['convert_periods_to_str', 'duplicate_check', 'remove_duplicates', 'relabel_duplicates', 'intersection', 'uniques',
+                      'closest_column', 'get_closest_column_from_period', 'normalize_data', 'INTERPOLATION_METHODS', 'time_point_labels',
+                      'interpolation_basis', 'resample_timepoints', 'interpolate_timepoints', 'qn_normalize', 'PREPROCESSING_STEPS',
+                      'preprocessing_spec', 'preprocess', 'clear_preprocessing_cache', 'TRIAGE_RULES', 'triage_genes'],
+    'periodicity': ['get_genelist_from_top_n_genes', 'get_genelist_from_threshold', 'run_pyjtk', 'run_pydl', 'run_ls', 'run_periodicity',
+                    'dlxjtk_func', 'run_dlxjtk'],
+    'dl': ['DL_FIRST_BATCH', 'DL_MAX_BATCH', 'DL_MIN_EXCEED', 'dl_null_values', 'de_lichtenberg'],
+    'jtk': ['JTK_CACHE_DIR', 'jtk_null_distribution', 'jtk_design_key', 'load_jtk_design', 'clear_jtk_cache', 'jtk_cycle'],
+    'lombscargle': ['LS_METHODS', 'FAST_TOLERANCE', 'SEARCH_MODES', 'SUMMARY_COLUMNS', 'coarse_grid', 'test_frequencies', 'independent_frequencies', 'lomb_scargle_periodogram', 'lomb_scargle'],
+    'replicates': ['align_replicates', 'replicate_periodicity', 'run_periodicity_replicates'],
+    'distributed': ['periodicity_output_names', 'mpi_periodicity', 'run_periodicity_mpi'],
+    'batch': ['PROCESS_PERIODS', 'TIME_UNITS', 'parse_time_interval', 'toc_periods', 'batch_jobs', 'run_periodicity_batch'],
+    'streaming': ['streaming_state', 'add_time_point', 'streaming_results', 'stream_periodicity'],
+    'fdr': ['FDR_BLOCK_VALUES', 'permutation_qvalues', 'permutation_fdr', 'run_permutation_fdr'],
+    'lem': ['TARGET_FILE_PATTERN', 'MODEL_PATTERN', 'REGULATION_TYPE_MODELS', 'NULL_MODEL_NAME', 'aggregate_lem_results',
+            'filter_top_regulators_per_target', 'default_arguments', 'gen_lempy_config', 'run_lem'],
+    'ode': ['load_lem_ode_network', 'vectorfield', 'simulate_stochastic', 'LEM_ODE_PARAMETERS', 'network_parameter_names',
+            'network_parameter_vector', 'simulate_ode_batch', 'oscillation_features', 'evaluate_parameter_sets', 'run_sensitivity'],
+    'network': ['EDGE_PATTERN', 'CYTOSCAPE_STYLES', 'lem_edges_to_dataframe', 'lem_results_to_edges', 'top_edges_per_node',
+                'edges_to_ipycytoscape', 'df_edges_to_ipycytoscape', 'make_network_from_edges', 'make_network_from_edge_list',
+                'make_network_from_lem_results', 'make_top_edge_network', 'make_ranked_network', 'lem_signed_adjacency', 'network_degrees',
+                'strongly_connected_components', 'find_feedback_loops', 'find_feed_forward_loops', 'export_network_graphml',
+                'export_binary_edge_list', 'load_binary_edge_list'],
+    'viz': ['norm', 'colors', 'haase', 'plot_heatmap', 'plot_heatmap_in_supplied_order', 'plot_linegraphs_from_gene_list',
+            'plot_line_graphs_from_top_periodicity', 'export_linegraphs_from_gene_list', 'export_line_graphs_from_top_periodicity',
+            'plot_periodicity_histogram'],
+    'tf_catalog': ['TF_DIR', 'TF_CATALOG_CACHE_PATH', 'build_tf_catalog', 'load_tf_catalog', 'get_tf_genes', 'get_gene_families',
+                   'get_regulator_lists'],
+    'synthetic': ['synthetic_time_points', 'random_hill_network', 'generate_synthetic_dataset'],
+    'tracing': ['TRACE_DIR', 'TRACE_STAGES', 'TRACE_ENV', 'trace_run', 'trace_stage', 'trace_environment', 'traced', 'load_traces', 'summarize_traces'],
+    'plasmodb': ['PLASMODB_RECORD_BASE_URL', 'PLASMODB_ATTRIBUTES', 'PLASMODB_CACHE_PATH', 'PLASMODB_RETRY_STATUS', 'plasmodb_session',
+                 'get_plasmodb_data', 'query_plasmodb_gene'],
+}
+
+EXPORT_SUBMODULE = {name: submodule for submodule, names in SUBMODULE_EXPORTS.items() for name in names}
+
+__all__ = list(EXPORT_SUBMODULE)
+
+
+def __getattr__(name):
+    if name in SUBMODULE_EXPORTS:
+        return importlib.import_module(f'.{name}', __name__)
+    if name not in EXPORT_SUBMODULE:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{EXPORT_SUBMODULE[name]}', __name__), name)
+    # cache on the package so the next lookup skips __getattr__
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__ + list(SUBMODULE_EXPORTS))
@@ -0,0 +1,300 @@
+'''
+Periodicity runs over the whole dataset catalog (dataset_TOC.csv) or part of it, on a pool of processes.
+
+The periods to test are derived from each dataset's Process and its Sampling Frequency and Sampling Duration. Datasets run in order of
+decreasing estimated cost, at most num_proc at a time, each on one core. A dataset that fails is recorded in the batch index and does
+not stop the others, also when it kills its worker process (e.g. out of memory), and the index is rewritten after every dataset so
+that an interrupted sweep can be resumed.
+'''
+
+import os
+import re
+import time
+import datetime
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from . import io as dataset_io
+from .jtk import jtk_cycle
+from .dl import de_lichtenberg
+from .lombscargle import lomb_scargle
+from .distributed import periodicity_output_names
+from .tracing import traced, trace_stage
+
+# the range of periods, in hours, of the processes whose period does not depend on the sampling. Other processes (the cell cycle)
+# are searched between a quarter and half of the sampling duration
+PROCESS_PERIODS = {
+    'Circadian': (20, 28),
+    'Intraerythrocytic Development Cycle': (40, 56),
+}
+
+# hours per unit of the Sampling Frequency and Sampling Duration fields
+TIME_UNITS = {'min': 1 / 60, 'hr': 1}
+
+# the environment variables that set the number of threads of the linear algebra libraries
+_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+
+def parse_time_interval(interval):
+    '''
+    Read a Sampling Frequency or Sampling Duration field such as '16 min' or '4 hr'.
+
+    Returns
+    -------
+    value : float
+        the number, or None for fields without one (e.g. 'Uneven')
+    unit : string
+        one of TIME_UNITS, or None
+    '''
+
+    match = re.fullmatch(r'\s*([0-9.]+)\s*([a-zA-Z]+)\s*', str(interval))
+    if match is None or match.group(2) not in TIME_UNITS:
+        return None, None
+
+    return float(match.group(1)), match.group(2)
+
+
+def toc_periods(toc_row, time_points):
+    '''
+    The periods to test for one dataset of the table of contents, in the units of its time points.
+
+    Parameters
+    ----------
+    toc_row : pandas.Series
+        the dataset's row of view_data_toc
+    time_points : list
+        the dataset's time points
+
+    Returns
+    -------
+    periods : dict
+        'min_period', 'max_period', 'period_step' (giving about ten JTK periods) and 'avg_period' (for DL), rounded to whole units
+    '''
+
+    time_points = np.sort(pd.to_numeric(pd.Index(time_points)).to_numpy(dtype=float))
+    duration, unit = parse_time_interval(toc_row['Sampling Duration'])
+    if duration is None:
+        raise ValueError(f'Cannot read the sampling duration "{toc_row["Sampling Duration"]}"')
+    step, step_unit = parse_time_interval(toc_row['Sampling Frequency'])
+    # 'Uneven' sampling: the median interval of the time points
+    step = np.median(np.diff(time_points)) if step is None else step * TIME_UNITS[step_unit] / TIME_UNITS[unit]
+
+    if toc_row['Process'] in PROCESS_PERIODS:
+        min_period, max_period = (period / TIME_UNITS[unit] for period in PROCESS_PERIODS[toc_row['Process']])
+    else:
+        min_period, max_period = duration / 4, duration / 2
+    # at least two samples per period, and at most one period over the duration
+    min_period = max(min_period, 2 * step)
+    max_period = max(min(max_period, duration), min_period)
+
+    min_period, max_period = int(round(min_period)), int(round(max_period))
+
+    return {'min_period': min_period, 'max_period': max_period, 'period_step': max(1, int(round((max_period - min_period) / 10))),
+            'avg_period': int(round((min_period + max_period) / 2))}
+
+
+def batch_jobs(toc=None, datasets=None):
+    '''
+    The datasets of a batch run with their periods and estimated cost, most expensive first.
+
+    Parameters
+    ----------
+    toc : pandas.DataFrame
+        the table of contents, or rows of it, from view_data_toc. Default: None, for all of it
+    datasets : list
+        only these dataset names. Default: None
+
+    Returns
+    -------
+    jobs_df : pandas.DataFrame
+        one row per dataset, with its process, periods, number of genes and time points, estimated cost (genes x time points^2, the
+        pairs JTK compares) and status ('pending', or 'missing' when there is no dataset file)
+    '''
+
+    toc = dataset_io.view_data_toc() if toc is None else toc
+    toc = toc.reset_index(drop=True)
+    if datasets is not None:
+        toc = toc[toc['Dataset'].isin(datasets)]
+
+    jobs = list()
+    for _, toc_row in toc.iterrows():
+        job = {'dataset': toc_row['Dataset'], 'process': toc_row['Process'], 'status': 'pending', 'error': ''}
+        data_path = os.path.join(dataset_io.DATADIR, f'{toc_row["Dataset"]}.tsv')
+        if not os.path.exists(data_path):
+            job.update(status='missing', error=f'No dataset file {toc_row["Dataset"]}.tsv')
+            jobs.append(job)
+            continue
+        with open(data_path) as data_file:
+            time_points = data_file.readline().rstrip('\n').split('\t')[1:]
+            nr_genes = sum(1 for line in data_file if line.strip() and not line.startswith('#'))
+        try:
+            job.update(toc_periods(toc_row, time_points))
+        except ValueError as error:
+            job.update(status='failed', error=str(error))
+        job.update(genes=nr_genes, time_points=len(time_points), estimated_cost=nr_genes * len(time_points)**2)
+        jobs.append(job)
+
+    jobs_df = pd.DataFrame(jobs)
+    if 'estimated_cost' in jobs_df:
+        # whole numbers, also next to the missing datasets, so that they read back as in the result names
+        columns = ['min_period', 'max_period', 'period_step', 'avg_period', 'genes', 'time_points', 'estimated_cost']
+        jobs_df[columns] = jobs_df[columns].astype('Int64')
+        jobs_df = jobs_df.sort_values('estimated_cost', ascending=False, kind='stable', na_position='last')
+
+    return jobs_df.reset_index(drop=True)
+
+
+def _run_batch_job(job, datadir, test_freq, numb_reg, numb_per, significance):
+    # one dataset of a batch, in a worker process. Errors are returned, not raised, so that they stay with their dataset
+    start = time.perf_counter()
+    try:
+        dataset_io.DATADIR = datadir
+        dataset = dataset_io.load_dataset(job['dataset'])
+        job.update({column: int(job[column]) for column in ('min_period', 'max_period', 'period_step', 'avg_period')})
+        periods = np.arange(job['min_period'], job['max_period'] + job['period_step'], job['period_step']).tolist()
+        jtk_df = jtk_cycle(dataset, periods)
+        dl_df = de_lichtenberg(dataset, job['avg_period'], numb_reg=numb_reg, numb_per=numb_per, significance=significance)
+        ls_df = lomb_scargle(dataset, job['min_period'], job['max_period'], test_freq)
+
+        datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        outputs = periodicity_output_names(f'{job["dataset"]}__{datetimestr}', job['min_period'], job['max_period'], job['period_step'],
+                                           job['avg_period'], test_freq)
+        jtk_df.to_csv(os.path.join('../results', outputs[0]), sep='\t')
+        dl_df.to_csv(os.path.join('../results', outputs[1]), sep='\t')
+        os.makedirs(os.path.join('../results', outputs[2]), exist_ok=True)
+        ls_df.rename_axis('probe').reset_index().to_csv(os.path.join('../results', outputs[2], f'{outputs[2]}_summary.tsv'), sep='\t',
+                                                       index_label='index')
+    except Exception:
+        return {'status': 'failed', 'error': traceback.format_exc().strip().splitlines()[-1], 'seconds': time.perf_counter() - start}
+
+    return {'status': 'done', 'error': '', 'seconds': time.perf_counter() - start, 'pyjtk': outputs[0], 'pydl': outputs[1], 'ls': outputs[2]}
+
+
+def _run_batch_pool(index_df, job_nrs, workers, record, job_args):
+    # run jobs on a new pool and record each result as it finishes. A worker that dies (e.g. killed for running out of memory) breaks
+    # the whole pool, the jobs that had not finished then are returned
+    finished = set()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(_run_batch_job, index_df.loc[job_nr].to_dict(), *job_args): job_nr for job_nr in job_nrs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                continue
+            except Exception as error:
+                result = {'status': 'failed', 'error': repr(error)}
+            record(futures[future], result)
+            finished.add(futures[future])
+
+    return [job_nr for job_nr in job_nrs if job_nr not in finished]
+
+
+@traced
+def run_periodicity_batch(toc=None, datasets=None, num_proc=2, batch_name='catalog', test_freq=4, numb_reg=1000000, numb_per=100000,
+                          significance=0.05, resume=None):
+    '''
+    Run JTK, DL and Lomb-Scargle on every dataset of the table of contents (or a subset), num_proc datasets at a time.
+
+    Each dataset's results are saved as by run_pyjtk, run_pydl and run_ls, and listed with its periods, status and run time in
+    <batch_name>__<datetime>_batch_index.tsv in the results directory, which is rewritten as each dataset finishes.
+
+    Parameters
+    ----------
+    toc : pandas.DataFrame
+        the table of contents, or rows of it, from view_data_toc. Default: None, for all of it
+    datasets : list
+        only these dataset names. Default: None
+    num_proc : integer
+        the core budget: the number of datasets run at the same time, each on one thread. Default: 2
+    batch_name : string
+        a name to include in the file name of the batch index. Default: 'catalog'
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    numb_reg : integer
+        the maximum number of random curves for the DL regulation p-value. Default: 1000000
+    numb_per : integer
+        the maximum number of random curves for the DL periodicity p-value. Default: 100000
+    significance : float
+        p-value threshold for adaptive sampling in DL, see de_lichtenberg. Set to None to always draw numb_reg and numb_per curves.
+        Default: 0.05
+    resume : string
+        the file name of an earlier batch index. Its finished datasets are not run again. Default: None
+
+    Returns
+    -------
+    index_df : pandas.DataFrame
+        the batch index: one row per dataset with its periods, estimated cost, status ('done', 'failed' or 'missing'), error, run
+        time and the names of its pyJTK, pyDL and Lomb-Scargle results, which can be used in load_results()
+
+    Examples
+    --------
+    # every circadian dataset, 4 at a time
+    >>> toc_df = view_data_toc()
+    >>> run_periodicity_batch(toc_df[toc_df['Process'] == 'Circadian'], num_proc=4)
+
+    # pick up an interrupted sweep
+    >>> run_periodicity_batch(num_proc=8, resume='catalog__20211005135304_batch_index.tsv')
+    '''
+
+    with trace_stage('preprocess'):
+        index_df = batch_jobs(toc, datasets)
+    for column in ('seconds', 'pyjtk', 'pydl', 'ls'):
+        index_df[column] = np.nan if column == 'seconds' else ''
+    if resume is not None:
+        previous = pd.read_csv(os.path.join('../results', resume), sep='\t', index_col=0)
+        previous = previous[previous['status'] == 'done'].set_index('dataset')
+        done = index_df['dataset'].isin(previous.index)
+        for column in ('status', 'seconds', 'pyjtk', 'pydl', 'ls'):
+            index_df.loc[done, column] = previous.loc[index_df.loc[done, 'dataset'], column].to_numpy()
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    index_name = f'{batch_name}__{datetimestr}_batch_index.tsv'
+    index_path = os.path.join('../results', index_name)
+    index_df.to_csv(index_path, sep='\t')
+    pending = index_df.index[index_df['status'] == 'pending']
+    print(f'-- Running {len(pending)} datasets, {num_proc} at a time. Progress is saved in {index_name} in the results directory')
+
+    def record(job_nr, result):
+        for column, value in result.items():
+            index_df.loc[job_nr, column] = value
+        index_df.to_csv(index_path, sep='\t')
+        print(f'-- {index_df.loc[job_nr, "dataset"]}: {result["status"]} {result["error"]}')
+
+    job_args = (dataset_io.DATADIR, test_freq, numb_reg, numb_per, significance)
+    queue = list(pending)
+    suspects = set()
+    # spawned workers read these when they load numpy, so each one uses a single thread
+    saved_environment = {variable: os.environ.get(variable) for variable in _THREAD_VARIABLES}
+    os.environ.update({variable: '1' for variable in _THREAD_VARIABLES})
+    try:
+        with trace_stage('compute'):
+            while queue:
+                isolated = [job_nr for job_nr in queue if job_nr in suspects]
+                if isolated:
+                    # the jobs that were running when a worker died run alone, so that only a job that kills its worker on its own
+                    # fails, and a job that ran out of memory next to others gets another chance
+                    if _run_batch_pool(index_df, isolated[:1], 1, record, job_args):
+                        record(isolated[0], {'status': 'failed', 'error': 'The worker process died, e.g. out of memory'})
+                    queue.remove(isolated[0])
+                    continue
+                unfinished = _run_batch_pool(index_df, queue, num_proc, record, job_args)
+                if unfinished:
+                    print(f'-- A worker process died, rerunning {len(unfinished)} unfinished datasets')
+                # the pool starts the jobs in order, so the first unfinished ones were running when it broke
+                suspects.update(unfinished[:num_proc])
+                queue = unfinished
+    finally:
+        for variable, value in saved_environment.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+    print(f'-- Batch finished: {index_df["status"].value_counts().to_dict()}')
+
+    return index_df
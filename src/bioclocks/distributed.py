@@ -0,0 +1,282 @@
+'''
+JTK, Lomb-Scargle and DL on several processes or nodes with MPI.
+
+Rank 0 reads the dataset, scatters blocks of genes to all ranks, gathers the per-gene results and writes them with the same file
+names and layout as run_pyjtk, run_pydl and run_ls with method='python' (and 'exact' or 'fast'), so load_results and run_dlxjtk read
+them unchanged. Only rank 0 reads and writes files, but with a hostfile it may run on any of the listed nodes, so the tmp and
+results directories must be on a filesystem shared with the machine that starts the run. If a rank fails, the error is passed to
+the others so that they stop instead of waiting for it. The regulation random curves of DL are drawn from the whole dataset and its
+p-values are normalized over all genes after the gather. The JTK and Lomb-Scargle results do not depend on the number of ranks. The
+DL random curves of each block come from a seed sequence keyed by the block's first gene, so a seeded run gives the same p-values
+with the same number of ranks. With a different number of ranks the genes fall into other blocks and are compared with other random
+curves, so their DL p-values differ within the Monte Carlo error.
+
+Usage (from the notebooks directory, or any directory next to tmp and results):
+    mpiexec -n 4 python -m mpi4py -m bioclocks.distributed ../tmp/yeast__20211005135304.tsv 75 100 5 95 yeast__20211005135304
+'''
+
+import os
+import sys
+import argparse
+import datetime
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from .io import load_results
+from .preprocessing import preprocess
+from .jtk import jtk_cycle
+from .dl import dl_null_values, de_lichtenberg
+from .lombscargle import LS_METHODS, lomb_scargle
+from .tracing import traced, trace_stage
+
+
+def periodicity_output_names(prefix, min_period, max_period, period_step, avg_period, test_freq):
+    '''The pyJTK and pyDL file names and the Lomb-Scargle directory name of a run, as written by run_pyjtk, run_pydl and run_ls.'''
+
+    return (f'{prefix}_pyjtk_p{min_period}-{max_period}s{period_step}.tsv', f'{prefix}_pydl_p{avg_period}.tsv',
+            f'{prefix}_ls_p{min_period}-{max_period}f{test_freq}')
+
+
+def _periodicity_block(block_df, periods, min_period, max_period, avg_period, test_freq, ls_method, numb_reg, numb_per, significance,
+                       null_values, seed):
+    # the three algorithms on one block of genes
+    if block_df.empty:
+        return None
+    jtk_df = jtk_cycle(block_df, periods)
+    dl_df = de_lichtenberg(block_df, avg_period, numb_reg=numb_reg, numb_per=numb_per, significance=significance, seed=seed,
+                           null_values=null_values)
+    ls_df = lomb_scargle(block_df, min_period, max_period, test_freq, method=ls_method)
+
+    return jtk_df, dl_df, ls_df
+
+
+def mpi_periodicity(data_path, min_period, max_period, period_step, avg_period, prefix, test_freq=4, ls_method='exact', numb_reg=1000000,
+                    numb_per=100000, significance=None, seed=None, results_dir='../results', comm=None):
+    '''
+    Run JTK, DL and Lomb-Scargle on a dataset file, split over the ranks of an MPI communicator. Every rank must call this.
+
+    Parameters
+    ----------
+    data_path : string
+        path of the time series dataset (tsv), read by rank 0
+    min_period, max_period, period_step : integer
+        the periods to examine in JTK and Lomb-Scargle
+    avg_period : integer
+        the period to examine in DL
+    prefix : string
+        start of the output names, usually <filename>__<datetime>
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    numb_reg, numb_per : integer
+        number of random curves for the DL regulation and periodicity p-values. Default: 1000000, 100000
+    significance : float
+        p-value threshold for adaptive sampling in DL, see de_lichtenberg. Default: None
+    seed : integer
+        seed of the DL random curves. Each block draws from np.random.SeedSequence(seed, spawn_key=(first gene,)). Default: None
+    results_dir : string
+        directory the results are written to by rank 0. Default: '../results'
+    comm : mpi4py.MPI.Comm
+        the communicator. Default: None, for MPI.COMM_WORLD
+
+    Returns
+    -------
+    on rank 0
+        pyjtk_outfile, pydl_outfile, ls_outdir : string
+            the output names, which can be used in load_results()
+    on the other ranks
+        None
+    '''
+
+    if ls_method not in LS_METHODS:
+        raise ValueError(f'ls_method must be one of {LS_METHODS}, not "{ls_method}"')
+    if comm is None:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    rank, size = comm.Get_rank(), comm.Get_size()
+
+    blocks = null_values = error = None
+    if rank == 0:
+        try:
+            dataset = pd.read_csv(data_path, sep='\t', index_col=0, comment='#')
+            if dataset.empty:
+                raise ValueError(f'{data_path} has no genes')
+            print(f'-- Running JTK, DL and Lomb-Scargle on {len(dataset)} genes in {size} blocks')
+            # each block with the position of its first gene, which keys its random curves
+            blocks = [(rows[0] if len(rows) else len(dataset), dataset.iloc[rows]) for rows in np.array_split(np.arange(len(dataset)), size)]
+            null_values = dl_null_values(dataset)
+        except Exception as exception:
+            error = exception
+    # every rank learns of a failure of rank 0, instead of waiting for the scatter
+    error = comm.bcast(error, root=0)
+    if error is not None:
+        if rank == 0:
+            raise error
+        return None
+
+    first_gene, block_df = comm.scatter(blocks, root=0)
+    null_values = comm.bcast(null_values, root=0)
+    periods = np.arange(min_period, max_period + period_step, period_step).tolist()
+    block_seed = None if seed is None else np.random.SeedSequence(seed, spawn_key=(int(first_gene),))
+    try:
+        block_results = _periodicity_block(block_df, periods, min_period, max_period, avg_period, test_freq, ls_method, numb_reg,
+                                           numb_per, significance, null_values, block_seed)
+    except Exception as exception:
+        # sent to rank 0 in place of the results, so that the gather completes
+        block_results = exception
+    gathered = comm.gather(block_results, root=0)
+
+    if rank != 0:
+        return None
+
+    errors = [results for results in gathered if isinstance(results, Exception)]
+    if errors:
+        raise errors[0]
+    gathered = [results for results in gathered if results is not None]
+    jtk_df = pd.concat([results[0] for results in gathered]).sort_values('p-value', kind='stable')
+    dl_df = pd.concat([results[1] for results in gathered])
+    dl_df['p_reg_norm'] = dl_df['p_reg'] / dl_df['p_reg'].median()
+    dl_df['p_per_norm'] = dl_df['p_per'] / dl_df['p_per'].median()
+    dl_df = dl_df.sort_values('p_reg', kind='stable')
+    ls_df = pd.concat([results[2] for results in gathered]).sort_values('p-value', kind='stable')
+
+    pyjtk_outfile, pydl_outfile, ls_outdir = periodicity_output_names(prefix, min_period, max_period, period_step, avg_period, test_freq)
+    jtk_df.to_csv(os.path.join(results_dir, pyjtk_outfile), sep='\t')
+    dl_df.to_csv(os.path.join(results_dir, pydl_outfile), sep='\t')
+    os.makedirs(os.path.join(results_dir, ls_outdir), exist_ok=True)
+    ls_df.rename_axis('probe').reset_index().to_csv(os.path.join(results_dir, ls_outdir, f'{ls_outdir}_summary.tsv'), sep='\t',
+                                                   index_label='index')
+    print(f'-- Results saved as {pyjtk_outfile}, {pydl_outfile} and in {ls_outdir} in the results directory')
+
+    return pyjtk_outfile, pydl_outfile, ls_outdir
+
+
+@traced
+def run_periodicity_mpi(dataset, min_period, max_period, period_step, avg_period, filename, numb_reg=1000000, numb_per=100000,
+                        return_results=True, num_proc=4, hostfile=None, test_freq=4, ls_method='exact', significance=None,
+                        preprocessing=None):
+    '''
+    Run JTK, DL and Lomb-Scargle on a single dataset with mpiexec, splitting the genes over num_proc processes. Gives the same results
+    as run_pyjtk, run_pydl and run_ls with method='python' (and ls_method), in the same files.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : integer
+        the minimum periods to examine in JTK and Lomb-Scargle
+    max_period : integer
+        the maximum periods to examine in JTK and Lomb-Scargle
+    period_step : integer
+        the stepsize for building the range of periods to examine in JTK
+    avg_period : integer
+        the period to examine in DL
+    filename : string
+        a name to include in the file name of the results
+    numb_reg : integer
+        number of random curves for empirical regulation p-value in DL. Default: 1000000
+    numb_per : integer
+        number of random curves for empirical periodicity p-value in DL. Default: 100000
+    return_results : boolean
+        set to True to save the results and to return them as dataframes. Set to False to only save the results. Default: True
+    num_proc : integer
+        the number of MPI processes. Default: 4
+    hostfile : string
+        an mpiexec hostfile, to run across the nodes listed in it. The tmp and results directories must be on a filesystem shared
+        by those nodes and this machine. Default: None, for this machine
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    significance : float
+        p-value threshold for adaptive sampling in DL, see de_lichtenberg. Default: None
+    preprocessing : list
+        preprocessing steps to run on the dataset first, see preprocess. Default: None
+
+    Returns
+    -------
+    if return_results == True
+        jtk_results, dl_results, ls_results : pandas.DataFrame
+    if return_results == False
+        pyjtk_results_path, pydl_results_path, ls_results_path : string
+            the names of the results, which can be used in load_results()
+
+    Examples
+    --------
+    >>> run_periodicity_mpi(data_df, 75, 100, 5, 95, 'yeast_ma', num_proc=8)
+
+    # across the nodes of a cluster
+    >>> run_periodicity_mpi(data_df, 75, 100, 5, 95, 'yeast_ma', num_proc=64, hostfile='hosts.txt')
+    '''
+
+    if preprocessing is not None:
+        with trace_stage('preprocess'):
+            dataset = preprocess(dataset, preprocessing)
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    prefix = f'{filename}__{datetimestr}'
+    data_path = f'../tmp/{prefix}.tsv'
+    with trace_stage('serialize'):
+        dataset.to_csv(data_path, sep='\t')
+
+    full_cmd = ['mpiexec', '-n', str(num_proc)] + (['-hostfile', hostfile] if hostfile is not None else []) + \
+        ['python', '-m', 'mpi4py', '-m', 'bioclocks.distributed', data_path, str(min_period), str(max_period), str(period_step), str(avg_period), prefix,
+         '--test-freq', str(test_freq), '--ls-method', ls_method, '-r', str(numb_reg), '-p', str(numb_per)] + \
+        (['--significance', str(significance)] if significance is not None else [])
+    print(f'-- Command used: {" ".join(full_cmd)}')
+
+    # the ranks import this package from the directory that contains it
+    env = dict(os.environ)
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([package_parent] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+
+    with trace_stage('spawn'):
+        submit_cmd = subprocess.Popen(full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    with trace_stage('compute'):
+        output, error = submit_cmd.communicate()
+    str_error = error.decode('utf-8').split('\n')
+    if len(str_error) > 1:
+        print('-- Error:')
+        [print(e) for e in str_error]
+    os.remove(data_path)
+    if submit_cmd.returncode != 0:
+        raise ValueError(f'mpiexec failed with exit code {submit_cmd.returncode}')
+
+    outputs = periodicity_output_names(prefix, min_period, max_period, period_step, avg_period, test_freq)
+    print(f'-- Results saved as {outputs[0]}, {outputs[1]} and in {outputs[2]} in the results directory')
+
+    if return_results:
+        with trace_stage('parse'):
+            return tuple(load_results(output) for output in outputs)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_path', help='time series dataset (tsv)')
+    parser.add_argument('min_period', type=int)
+    parser.add_argument('max_period', type=int)
+    parser.add_argument('period_step', type=int)
+    parser.add_argument('avg_period', type=int, help='period tested by DL')
+    parser.add_argument('prefix', help='start of the output names')
+    parser.add_argument('--test-freq', type=int, default=4, help='number of Lomb-Scargle test frequencies per time point')
+    parser.add_argument('--ls-method', default='exact', choices=LS_METHODS)
+    parser.add_argument('-r', '--numb-reg', type=int, default=1000000, help='random curves for the DL regulation p-value')
+    parser.add_argument('-p', '--numb-per', type=int, default=100000, help='random curves for the DL periodicity p-value')
+    parser.add_argument('--significance', type=float, default=None, help='p-value threshold for adaptive DL sampling')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--results-dir', default='../results')
+    args = parser.parse_args()
+
+    mpi_periodicity(args.data_path, args.min_period, args.max_period, args.period_step, args.avg_period, args.prefix,
+                    test_freq=args.test_freq, ls_method=args.ls_method, numb_reg=args.numb_reg, numb_per=args.numb_per,
+                    significance=args.significance, seed=args.seed, results_dir=args.results_dir)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
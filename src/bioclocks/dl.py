@@ -0,0 +1,202 @@
+'''
+The de Lichtenberg (DL) regulation and periodicity tests in Python, with fixed or adaptive (sequential) Monte Carlo p-values.
+
+The regulation score of a gene is the peak-to-trough range of its profile, compared with random curves drawn from the deviations of
+all genes from their mean expression. The periodicity score is the power of the profile at the tested period, compared with random permutations of
+the gene's own values. Both null distributions are sampled in batches that are shared by all genes, so each batch is one matrix
+product or one sorted lookup.
+
+In the adaptive mode sampling stops for a gene once the Clopper-Pearson interval of its empirical p-value lies entirely above or
+below the chosen significance threshold (Besag and Clifford, 1991), and the number of random curves drawn for each gene is recorded.
+Genes far from the threshold, which is most of a genome, then need a few hundred curves instead of numb_reg or numb_per.
+'''
+
+import numpy as np
+import pandas as pd
+
+# the first batch of random curves, doubled every batch up to DL_MAX_BATCH
+DL_FIRST_BATCH = 100
+DL_MAX_BATCH = 2**15
+
+# exceedances needed before sampling stops for a gene below the significance threshold
+DL_MIN_EXCEED = 10
+
+# genes x random curves compared at once
+_CHUNK_SIZE = 2**22
+
+
+def _regulation_scores(values):
+    # peak-to-trough range of each profile
+    return np.nanmax(values, axis=1) - np.nanmin(values, axis=1)
+
+
+def _periodicity_scores(values, cos, sin):
+    # power at the tested period of each mean centered profile, for each row of (permuted) trigonometric terms
+    values = values - values.mean(axis=1, keepdims=True)
+    return (values @ cos.T)**2 + (values @ sin.T)**2
+
+
+def _stop_sampling(exceed, draws, significance, confidence):
+    # genes whose p-value is, at the given confidence, above the significance threshold, or below it and estimated from at least
+    # DL_MIN_EXCEED exceedances so that the ranking of the most significant genes is kept
+    from scipy import stats
+
+    tail = (1 - confidence) / 2
+    lower = np.where(exceed > 0, stats.beta.ppf(tail, exceed, draws - exceed + 1), 0.0)
+    upper = np.where(exceed < draws, stats.beta.ppf(1 - tail, exceed + 1, draws - exceed), 1.0)
+    return (lower > significance) | ((upper < significance) & (exceed >= DL_MIN_EXCEED))
+
+
+def _monte_carlo(scores, draw_null, max_draws, significance, confidence, rng):
+    # empirical p-values (exceed + 1) / (draws + 1) of scores, against null scores from draw_null(nr_curves, rng, genes)
+    exceed = np.zeros(len(scores), dtype=np.int64)
+    draws = np.zeros(len(scores), dtype=np.int64)
+    active = np.flatnonzero(np.isfinite(scores))
+    batch_size = DL_FIRST_BATCH if significance is not None else DL_MAX_BATCH
+
+    while len(active) and draws[active[0]] < max_draws:
+        nr_curves = int(min(batch_size, max_draws - draws[active[0]]))
+        exceed[active] += draw_null(nr_curves, rng, active, scores[active])
+        draws[active] += nr_curves
+        if significance is not None:
+            active = active[~_stop_sampling(exceed[active], draws[active], significance, confidence)]
+        batch_size = min(2 * batch_size, DL_MAX_BATCH)
+
+    p_values = np.where(draws > 0, (exceed + 1) / (draws + 1), 1.0)
+
+    return p_values, draws
+
+
+def _transform(values, log_trans):
+    return np.log2(np.clip(values, 0, None) + 1) if log_trans else values
+
+
+def dl_null_values(dataset, log_trans=True):
+    '''
+    The values the regulation random curves are drawn from: the deviations of every gene of the dataset from its mean expression.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    log_trans : boolean
+        set to True to use log2(values + 1). Default: True
+
+    Returns
+    -------
+    null_values : numpy.ndarray
+        the non-missing deviations
+    '''
+
+    values = _transform(dataset.to_numpy(dtype=float), log_trans)
+    deviations = values - np.nanmean(values, axis=1, keepdims=True)
+
+    return deviations[np.isfinite(deviations)]
+
+
+def de_lichtenberg(dataset, period, numb_reg=1000000, numb_per=100000, log_trans=True, significance=None, confidence=0.99, seed=None,
+                   null_values=None, nr_untested=0):
+    '''
+    Run the de Lichtenberg regulation and periodicity tests on every gene of a dataset. Missing values are left out per gene.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    period : float
+        the period to test, in the units of the time points
+    numb_reg : integer
+        the (maximum) number of random curves for the empirical regulation p-value. Default: 1000000
+    numb_per : integer
+        the (maximum) number of random curves for the empirical periodicity p-value. Default: 100000
+    log_trans : boolean
+        set to True to test log2(values + 1). Default: True
+    significance : float
+        set to a p-value threshold, e.g. 0.05, to stop sampling a gene once its p-value is confidently above or below it. Default:
+        None, to draw numb_reg and numb_per random curves for every gene
+    confidence : float
+        the confidence level of the stopping rule. Default: 0.99
+    seed : integer or numpy.random.SeedSequence
+        seed of the random number generator. Default: None
+    null_values : numpy.ndarray
+        the values to draw the regulation random curves from, from dl_null_values. Pass those of the whole dataset when testing
+        part of it. Default: None, for those of dataset
+    nr_untested : integer
+        the number of genes left out of dataset, e.g. by triage_genes, that count as p-values of 1 in the median normalizations, so
+        that p_reg_norm and p_per_norm match those of the whole dataset. Default: 0
+
+    Returns
+    -------
+    results_df : pandas.DataFrame
+        for each gene the regulation and periodicity p-values ('p_reg', 'p_per'), the same divided by their median ('p_reg_norm',
+        'p_per_norm', as used by run_dlxjtk), and the number of random curves drawn for each ('reg_draws', 'per_draws'), sorted by
+        p_reg. Constant genes have p-values of 1
+
+    Examples
+    --------
+    >>> de_lichtenberg(data_df, 95)
+
+    # adaptive sampling around p = 0.05
+    >>> de_lichtenberg(data_df, 95, significance=0.05)
+    '''
+
+    if significance is not None and not 0 < significance < 1:
+        raise ValueError(f'significance must be between 0 and 1, not {significance}')
+
+    rng = np.random.default_rng(seed)
+    time_points = pd.to_numeric(dataset.columns).to_numpy(dtype=float)
+    values = _transform(dataset.to_numpy(dtype=float), log_trans)
+    pooled = dl_null_values(dataset, log_trans) if null_values is None else np.asarray(null_values, dtype=float)
+
+    results = np.full((len(values), 4), np.nan)
+    missing = np.isnan(values)
+    if missing.any():
+        patterns, gene_pattern = np.unique(missing, axis=0, return_inverse=True)
+        gene_pattern = gene_pattern.ravel()
+    else:
+        patterns, gene_pattern = missing[:1], np.zeros(len(values), dtype=int)
+
+    for pattern_nr, pattern in enumerate(patterns):
+        genes = np.flatnonzero(gene_pattern == pattern_nr)
+        observed = ~pattern
+        nr_observed = observed.sum()
+        if nr_observed < 3:
+            continue
+        gene_values = values[genes][:, observed]
+
+        def draw_regulation(nr_curves, rng, active, scores):
+            null = np.sort(_regulation_scores(rng.choice(pooled, size=(nr_curves, nr_observed))))
+            return nr_curves - np.searchsorted(null, scores, side='left')
+
+        angles = 2 * np.pi * time_points[observed] / period
+        cos, sin = np.cos(angles), np.sin(angles)
+
+        def draw_periodicity(nr_curves, rng, active, scores):
+            # permuting the trigonometric terms permutes every profile at once
+            order = rng.random((nr_curves, nr_observed)).argsort(axis=1)
+            permuted_cos, permuted_sin = cos[order], sin[order]
+            exceed = np.empty(len(active), dtype=np.int64)
+            chunk = max(1, _CHUNK_SIZE // nr_curves)
+            for start in range(0, len(active), chunk):
+                null = _periodicity_scores(gene_values[active[start:start + chunk]], permuted_cos, permuted_sin)
+                exceed[start:start + chunk] = (null >= scores[start:start + chunk, None] * (1 - 1e-12)).sum(axis=1)
+            return exceed
+
+        reg_scores = _regulation_scores(gene_values)
+        per_scores = _periodicity_scores(gene_values, cos[None], sin[None])[:, 0]
+        # constant profiles are neither regulated nor periodic, and the rounding residue of their mean centering would beat every
+        # permutation. Without a finite score they get p-values of 1 and no draws
+        constant = reg_scores == 0
+        reg_scores[constant], per_scores[constant] = np.nan, np.nan
+        results[genes, 0], results[genes, 1] = _monte_carlo(reg_scores, draw_regulation, numb_reg, significance, confidence, rng)
+        results[genes, 2], results[genes, 3] = _monte_carlo(per_scores, draw_periodicity, numb_per, significance, confidence, rng)
+
+    results_df = pd.DataFrame(results, index=dataset.index, columns=['p_reg', 'reg_draws', 'p_per', 'per_draws'])
+    results_df[['p_reg', 'p_per']] = results_df[['p_reg', 'p_per']].fillna(1.0)
+    results_df[['reg_draws', 'per_draws']] = results_df[['reg_draws', 'per_draws']].fillna(0).astype(int)
+    untested = np.ones(nr_untested)
+    results_df['p_reg_norm'] = results_df['p_reg'] / np.median(np.concatenate([results_df['p_reg'].to_numpy(), untested]))
+    results_df['p_per_norm'] = results_df['p_per'] / np.median(np.concatenate([results_df['p_per'].to_numpy(), untested]))
+    results_df = results_df[['p_reg', 'p_reg_norm', 'p_per', 'p_per_norm', 'reg_draws', 'per_draws']]
+
+    return results_df.sort_values('p_reg', kind='stable')
@@ -0,0 +1,248 @@
+'''
+Permutation false discovery rates (q-values) for the JTK, Lomb-Scargle and DLxJTK scores of a dataset.
+
+Each permutation shuffles the order of the time points of the whole dataset, which keeps the correlations between genes but destroys
+any periodicity. Blocks of permutations are stacked into one gene-by-permutation matrix and scored by jtk_cycle and lomb_scargle in a
+single call each, on a process pool. A block is reduced to the number of null scores at or below each observed score before it is
+returned, so memory does not grow with the number of permutations. The DL regulation p-value does not depend on the order of the
+time points, so the DLxJTK null combines each gene's DL p-value with its permuted JTK p-values and DL is not rerun.
+'''
+
+import os
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .io import load_results
+from .jtk import jtk_cycle
+from .lombscargle import LS_METHODS, lomb_scargle
+from .periodicity import dlxjtk_func
+from .distributed import periodicity_output_names
+from .tracing import traced, trace_stage
+
+# about how many values the largest array of one block of permutations holds (genes x permutations x the larger of the JTK pairs of
+# time points and the Lomb-Scargle test frequencies). A block has at least one permutation
+FDR_BLOCK_VALUES = 2**24
+
+# the dataset and observed scores, set once in each worker process
+_WORKER_DATA = dict()
+
+
+def permutation_qvalues(observed, null_counts, nr_permutations):
+    '''
+    Permutation q-values of observed scores where lower is more significant (p-values, DLxJTK scores).
+
+    Parameters
+    ----------
+    observed : numpy.ndarray
+        the score of each gene
+    null_counts : numpy.ndarray
+        for each gene, the number of permuted scores (of all genes in all permutations) at or below its observed score
+    nr_permutations : integer
+        the number of permutations
+
+    Returns
+    -------
+    q_values : numpy.ndarray
+        the smallest false discovery rate at which each gene is called, taking the proportion of null genes as 1. Genes without a
+        score get 1
+    '''
+
+    observed = np.asarray(observed, dtype=float)
+    has_score = ~np.isnan(observed)
+    # the number of genes called at each gene's score, and the expected number of them that are null
+    nr_called = np.searchsorted(np.sort(observed[has_score]), observed, side='right')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fdr = np.minimum(np.asarray(null_counts, dtype=float) / nr_permutations / nr_called, 1.0)
+
+    # q-value: the lowest FDR over all thresholds that call the gene
+    order = np.argsort(np.where(has_score, observed, np.inf), kind='stable')[::-1]
+    q_values = np.ones(len(observed))
+    q_values[order] = np.minimum.accumulate(np.where(has_score, fdr, 1.0)[order])
+
+    return q_values
+
+
+def _init_permutation_worker(data):
+    # process pool initializer: keep the dataset and observed scores in the worker instead of sending them with every block
+    _WORKER_DATA.clear()
+    _WORKER_DATA.update(data)
+
+
+def _permutation_block(permutations):
+    # the null counts of one block of permutations: the permuted datasets stacked as rows, scored by one call of each engine
+    data = _WORKER_DATA
+    nr_genes = len(data['values'])
+    stacked = pd.DataFrame(np.concatenate([data['values'][:, order] for order in permutations]), columns=data['columns'])
+    shape = (len(permutations), nr_genes)
+    jtk_df = jtk_cycle(stacked, data['periods']).sort_index()
+    ls_df = lomb_scargle(stacked, data['min_period'], data['max_period'], data['test_freq'], method=data['ls_method']).sort_index()
+
+    null_scores = {'jtk': jtk_df['raw p-value'].to_numpy().reshape(shape), 'ls': ls_df['p-value'].to_numpy().reshape(shape)}
+    if data['dl_norm'] is not None:
+        # normalized by the median of each permuted dataset, as in run_dlxjtk
+        jtk_p_value = jtk_df['p-value'].to_numpy().reshape(shape)
+        null_scores['dlxjtk'] = dlxjtk_func({'dl_reg_pval_norm': data['dl_norm'],
+                                             'jtk_per_pval_norm': jtk_p_value / np.median(jtk_p_value, axis=1, keepdims=True)})
+
+    return {score: np.searchsorted(np.sort(null.ravel()), data['observed'][score], side='right') for score, null in null_scores.items()}
+
+
+def permutation_fdr(dataset, min_period, max_period, period_step, test_freq=4, nr_permutations=1000, pydl_results=None, ls_method='exact',
+                    num_proc=2, seed=None):
+    '''
+    JTK, Lomb-Scargle and optionally DLxJTK results of a dataset with permutation q-values.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period, max_period, period_step : integer
+        the periods to examine in JTK and Lomb-Scargle
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    nr_permutations : integer
+        the number of permutations of the time points. Default: 1000
+    pydl_results : pandas.DataFrame or string
+        pyDL results of the same dataset, to also compute DLxJTK q-values. Default: None
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    num_proc : integer
+        the number of processes to use. Default: 2
+    seed : integer
+        seed of the permutations. Default: None
+
+    Returns
+    -------
+    jtk_df, ls_df : pandas.DataFrame
+        the results of jtk_cycle and lomb_scargle with a 'q-value' column, from the raw JTK p-value and the Lomb-Scargle p-value
+    dlxjtk_df : pandas.DataFrame
+        the results of run_dlxjtk with a 'q-value' column, or None without pydl_results
+    '''
+
+    if ls_method not in LS_METHODS:
+        raise ValueError(f'ls_method must be one of {LS_METHODS}, not "{ls_method}"')
+    if dataset.index.has_duplicates:
+        raise ValueError('The dataset lists some genes more than once. Run remove_duplicates on it first')
+
+    periods = np.arange(min_period, max_period + period_step, period_step).tolist()
+    jtk_df = jtk_cycle(dataset, periods).loc[dataset.index]
+    ls_df = lomb_scargle(dataset, min_period, max_period, test_freq, method=ls_method).loc[dataset.index]
+    observed = {'jtk': jtk_df['raw p-value'].to_numpy(), 'ls': ls_df['p-value'].to_numpy()}
+
+    dlxjtk_df = dl_norm = None
+    if pydl_results is not None:
+        dl_df = load_results(pydl_results) if isinstance(pydl_results, str) else pydl_results
+        dlxjtk_df = pd.DataFrame({'dl_reg_pval': dl_df['p_reg'].reindex(dataset.index),
+                                  'dl_reg_pval_norm': dl_df['p_reg_norm'].reindex(dataset.index),
+                                  'jtk_per_pval': jtk_df['p-value'],
+                                  'jtk_per_pval_norm': jtk_df['p-value'] / np.median(jtk_df['p-value'])})
+        dlxjtk_df['dlxjtk_score'] = dlxjtk_func(dlxjtk_df)
+        dl_norm = dlxjtk_df['dl_reg_pval_norm'].to_numpy()
+        observed['dlxjtk'] = dlxjtk_df['dlxjtk_score'].to_numpy()
+
+    rng = np.random.default_rng(seed)
+    nr_time_points = dataset.shape[1]
+    permutations = rng.permuted(np.tile(np.arange(nr_time_points), (nr_permutations, 1)), axis=1)
+    width = max(nr_time_points * (nr_time_points - 1) // 2, int(test_freq * nr_time_points))
+    block_size = max(1, FDR_BLOCK_VALUES // (len(dataset) * width))
+    blocks = [permutations[start:start + block_size] for start in range(0, nr_permutations, block_size)]
+
+    data = {'values': dataset.to_numpy(dtype=float), 'columns': dataset.columns, 'periods': periods, 'min_period': min_period,
+            'max_period': max_period, 'test_freq': test_freq, 'ls_method': ls_method, 'observed': observed, 'dl_norm': dl_norm}
+    null_counts = {score: np.zeros(len(dataset), dtype=np.int64) for score in observed}
+    if num_proc > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=num_proc, initializer=_init_permutation_worker, initargs=(data,)) as executor:
+            for block_counts in executor.map(_permutation_block, blocks):
+                for score, counts in block_counts.items():
+                    null_counts[score] += counts
+    else:
+        _init_permutation_worker(data)
+        for block in blocks:
+            for score, counts in _permutation_block(block).items():
+                null_counts[score] += counts
+        _WORKER_DATA.clear()
+
+    jtk_df['q-value'] = permutation_qvalues(observed['jtk'], null_counts['jtk'], nr_permutations)
+    ls_df['q-value'] = permutation_qvalues(observed['ls'], null_counts['ls'], nr_permutations)
+    if dlxjtk_df is not None:
+        dlxjtk_df['q-value'] = permutation_qvalues(observed['dlxjtk'], null_counts['dlxjtk'], nr_permutations)
+        dlxjtk_df = dlxjtk_df.sort_values('dlxjtk_score', kind='stable')
+
+    return jtk_df.sort_values('p-value', kind='stable'), ls_df.sort_values('p-value', kind='stable'), dlxjtk_df
+
+
+@traced
+def run_permutation_fdr(dataset, min_period, max_period, period_step, filename, test_freq=4, nr_permutations=1000, pydl_results=None,
+                        ls_method='exact', num_proc=2, seed=None, return_results=True):
+    '''
+    Run JTK and Lomb-Scargle, and DLxJTK from pyDL results, with permutation q-values, see permutation_fdr. The results are saved as
+    by run_pyjtk, run_ls and run_dlxjtk with _fdr<nr_permutations> added to the names, and their 'q-value' column can be filtered with
+    get_genelist_from_threshold.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : integer
+        the minimum periods to examine in JTK and Lomb-Scargle
+    max_period : integer
+        the maximum periods to examine in JTK and Lomb-Scargle
+    period_step : integer
+        the stepsize for building the range of periods to examine in JTK
+    filename : string
+        a name to include in the file name of the results
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    nr_permutations : integer
+        the number of permutations of the time points. Default: 1000
+    pydl_results : pandas.DataFrame or string
+        pyDL results of the same dataset, to also compute DLxJTK q-values. Default: None
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    num_proc : integer
+        the number of processes to use. Default: 2
+    seed : integer
+        seed of the permutations. Default: None
+    return_results : boolean
+        set to True to save the results and to return them as dataframes. Set to False to only save the results. Default: True
+
+    Returns
+    -------
+    if return_results == True
+        jtk_results, ls_results, dlxjtk_results : pandas.DataFrame
+            dlxjtk_results is None without pydl_results
+    if return_results == False
+        pyjtk_results_path, ls_results_path, dlxjtk_results_path : string
+            the names of the results, which can be used in load_results(). dlxjtk_results_path is None without pydl_results
+
+    Examples
+    --------
+    >>> jtk_df, ls_df, dlxjtk_df = run_permutation_fdr(data_df, 75, 100, 5, 'yeast_ma', pydl_results=pydl_df, num_proc=8)
+    >>> get_genelist_from_threshold(dlxjtk_df, 'q-value', 0.05)
+    '''
+
+    print(f'-- Running JTK and Lomb-Scargle on {nr_permutations} permutations of {len(dataset)} genes')
+    with trace_stage('compute'):
+        results = permutation_fdr(dataset, min_period, max_period, period_step, test_freq=test_freq, nr_permutations=nr_permutations,
+                                  pydl_results=pydl_results, ls_method=ls_method, num_proc=num_proc, seed=seed)
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    prefix = f'{filename}__{datetimestr}'
+    jtk_outfile, _, ls_outdir = periodicity_output_names(prefix, min_period, max_period, period_step, None, test_freq)
+    jtk_outfile = jtk_outfile.replace('.tsv', f'_fdr{nr_permutations}.tsv')
+    ls_outdir = f'{ls_outdir}_fdr{nr_permutations}'
+    dlxjtk_outfile = f'{prefix}_dlxjtk_fdr{nr_permutations}.tsv' if results[2] is not None else None
+    with trace_stage('serialize'):
+        results[0].to_csv(os.path.join('../results', jtk_outfile), sep='\t')
+        os.makedirs(os.path.join('../results', ls_outdir), exist_ok=True)
+        results[1].rename_axis('probe').reset_index().to_csv(os.path.join('../results', ls_outdir, f'{ls_outdir}_summary.tsv'), sep='\t',
+                                                            index_label='index')
+        if dlxjtk_outfile is not None:
+            results[2].to_csv(os.path.join('../results', dlxjtk_outfile), sep='\t')
+    outputs = (jtk_outfile, ls_outdir, dlxjtk_outfile)
+    print(f'-- Results saved as {", ".join(output for output in outputs if output is not None)} in the results directory')
+
+    return results if return_results else outputs
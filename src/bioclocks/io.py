@@ -0,0 +1,85 @@
+'''Loading datasets, the dataset table of contents and saved results.'''
+
+import os
+
+import pandas as pd
+
+DATADIR = '../datasets'
+
+def view_data_toc():
+    '''
+    Print the Dataset Table of Contents file
+
+    Returns
+    -------
+    data table of contents (data toc): a table describing each dataset available.
+
+    '''
+
+    toc_df = pd.read_csv(os.path.join(DATADIR, 'dataset_TOC.csv'), index_col=0, comment='#', dtype=str)
+
+    return toc_df
+
+
+def load_dataset(dataset_name):
+    '''
+    Load a dataset into a dataframe
+
+    Parameters
+    ----------
+    dataset_name: string
+        the file name of the dataset, with or without the file extension
+
+    Returns
+    -------
+    data_df : pandas.DataFrame
+        a time series gene expression dataset, where rows are genes and columns are time points
+
+    Examples
+    --------
+    >>> load_dataset('Scerevisiae_WT1_Microarray')
+
+    '''
+
+    if '.tsv' not in dataset_name:
+        dataset_name = dataset_name + '.tsv'
+    data_df = pd.read_csv(os.path.join(DATADIR, dataset_name), index_col=0, sep='\t', comment='#')
+
+    return data_df
+
+
+def load_results(results_name):
+    '''
+    Load results from periodicity alorgithms or LEMpy into a dataframe
+
+    Parameters
+    ----------
+    results_name : string
+        the name of the results file. You can copy this from the message '-- Results saved as/in <results_name> in the results directory' after running one of the periodicity algorithms or LEMpy
+
+    Returns
+    -------
+    results_df : pandas.DataFrame
+        the results from a periodicity alorgithm or LEMpy
+
+    Examples
+    --------
+    # pyDL, pyJTK and DLxJTK are input as a filename
+    >>> load_results('yeast_ma_test__20211005142544_dlxjtk.tsv')
+
+    # LEM and Lomb-Scargle are input as the top-level folder name
+    >>> load_results('yeast_ma_test__20211005135304_ls_p75-100f4')
+
+    '''
+
+    if '_ls_' in results_name:
+        results_df = pd.read_csv(os.path.join('../results', results_name, f'{os.path.basename(results_name)}_summary.tsv'), sep='\t', index_col=1, comment='#')
+        results_df = results_df.drop(labels='index', axis=1)
+    elif '_lempy' in results_name:
+        results_df = pd.read_csv(os.path.join('../results', results_name, 'summaries', 'ts0','allscores_ts0.tsv'), sep='\t', index_col=0, comment='#')
+    else:
+        if '.tsv' not in results_name:
+            results_name = results_name + '.tsv'
+        results_df = pd.read_csv(os.path.join('../results', results_name), index_col=0, sep='\t', comment='#')
+
+    return results_df
@@ -0,0 +1,328 @@
+'''
+JTK_CYCLE in Python, with its setup cached by sampling design.
+
+The JTK statistic of a gene for a reference waveform is Kendall's S between the gene's values and the reference, counted over pairs of
+observations from different time points. Its null distribution is the Jonckheere-Terpstra distribution for the number of replicates
+at each time point, computed exactly with Harding's (1984) recursion. The null distribution and the pairwise signs of every
+(period, phase) reference waveform depend only on the sampling design, not on the genes, so they are computed once per design and
+kept in memory and in JTK_CACHE_DIR. Repeated runs on datasets with the same design skip that setup entirely.
+'''
+
+import os
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .lombscargle import SEARCH_MODES, coarse_grid, _top_local_maxima, _refine_windows
+
+JTK_CACHE_DIR = '../tmp/jtk_cache'
+
+# designs already set up in this session, keyed by jtk_design_key
+_JTK_DESIGNS = dict()
+
+# bumped when the cached designs change, so that older cache files are rebuilt
+_DESIGN_VERSION = 2
+
+# genes x time point pairs compared at once
+_CHUNK_SIZE = 2**22
+
+
+def _jtk_null_counts(group_sizes):
+    # the number of orderings of the observations with J = 0, 1, ..., M, as exact integers. The counts reach N! / prod(size!), far
+    # beyond float64 precision, and the subtractions of the recursion cancel, so they are kept as Python integers
+    counts = np.ones(1, dtype=object)
+    nr_seen = 0
+    for size in group_sizes:
+        # adding a group of `size` observations to nr_seen multiplies the generating function by the Gaussian binomial
+        # [nr_seen + size choose size]_q = prod_j (1 - q^(nr_seen + j)) / (1 - q^j). Each factor divides exactly
+        counts = np.concatenate([counts, np.zeros(nr_seen * size, dtype=object)])
+        for j in range(1, size + 1):
+            shift = nr_seen + j
+            counts[shift:] -= counts[:-shift].copy()
+            for residue in range(j):
+                counts[residue::j] = np.cumsum(counts[residue::j])
+        nr_seen += size
+
+    return counts
+
+
+def _jtk_upper_tail(group_sizes):
+    # P(J >= j) for j = 0..M, each tail summed exactly before the one division, so small tails keep their full relative precision
+    counts = _jtk_null_counts(group_sizes)
+    tails = np.cumsum(counts[::-1])[::-1]
+
+    return np.array([tail / tails[0] for tail in tails], dtype=np.float64)
+
+
+def jtk_null_distribution(group_sizes):
+    '''
+    The exact null distribution of the Jonckheere-Terpstra statistic J for groups of the given sizes, by Harding's recursion.
+
+    Parameters
+    ----------
+    group_sizes : list
+        the number of observations (replicates) at each time point
+
+    Returns
+    -------
+    pmf : numpy.ndarray
+        the probability of J = 0, 1, ..., M, where M = (N^2 - sum(group_sizes^2)) / 2 is the number of pairs of observations from
+        different groups and N the number of observations
+    '''
+
+    counts = _jtk_null_counts(group_sizes)
+    total = counts.sum()
+
+    return np.array([count / total for count in counts], dtype=np.float64)
+
+
+def jtk_design_key(time_points, periods, phase_step):
+    '''The cache key of a sampling design: the distinct time points, their replicate counts, the periods and the phase step.'''
+
+    time_points = np.asarray(time_points, dtype=float)
+    distinct, counts = np.unique(time_points, return_counts=True)
+
+    return (tuple(np.round(distinct - distinct[0], 6)), tuple(counts), tuple(np.round(np.asarray(periods, dtype=float), 6)), round(float(phase_step), 6))
+
+
+def _jtk_references(periods, phase_step):
+    # the (period, phase) of every reference waveform, in the order of the design signs
+    return np.array([(period, phase) for period in periods for phase in np.arange(0, period - 1e-9, phase_step)])
+
+
+def _build_design(key):
+    # the pairs of observations in different groups, the sign of each pair in every reference waveform, and the null distribution
+    distinct, counts, periods, phase_step = np.array(key[0]), np.array(key[1]), key[2], key[3]
+    group = np.repeat(np.arange(len(distinct)), counts)
+    first, second = np.triu_indices(len(group), k=1)
+    between = group[first] != group[second]
+    first, second = first[between], second[between]
+
+    references = _jtk_references(periods, phase_step)
+    signs = list()
+    for period, phase in references:
+        waveform = np.cos(2 * np.pi * (distinct - phase) / period)
+        # round so that waveform values that are equal in theory tie exactly
+        waveform = np.round(waveform, 10)[group]
+        signs.append(np.sign(waveform[second] - waveform[first]))
+
+    return {'key': key,
+            'version': _DESIGN_VERSION,
+            'pairs': (first, second),
+            'references': references,
+            'signs': np.array(signs, dtype=np.float64).T,
+            'max_s': len(first),
+            # upper tail P(J >= j) for j = 0..M
+            'upper_tail': _jtk_upper_tail(counts)}
+
+
+def load_jtk_design(time_points, periods, phase_step, cache_dir=None):
+    '''
+    The JTK setup of a sampling design, from memory, from the cache directory, or computed and cached.
+
+    Parameters
+    ----------
+    time_points : list or numpy.ndarray
+        the sampling time of each observation. Repeated time points are replicates
+    periods : list
+        the periods of the reference waveforms, in the units of the time points
+    phase_step : float
+        the spacing of the reference phases
+    cache_dir : string
+        directory of the on-disk cache. Set to False to not use it. Default: None, for JTK_CACHE_DIR
+
+    Returns
+    -------
+    design : dict
+        'references' (the period and phase of each reference waveform), 'pairs', 'signs', 'max_s' and the null distribution 'upper_tail'
+    '''
+
+    key = jtk_design_key(time_points, periods, phase_step)
+    if key in _JTK_DESIGNS:
+        return _JTK_DESIGNS[key]
+
+    cache_dir = JTK_CACHE_DIR if cache_dir is None else cache_dir
+    cache_path = None
+    design = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as cache_file:
+                cached = pickle.load(cache_file)
+            if cached.get('key') == key and cached.get('version') == _DESIGN_VERSION:
+                design = cached
+
+    if design is None:
+        design = _build_design(key)
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            # write then rename, so that processes sharing the cache never read a partly written design
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump(design, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+
+    _JTK_DESIGNS[key] = design
+
+    return design
+
+
+def clear_jtk_cache(cache_dir=None):
+    '''Forget the designs set up in this session and delete the on-disk cache (cache_dir, default JTK_CACHE_DIR).'''
+
+    _JTK_DESIGNS.clear()
+    cache_dir = JTK_CACHE_DIR if cache_dir is None else cache_dir
+    if os.path.isdir(cache_dir):
+        for file in os.listdir(cache_dir):
+            if file.endswith('.pkl'):
+                os.remove(os.path.join(cache_dir, file))
+
+
+def _jtk_s(values, design):
+    # Kendall's S of each gene (row) against each reference waveform (column), in blocks of genes
+    first, second = design['pairs']
+    s = np.empty((len(values), design['signs'].shape[1]))
+    chunk = max(1, _CHUNK_SIZE // max(len(first), 1))
+    for start in range(0, len(values), chunk):
+        block = values[start:start + chunk]
+        s[start:start + chunk] = np.sign(block[:, second] - block[:, first]) @ design['signs']
+
+    return s
+
+
+def _jtk_values(values, design, s=None):
+    # the best reference of each gene and its p-values, for values sampled as in design
+    if s is None:
+        s = _jtk_s(values, design)
+    best = np.abs(s).argmax(axis=1)
+    best_s = s[np.arange(len(s)), best]
+
+    # two-sided p-value of J = (|S| + M) / 2
+    j = np.ceil((np.abs(best_s) + design['max_s']) / 2).astype(int)
+    p_value = np.minimum(2 * design['upper_tail'][j], 1.0)
+    period, phase = design['references'][best].T
+    # a negative correlation is a peak half a period later
+    phase = np.where(best_s < 0, (phase + period / 2) % period, phase)
+    tau = best_s / design['max_s']
+
+    return period, phase, tau, p_value
+
+
+def _nr_references(periods, phase_step):
+    # the number of (period, phase) reference waveforms, as built by _build_design
+    return len(_jtk_references(periods, phase_step))
+
+
+def _coarse_to_fine_values(values, time_points, periods, phase_step, coarse_periods, refine_peaks, refine_cutoff, cache_dir):
+    # _jtk_values for the best of a coarse period grid, refined on the full grid around the best coarse periods of each gene
+    coarse = coarse_grid(len(periods), coarse_periods, refine_peaks)
+    design = load_jtk_design(time_points, periods[coarse], phase_step, cache_dir=cache_dir)
+    s = _jtk_s(values, design)
+    best = list(_jtk_values(values, design, s))
+
+    # the best |S| at each coarse period
+    s = np.abs(s)
+    reference_period = np.searchsorted(np.round(periods[coarse], 6), design['references'][:, 0])
+    period_s = np.full((len(values), len(coarse)), -np.inf)
+    for position in range(len(coarse)):
+        period_s[:, position] = s[:, reference_period == position].max(axis=1)
+    peaks, is_peak = _top_local_maxima(period_s, refine_peaks)
+
+    refine = np.ones(len(values), dtype=bool) if refine_cutoff is None else best[3] < refine_cutoff
+    for rank in range(refine_peaks):
+        candidates = refine & is_peak[:, rank]
+        for position in np.unique(peaks[candidates, rank]):
+            genes = np.flatnonzero(candidates & (peaks[:, rank] == position))
+            window = _refine_windows(coarse, len(periods), position)
+            window_design = load_jtk_design(time_points, periods[window], phase_step, cache_dir=cache_dir)
+            window_best = _jtk_values(values[genes], window_design)
+            better = np.abs(window_best[2]) > np.abs(best[2][genes])
+            for column, window_column in zip(best, window_best):
+                column[genes[better]] = window_column[better]
+
+    return best
+
+
+def jtk_cycle(dataset, periods, phase_step=None, cache_dir=None, search='dense', coarse_periods=None, refine_peaks=2, refine_cutoff=None):
+    '''
+    Run JTK_CYCLE on every gene of a dataset. Missing values are left out per gene.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points. Repeated time points are replicates
+    periods : list
+        the periods to test, in the units of the time points
+    phase_step : float
+        the spacing of the tested phases. Default: None, for the median spacing of the time points
+    cache_dir : string
+        directory of the design cache. Set to False to not use it. Default: None, for JTK_CACHE_DIR
+    search : string
+        'dense' to test every period, or 'coarse_to_fine' to test coarse_periods of them and then every period around the
+        refine_peaks best coarse periods of each gene. The best tau over the periods can be jagged, so the refined result is
+        occasionally a lower local maximum than the dense one. Default: 'dense'
+    coarse_periods : integer
+        about how many periods the coarse scan tests, see coarse_grid. Default: None
+    refine_peaks : integer
+        the number of coarse periods of each gene to refine around. Default: 2
+    refine_cutoff : float
+        only refine genes whose coarse raw p-value is below this, the others keep their coarse result. Default: None, for all genes
+
+    Returns
+    -------
+    results_df : pandas.DataFrame
+        for each gene the best period, phase (peak time, 'lag') and Kendall's tau, its p-value, and the p-value Bonferroni adjusted
+        for the number of reference waveforms tested ('p-value'), sorted by p-value
+
+    Examples
+    --------
+    >>> jtk_cycle(data_df, [75, 80, 85, 90, 95, 100])
+
+    # 1 minute period resolution, refining only around the best periods of each gene
+    >>> jtk_cycle(data_df, np.arange(60, 121), search='coarse_to_fine')
+    '''
+
+    if search not in SEARCH_MODES:
+        raise ValueError(f'search must be one of {SEARCH_MODES}, not "{search}"')
+
+    time_points = pd.to_numeric(dataset.columns).to_numpy(dtype=float)
+    periods = np.atleast_1d(np.asarray(periods, dtype=float))
+    if phase_step is None:
+        distinct = np.unique(time_points)
+        phase_step = np.median(np.diff(distinct)) if len(distinct) > 1 else 1.0
+
+    values = dataset.to_numpy(dtype=float)
+    # the designs group the observations by time point in increasing order, the columns need not be
+    order = np.argsort(time_points, kind='stable')
+    time_points, values = time_points[order], values[:, order]
+    results = np.full((len(values), 5), np.nan)
+    missing = np.isnan(values)
+    if missing.any():
+        patterns, gene_pattern = np.unique(missing, axis=0, return_inverse=True)
+        gene_pattern = gene_pattern.ravel()
+    else:
+        patterns, gene_pattern = missing[:1], np.zeros(len(values), dtype=int)
+
+    for pattern_nr, pattern in enumerate(patterns):
+        genes = np.flatnonzero(gene_pattern == pattern_nr)
+        observed = ~pattern
+        if len(np.unique(time_points[observed])) < 3:
+            continue
+        if search == 'dense':
+            design = load_jtk_design(time_points[observed], periods, phase_step, cache_dir=cache_dir)
+            period, phase, tau, p_value = _jtk_values(values[genes][:, observed], design)
+        else:
+            period, phase, tau, p_value = _coarse_to_fine_values(values[genes][:, observed], time_points[observed], periods, phase_step,
+                                                                 coarse_periods, refine_peaks, refine_cutoff, cache_dir)
+        # the designs count time from the first observed time point, the lag is reported from the first time point of the dataset
+        phase = (phase + time_points[observed][0] - time_points[0]) % period
+        # Bonferroni over every reference waveform of the full grid, also when only part of it was tested
+        nr_references = _nr_references(periods, phase_step)
+        results[genes] = np.column_stack([period, phase, tau, p_value, np.minimum(p_value * nr_references, 1.0)])
+
+    results_df = pd.DataFrame(results, index=dataset.index, columns=['period', 'lag', 'tau', 'raw p-value', 'p-value'])
+    results_df[['raw p-value', 'p-value']] = results_df[['raw p-value', 'p-value']].fillna(1.0)
+
+    return results_df.sort_values('p-value', kind='stable')
@@ -0,0 +1,330 @@
+'''Running LEMpy and collecting its results.'''
+
+import os
+import re
+import time
+import datetime
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from configobj import ConfigObj
+
+from .preprocessing import preprocess
+from .tracing import traced, trace_stage
+
+TARGET_FILE_PATTERN = re.compile(r'^target_(.+)_ts\d+\.tsv$')
+MODEL_PATTERN = re.compile(r'^tf_(act|rep)\((.+)\)$')
+REGULATION_TYPE_MODELS = {'activator': 'tf_act', 'repressor': 'tf_rep'}
+NULL_MODEL_NAME = 'null_model'
+
+@traced
+def aggregate_lem_results(lem_results_path: str) -> DataFrame:
+    '''
+    Aggregate per-target LEMpy result files into a single dataframe.
+
+    Parameters
+    ----------
+    lem_results_path : str
+        Path to the top-level LEMpy results directory that contains the `targets` subdirectory.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Combined LEMpy results with parsed regulator information and normalized loss.
+    '''
+
+    def _parse_model(model_name: str):
+        if not isinstance(model_name, str):
+            return (np.nan, np.nan)
+        match = MODEL_PATTERN.match(model_name)
+        if match:
+            regulation_type = 'activator' if match.group(1) == 'act' else 'repressor'
+            return (match.group(2), regulation_type)
+        return (np.nan, np.nan)
+
+    resolved_path = Path(lem_results_path).expanduser()
+    if not resolved_path.is_absolute():
+        resolved_path = (Path.cwd() / resolved_path).resolve()
+    if not resolved_path.is_dir():
+        raise FileNotFoundError(f'LEMpy results path not found: {lem_results_path}')
+
+    targets_root = resolved_path / 'targets'
+    if not targets_root.is_dir():
+        raise FileNotFoundError(f'Expected targets directory at: {targets_root}')
+
+    ts_dirs = sorted(
+        d for d in targets_root.iterdir()
+        if d.is_dir() and d.name.startswith('ts')
+    )
+    if not ts_dirs:
+        raise FileNotFoundError(f'No time-series subdirectories found in {targets_root}')
+
+    target_frames = []
+    with trace_stage('parse'):
+        for ts_dir in ts_dirs:
+            target_files = sorted(ts_dir.glob('target_*.tsv'))
+            for target_file in target_files:
+                match = TARGET_FILE_PATTERN.match(target_file.name)
+                if not match:
+                    raise ValueError(f'Unexpected target filename format: {target_file}')
+                target_frames.append((match.group(1), pd.read_csv(target_file, sep='\t', index_col=0, comment='#')))
+
+    aggregated_frames = []
+    with trace_stage('compute'):
+        for target_name, target_df in target_frames:
+            target_df = target_df.rename_axis('model').reset_index()
+            target_df['target'] = target_name
+            target_df['loss'] = pd.to_numeric(target_df['loss'], errors='coerce')
+
+            parsed = target_df['model'].apply(_parse_model)
+            parsed_df = pd.DataFrame(parsed.tolist(), columns=['regulator', 'regulation_type'])
+            target_df[['regulator', 'regulation_type']] = parsed_df
+
+            null_mask = target_df['model'] == NULL_MODEL_NAME
+            if null_mask.any():
+                null_loss = target_df.loc[null_mask, 'loss'].iloc[0]
+                if pd.isna(null_loss) or null_loss == 0:
+                    target_df['norm_loss'] = np.nan
+                else:
+                    target_df['norm_loss'] = target_df['loss'] / null_loss
+            else:
+                target_df['norm_loss'] = np.nan
+
+            target_df = target_df.loc[~null_mask]
+            aggregated_frames.append(target_df)
+
+    if not aggregated_frames:
+        raise FileNotFoundError(f'No target_*.tsv files found in {targets_root}')
+
+    return pd.concat(aggregated_frames, ignore_index=True)
+
+
+def filter_top_regulators_per_target(lem_results: DataFrame, k: int) -> DataFrame:
+    '''
+    Select the top-k regulators per target based on posterior likelihood (pld).
+
+    Parameters
+    ----------
+    lem_results : pandas.DataFrame
+        DataFrame produced by aggregate_lem_results containing LEMpy scores.
+    k : int
+        Number of regulators to keep for each target. Must be >= 1.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Filtered DataFrame with at most k rows per target, ordered by decreasing pld.
+    '''
+
+    if not isinstance(k, int) or k <= 0:
+        raise ValueError('k must be a positive integer')
+
+    required_columns = {'target', 'pld'}
+    missing_columns = required_columns - set(lem_results.columns)
+    if missing_columns:
+        raise KeyError(f'lem_results is missing required columns: {missing_columns}')
+
+    sorted_df = lem_results.sort_values(by=['target', 'pld'], ascending=[True, False])
+    ranked_df = sorted_df.groupby('target', group_keys=False).head(k).copy()
+
+    return ranked_df
+
+def default_arguments():
+    '''function for making a LEMpy config file filled in with default arguments'''
+
+    seed = round(time.time())
+
+    def_arg_dict = dict()
+
+    def_arg_dict['output_dir'] = '../results'
+
+    # default settings for LEMpy
+    def_arg_dict['loss'] = 'euc_loss'
+    def_arg_dict['param_bounds'] = 'tf_param_bounds'
+    def_arg_dict['prior'] = 'uniform_prior'
+    def_arg_dict['normalize'] = True
+    def_arg_dict['inv_temp'] = 1
+    def_arg_dict['seed'] = seed
+
+    def_arg_dict['minimizer_params'] = dict()
+    def_arg_dict['minimizer_params']['niter'] = 200
+    def_arg_dict['minimizer_params']['T'] = 1
+    def_arg_dict['minimizer_params']['stepsize'] = .5
+    def_arg_dict['minimizer_params']['interval'] = 10
+    def_arg_dict['minimizer_params']['disp'] = False
+    def_arg_dict['minimizer_params']['seed'] = seed
+
+    return def_arg_dict
+
+
+def gen_lempy_config(co, target_list, repressor_list, activator_list, filename, datetimestr):
+    '''function for making LEMpy config file'''
+
+    def_arg_dict = default_arguments()
+    lempy_config = ConfigObj(def_arg_dict)
+
+    # Walk the config file and reduce the subsections by one
+    def reduce_subsections(section, key):
+        if section.depth > 1:
+            section.depth = section.depth - 1
+
+    lempy_config.walk(reduce_subsections)
+
+    # Pass in pipeline config arguments needed by LEMpy
+    lempy_config['data_files'] = co['data_files']
+    lempy_config['verbose'] = co['verbose']
+    lempy_config['num_proc'] = co['num_proc']
+
+    # Specify the default output location needed for the next step
+    lempy_config['output_dir'] = os.path.join(lempy_config['output_dir'], f'{filename}__{datetimestr}_lempy')
+
+    # Populate LEMpy config file with targets and regulators sections based on DLxJTK output and gene annotations
+    lempy_config['targets'] = dict()
+    lempy_config['regulators'] = dict()
+
+    # add targets
+    for target in target_list:
+        # Gene is an allowed target
+        lempy_config['targets'][target] = ''
+
+    # regulators and their mode of regulation
+    for gene in list(set(repressor_list + activator_list)):
+        lempy_config['regulators'][gene] = []
+
+    for rep_reg in repressor_list:
+        # Gene is allowed this model of regulation
+        lempy_config['regulators'][rep_reg].append('tf_rep')
+    for act_reg in activator_list:
+        # Gene is allowed this model of regulation
+        lempy_config['regulators'][act_reg].append('tf_act')
+
+    lempy_config.filename = os.path.join(lempy_config['output_dir'], f'lempy_{datetimestr}_config.txt')
+
+    return lempy_config
+
+
+@traced
+def run_lem(dataset, target_list, repressor_list, activator_list, filename, num_proc=2, verbose=False, return_results=True, preprocessing=None):
+    '''
+    Run LEMpy on a time series dataset, specifying what genes are targets, transcriptional repressors and transcription activators.
+
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        the time series dataset as a dataframe. This dataframe must be the same as was used in the periodicity algorithms.
+    target_list : list
+        a list of gene names which LEM will treat as targets
+    repressor_list : list
+        a list of gene names which LEM will treat as transcriptional repressors
+    activator_list : list
+        a list of gene names which LEM will treat as transcription activators
+    num_proc : integer
+        the number of processors to use. Default: 2
+    verbose : boolean
+        tells LEMpy to print out statements from the code. Default: False
+    return_results : boolean
+        set to True to save the results in a file and to return the results as a dataframe. Set to False to only save the results to a file. Default: True
+    preprocessing : list
+        preprocessing steps to run on the dataset first, see preprocess. Pass the same steps as to run_periodicity to reuse its cached result. Default: None
+
+    Returns
+    -------
+    if return_results == True
+        all_scores_df : pandas.DataFrame
+            LEMpy all scores results
+    if results_results == False
+        outdir : string
+            the directory name of the LEMpy results. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the all scores results as a dataframe and save all LEMpy results to the results directory
+    >>> run_lem(data_df, ['YHP1', 'YOX1'], ['SWI4'], ['SWI4', 'YHP1', 'YOX1'], 'yeast_ma')
+
+    # only save the results to a directory and return the directory name
+    >>> run_lem(data_df, ['YHP1', 'YOX1'], ['SWI4'], ['SWI4', 'YHP1', 'YOX1'], 'yeast_ma', return_results=False)
+
+    Notes
+    -----
+    * Gene names must be in the time series dataset.
+
+    * A gene can be both a target and a regulator, additionally, a gene that is a regulator can be a repressor and an activator.
+    Therefore, depending on the role of the gene, it can be in any combination of the three lists, inlcuding all of them.
+
+    '''
+
+    if preprocessing is not None:
+        with trace_stage('preprocess'):
+            dataset = preprocess(dataset, preprocessing)
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+    tmp_data_file = f'../tmp/tmp_{datetimestr}.tsv'
+    with trace_stage('serialize'):
+        dataset.to_csv(tmp_data_file, sep='\t')
+
+        user_dict = {'data_files':[tmp_data_file],
+                    'num_proc':num_proc,
+                    'verbose':verbose}
+
+        user_config = ConfigObj(user_dict)
+        full_lem_config = gen_lempy_config(user_config, target_list, repressor_list, activator_list, filename, datetimestr)
+        os.makedirs(os.path.split(full_lem_config.filename)[0])
+        full_lem_config.write()
+
+    lempy_path = '../src/lempy/lempy.py'
+    full_cmd = ['mpiexec', '-n', str(num_proc), 'python', lempy_path, full_lem_config.filename]
+
+    print(f'-- Running LEMpy on dataset {tmp_data_file}')
+
+    with trace_stage('spawn'):
+        submit_cmd = subprocess.Popen(full_cmd,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+
+    print(f'-- Command used: {" ".join(full_cmd)}')
+
+    with trace_stage('compute'):
+        output, error = submit_cmd.communicate()
+    str_error = error.decode("utf-8").split('\n')
+    str_output = output.decode("utf-8").split('\n')
+    # print(str_output)
+    if len(str_error) > 1:
+        os.remove(tmp_data_file)
+        print(f'-- Error:')
+        [print(e) for e in str_error]
+    else:
+        print(f'-- Results saved in {os.path.split(full_lem_config.filename)[0]}')
+
+        with trace_stage('parse'):
+            all_scores_file = os.path.join('summaries', 'ts0', 'allscores_ts0.tsv')
+            all_scores_df = pd.read_csv(os.path.join(os.path.split(full_lem_config.filename)[0], all_scores_file), sep='\t', index_col=0, comment='#')
+
+            targets_dir = os.path.join(os.path.split(full_lem_config.filename)[0], 'targets', 'ts0')
+            target_dfs = list()
+            localmin_dfs = list()
+            for file in os.listdir(targets_dir):
+                if 'target' in file:
+                    tar_df = pd.read_csv(os.path.join(targets_dir, file), sep='\t', index_col=0, comment='#')
+                    genename = file.split('_')[1]
+                    tar_df['target'] = genename
+                    tar_col = tar_df.pop('target')
+                    tar_df.insert(0, 'target', tar_col)
+                    target_dfs.append(tar_df)
+                if 'localmin' in file:
+                    localmin_dfs.append(pd.read_csv(os.path.join(targets_dir, file), sep='\t', index_col=0, comment='#'))
+
+        # all_target_df = pd.concat(target_dfs)
+        # all_localmin_df = pd.concat(localmin_dfs)
+
+        os.remove(tmp_data_file)
+
+        if return_results:
+            return all_scores_df
+        else:
+            outdir = f'{filename}__{datetimestr}_lempy'
+            return outdir
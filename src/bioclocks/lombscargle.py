@@ -0,0 +1,399 @@
+'''
+Lomb-Scargle periodograms computed in Python, for all genes of a dataset at once.
+
+'exact' evaluates the normalized periodogram of ComputeLombScargle in src/ls/LombScargle.R directly, computing the trig terms once
+for all genes that share time points and the sums over time points as matrix products. 'fast' computes the same periodogram with
+the extirpolation and FFT method of Press & Rybicki (1989), in O(N log N) operations per gene for N evenly spaced test frequencies
+instead of O(N x time points). Its FFT grid is about ten times larger than N whatever the number of time points, so 'exact' is
+faster up to about a thousand time points: on the bundled datasets (at most 50 time points) it is 10 to 40 times faster, and 'fast'
+only pays off for long series (see benchmarks/lomb_scargle.py). With the default oversampling of 10 and extirpolation order of 10
+the 'fast' normalized power differs from the exact power by less than FAST_TOLERANCE on every bundled dataset at the run_ls
+default of 4 test frequencies per time point, and at 20. Increase oversampling or order for more accuracy. For evenly sampled data
+both methods are ill-conditioned at exactly the Nyquist period (twice the sampling interval), where the periodogram is 0/0.
+'''
+
+import numpy as np
+import pandas as pd
+
+LS_METHODS = ['exact', 'fast']
+
+# documented bound on |fast - exact| normalized power with the default oversampling and order (see benchmarks/lomb_scargle.py)
+FAST_TOLERANCE = 1e-3
+
+# 'dense' scans every test frequency, 'coarse_to_fine' scans a coarse grid and then the full grid around each gene's best peaks
+SEARCH_MODES = ['dense', 'coarse_to_fine']
+
+# the columns of the LombScargle.R summary that are computed here, in its order. PhaseShift and PhaseShiftHeight, the peak of a loess
+# fit to the time course, are left out
+SUMMARY_COLUMNS = ['PeakIndex', 'PeakSPD', 'Period', 'p-value', 'N', 'Nindependent', 'Nyquist']
+
+# the number of (gene, grid point) or (frequency, time point) values processed at a time
+_CHUNK_SIZE = 2**22
+
+
+def test_frequencies(min_period, max_period, test_freq, nr_time_points):
+    '''
+    The evenly spaced test frequencies between 1 / max_period and 1 / min_period, test_freq x nr_time_points of them as in
+    _run_ls_params.R.
+
+    Parameters
+    ----------
+    min_period : float
+        the shortest period to test
+    max_period : float
+        the longest period to test
+    test_freq : integer
+        the number of test frequencies per time point
+    nr_time_points : integer
+        the number of time points (columns) of the dataset
+
+    Returns
+    -------
+    frequencies : numpy.ndarray
+        increasing test frequencies, in cycles per time unit
+    '''
+
+    if not 0 < min_period <= max_period:
+        raise ValueError('min_period must be positive and at most max_period')
+    nr_frequencies = int(round(test_freq * nr_time_points))
+    if nr_frequencies < 1:
+        raise ValueError('test_freq x nr_time_points must be at least 1')
+
+    return np.linspace(1 / max_period, 1 / min_period, nr_frequencies)
+
+
+def independent_frequencies(nr_time_points):
+    '''The number of independent frequencies of Horne & Baliunas (1986), as NHorneBaliunas in LombScargle.R.'''
+
+    return np.maximum(np.trunc(-6.362 + 1.193 * nr_time_points + 0.00098 * nr_time_points**2), 1)
+
+
+def _nyquist_frequency(time_points):
+    # the Nyquist frequency of LombScargle.R, from the span and number of the observed time points
+    span = np.max(time_points) - np.min(time_points) if len(time_points) > 0 else 0
+
+    return len(time_points) / (2 * span) if span > 0 else np.nan
+
+
+def _summary_frame(results, genes):
+    # the results of each gene in the SUMMARY_COLUMNS, sorted by p-value
+    results_df = pd.DataFrame(results, index=genes, columns=SUMMARY_COLUMNS)
+    results_df['p-value'] = results_df['p-value'].fillna(1.0)
+    results_df['PeakIndex'] = results_df['PeakIndex'].astype('Int64')
+    results_df[['N', 'Nindependent']] = results_df[['N', 'Nindependent']].astype(int)
+
+    return results_df.sort_values('p-value', kind='stable')
+
+
+def _exact_power(t, residuals, frequencies):
+    # the unnormalized periodogram of each row of residuals, from the definition
+    power = np.empty((residuals.shape[0], len(frequencies)))
+    chunk = max(1, _CHUNK_SIZE // len(t))
+    for start in range(0, len(frequencies), chunk):
+        omega = 2 * np.pi * frequencies[start:start + chunk, None]
+        two_omega_t = 2 * omega * t
+        tau = np.arctan2(np.sin(two_omega_t).sum(axis=1), np.cos(two_omega_t).sum(axis=1))[:, None] / (2 * omega)
+        cos_t = np.cos(omega * (t - tau))
+        sin_t = np.sin(omega * (t - tau))
+        power[:, start:start + chunk] = (residuals @ cos_t.T)**2 / (cos_t**2).sum(axis=1) + (residuals @ sin_t.T)**2 / (sin_t**2).sum(axis=1)
+
+    return power
+
+
+def _extirpolation_weights(x, nfft, order):
+    # index and weight of the order grid points each x is spread over, so that sum_j weight_j * f(index_j) ~ f(x) for smooth periodic f
+    index = np.zeros((len(x), order), dtype=int)
+    weight = np.zeros((len(x), order))
+
+    on_grid = x % 1 == 0
+    index[on_grid, 0] = x[on_grid].astype(int)
+    weight[on_grid, 0] = 1
+
+    x = x[~on_grid]
+    low = np.clip((x - order // 2).astype(int), 0, nfft - order)
+    numerator = np.prod(x - low - np.arange(order)[:, None], axis=0)
+    denominator = float(np.prod(np.arange(1, order)))
+    for j in range(order):
+        if j > 0:
+            denominator *= j / (j - order)
+        grid_point = low + (order - 1 - j)
+        index[~on_grid, j] = grid_point
+        weight[~on_grid, j] = numerator / (denominator * (x - grid_point))
+
+    return index, weight
+
+
+def _trig_sums(t, h, f0, df, nfreq, oversampling, order):
+    # sum_i h_i exp(2 pi i f t_i) for f = f0 + k df, k < nfreq, for each row of h, by extirpolation onto a regular grid and an FFT
+    nfft = max(1 << int(np.ceil(np.log2(nfreq * oversampling))), 2 * order)
+    h = h * np.exp(2j * np.pi * f0 * t)
+    index, weight = _extirpolation_weights((t * nfft * df) % nfft, nfft, order)
+
+    sums = np.empty((h.shape[0], nfreq), dtype=complex)
+    chunk = max(1, _CHUNK_SIZE // nfft)
+    for start in range(0, h.shape[0], chunk):
+        h_chunk = h[start:start + chunk]
+        rows = h_chunk.shape[0]
+        flat_index = (np.arange(rows)[:, None, None] * nfft + index[None]).ravel()
+        spread = (h_chunk[:, :, None] * weight[None]).ravel()
+        grid = np.bincount(flat_index, weights=spread.real, minlength=rows * nfft) \
+            + 1j * np.bincount(flat_index, weights=spread.imag, minlength=rows * nfft)
+        sums[start:start + chunk] = np.fft.ifft(grid.reshape(rows, nfft), axis=1)[:, :nfreq] * nfft
+
+    return sums
+
+
+def _fast_power(t, residuals, frequencies, oversampling, order):
+    # the unnormalized periodogram of each row of residuals by the Press & Rybicki method
+    f0 = frequencies[0]
+    df = frequencies[1] - frequencies[0] if len(frequencies) > 1 else 1.0
+    nfreq = len(frequencies)
+
+    yc_ys = _trig_sums(t, residuals, f0, df, nfreq, oversampling, order)
+    c2_s2 = _trig_sums(t, np.ones((1, len(t))), 2 * f0, 2 * df, nfreq, oversampling, order)[0]
+    c_h, s_h = yc_ys.real, yc_ys.imag
+    c_2, s_2 = c2_s2.real, c2_s2.imag
+
+    # the time offset tau of LombScargle.R, through cos(2 omega tau) and sin(2 omega tau), then cos and sin of omega tau
+    hypotenuse = np.hypot(c_2, s_2)
+    cos_2tau = np.divide(c_2, hypotenuse, out=np.ones_like(c_2), where=hypotenuse > 0)
+    sin_2tau = np.divide(s_2, hypotenuse, out=np.zeros_like(s_2), where=hypotenuse > 0)
+    cos_tau = np.sqrt(0.5 * (1 + cos_2tau))
+    sin_tau = np.sign(sin_2tau) * np.sqrt(0.5 * (1 - cos_2tau))
+
+    yc = c_h * cos_tau + s_h * sin_tau
+    ys = s_h * cos_tau - c_h * sin_tau
+    cc = 0.5 * (len(t) + c_2 * cos_2tau + s_2 * sin_2tau)
+    ss = len(t) - cc
+
+    return yc**2 / cc + ys**2 / ss
+
+
+def lomb_scargle_periodogram(time_points, values, frequencies, method='exact', oversampling=10, order=10):
+    '''
+    The normalized Lomb-Scargle periodogram of each row of values, as ComputeLombScargle in LombScargle.R.
+
+    Parameters
+    ----------
+    time_points : list or numpy.ndarray
+        the sampling times, which need not be evenly spaced or sorted
+    values : numpy.ndarray
+        expression values with one row per gene and one column per time point, without missing values
+    frequencies : numpy.ndarray
+        the test frequencies. Must be evenly spaced for the 'fast' method, e.g. from test_frequencies
+    method : string
+        'exact' or 'fast'. Default: 'exact'
+    oversampling : integer
+        'fast' only: the FFT grid size relative to the number of frequencies. Larger is more accurate. Default: 10
+    order : integer
+        'fast' only: the number of grid points each sample is spread over. Larger is more accurate. Default: 10
+
+    Returns
+    -------
+    power : numpy.ndarray
+        the spectral power density of each gene at each frequency, normalized by twice the variance of the gene. Genes with no
+        variance have NaN power
+
+    Examples
+    --------
+    >>> frequencies = test_frequencies(75, 100, 4, len(data_df.columns))
+    >>> power = lomb_scargle_periodogram(data_df.columns.astype(float), data_df.to_numpy(), frequencies)
+    '''
+
+    if method not in LS_METHODS:
+        raise ValueError(f'method must be one of {LS_METHODS}, not "{method}"')
+
+    t = np.asarray(time_points, dtype=float)
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    frequencies = np.asarray(frequencies, dtype=float)
+    if values.shape[1] != len(t):
+        raise ValueError(f'values has {values.shape[1]} columns but there are {len(t)} time points')
+    if np.isnan(values).any():
+        raise ValueError('values contains missing values, remove them first (lomb_scargle handles them per gene)')
+
+    t = t - t.min()
+    residuals = values - values.mean(axis=1, keepdims=True)
+    if method == 'exact':
+        power = _exact_power(t, residuals, frequencies)
+    else:
+        if len(frequencies) > 1 and not np.allclose(np.diff(frequencies), frequencies[1] - frequencies[0], rtol=1e-6, atol=0):
+            raise ValueError('The fast method needs evenly spaced frequencies, use test_frequencies or method="exact"')
+        power = _fast_power(t, residuals, frequencies, oversampling, order)
+
+    variance = values.var(axis=1, ddof=1) if len(t) > 1 else np.zeros(values.shape[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        power = power / (2 * variance[:, None])
+    power[variance <= 0] = np.nan
+
+    return power
+
+
+def coarse_grid(nr_points, coarse_points=None, refine_peaks=2):
+    '''
+    Every k-th point of a grid of nr_points, for a coarse-to-fine search.
+
+    Parameters
+    ----------
+    nr_points : integer
+        the size of the full grid
+    coarse_points : integer
+        about how many coarse points to use. Default: None, for sqrt(2 * refine_peaks * nr_points), which minimizes the coarse
+        points plus the points in the refinement windows (about 2 * nr_points / coarse_points per refined peak)
+    refine_peaks : integer
+        the number of peaks that will be refined. Default: 2
+
+    Returns
+    -------
+    coarse : numpy.ndarray
+        the indices of the coarse points in the full grid
+    '''
+
+    if coarse_points is None:
+        coarse_points = np.sqrt(2 * refine_peaks * nr_points)
+    step = max(1, int(np.ceil(nr_points / max(coarse_points, 1))))
+
+    return np.arange(0, nr_points, step)
+
+
+def _top_local_maxima(scores, nr_peaks):
+    # positions of the nr_peaks highest local maxima of each row of scores (ties to the first), highest first
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    padded = np.pad(scores, ((0, 0), (1, 1)), constant_values=-np.inf)
+    is_peak = (scores > padded[:, :-2]) & (scores >= padded[:, 2:])
+    # flat rows have no strict maximum, fall back to their first highest point
+    is_peak[np.arange(len(scores)), scores.argmax(axis=1)] = True
+    ranked = np.argsort(-np.where(is_peak, scores, -np.inf), axis=1, kind='stable')[:, :nr_peaks]
+
+    return ranked, np.take_along_axis(is_peak, ranked, axis=1)
+
+
+def _refine_windows(coarse, nr_points, position):
+    # the full grid indices between the coarse neighbours of coarse point position
+    start = coarse[position - 1] if position > 0 else 0
+    stop = coarse[position + 1] if position + 1 < len(coarse) else nr_points - 1
+
+    return np.arange(start, stop + 1)
+
+
+def _coarse_to_fine_power(t, values, frequencies, coarse_points, refine_peaks, min_power, method, oversampling, order):
+    # the peak frequency index and power of each gene, scanning the full grid only around the best coarse peaks of the genes whose
+    # coarse peak power is above min_power
+    coarse = coarse_grid(len(frequencies), coarse_points, refine_peaks)
+    power = lomb_scargle_periodogram(t, values, frequencies[coarse], method=method, oversampling=oversampling, order=order)
+    has_power = ~np.isnan(power).all(axis=1)
+    peaks, is_peak = _top_local_maxima(power, refine_peaks)
+    best = coarse[peaks[:, 0]]
+    best_power = power[np.arange(len(values)), peaks[:, 0]]
+
+    refine = has_power if min_power is None else has_power & (best_power > min_power)
+    for rank in range(refine_peaks):
+        candidates = refine & is_peak[:, rank]
+        for position in np.unique(peaks[candidates, rank]):
+            genes = np.flatnonzero(candidates & (peaks[:, rank] == position))
+            window = _refine_windows(coarse, len(frequencies), position)
+            # the windows are short and unevenly placed, so they are computed exactly
+            window_power = lomb_scargle_periodogram(t, values[genes], frequencies[window], method='exact')
+            window_peak = np.nanargmax(window_power, axis=1)
+            window_best = window_power[np.arange(len(genes)), window_peak]
+            better = window_best > best_power[genes]
+            best[genes[better]] = window[window_peak[better]]
+            best_power[genes[better]] = window_best[better]
+
+    return np.where(has_power, best, 0), np.where(has_power, best_power, np.nan)
+
+
+def lomb_scargle(dataset, min_period, max_period, test_freq, method='exact', oversampling=10, order=10, search='dense',
+                 coarse_points=None, refine_peaks=2, refine_cutoff=None, nr_time_points=None):
+    '''
+    Find the peak Lomb-Scargle period and its p-value for every gene in a dataset. Missing values are left out per gene.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : float
+        the shortest period to test
+    max_period : float
+        the longest period to test
+    test_freq : integer
+        the number of evenly spaced test frequencies between 1 / max_period and 1 / min_period per time point (column) of the
+        dataset, as in run_ls with method 'R'
+    method : string
+        'exact' or 'fast', see lomb_scargle_periodogram. Default: 'exact'
+    oversampling, order : integer
+        accuracy parameters of the 'fast' method, see lomb_scargle_periodogram. Default: 10, 10
+    search : string
+        'dense' to compute the periodogram at every test frequency, or 'coarse_to_fine' to compute it at coarse_points of them and
+        then at every test frequency around the refine_peaks highest coarse peaks of each gene. Default: 'dense'
+    coarse_points : integer
+        about how many frequencies the coarse scan uses, see coarse_grid. Default: None
+    refine_peaks : integer
+        the number of coarse peaks of each gene to refine. Default: 2
+    refine_cutoff : float
+        only refine genes whose coarse p-value is below this, the others keep their coarse peak. Default: None, for all genes
+    nr_time_points : integer
+        the number of time points the frequency grid is sized for, e.g. to scan replicates placed side by side on the grid of one
+        replicate. Default: None, for the number of columns of dataset
+
+    Returns
+    -------
+    results_df : pandas.DataFrame
+        the LombScargle.R summary columns but PhaseShift and PhaseShiftHeight (see SUMMARY_COLUMNS): for each gene the test
+        frequency with the highest power, counted from 1 (PeakIndex), that power (PeakSPD), its period (Period) and p-value
+        (p-value), the number of time points (N), the number of independent frequencies used for the p-value (Nindependent) and the
+        Nyquist frequency of the observed time points (Nyquist), sorted by p-value
+
+    Examples
+    --------
+    >>> lomb_scargle(data_df, 75, 100, 4)
+
+    # a dense scan of a long time series
+    >>> lomb_scargle(long_df, 20, 500, 20, method='fast')
+
+    # a 50 times finer grid, refining only around the best peaks
+    >>> lomb_scargle(data_df, 60, 120, 200, search='coarse_to_fine')
+    '''
+
+    if search not in SEARCH_MODES:
+        raise ValueError(f'search must be one of {SEARCH_MODES}, not "{search}"')
+
+    time_points = pd.to_numeric(dataset.columns).to_numpy(dtype=float)
+    values = dataset.to_numpy(dtype=float)
+    frequencies = test_frequencies(min_period, max_period, test_freq, len(time_points) if nr_time_points is None else nr_time_points)
+
+    results = np.full((values.shape[0], len(SUMMARY_COLUMNS)), np.nan)
+    missing = np.isnan(values)
+    if missing.any():
+        patterns, gene_pattern = np.unique(missing, axis=0, return_inverse=True)
+        gene_pattern = gene_pattern.ravel()
+    else:
+        patterns, gene_pattern = missing[:1], np.zeros(values.shape[0], dtype=int)
+
+    for pattern_nr, pattern in enumerate(patterns):
+        genes = np.flatnonzero(gene_pattern == pattern_nr)
+        observed = ~pattern
+        nr_observed = observed.sum()
+        results[genes, 4] = nr_observed
+        results[genes, 5] = independent_frequencies(nr_observed)
+        results[genes, 6] = _nyquist_frequency(time_points[observed])
+        if nr_observed < 3:
+            continue
+        if search == 'dense':
+            power = lomb_scargle_periodogram(time_points[observed], values[genes][:, observed], frequencies, method=method,
+                                             oversampling=oversampling, order=order)
+            has_power = ~np.isnan(power).all(axis=1)
+            peak = np.nanargmax(np.where(has_power[:, None], power, 0), axis=1)
+            peak_power = power[np.arange(len(genes)), peak]
+        else:
+            # the power whose p-value is refine_cutoff
+            min_power = None if refine_cutoff is None else -np.log(-np.expm1(np.log1p(-refine_cutoff) / results[genes[0], 5]))
+            peak, peak_power = _coarse_to_fine_power(time_points[observed], values[genes][:, observed], frequencies, coarse_points,
+                                                     refine_peaks, min_power, method, oversampling, order)
+            has_power = ~np.isnan(peak_power)
+        results[genes, 0] = np.where(has_power, peak + 1, np.nan)
+        results[genes, 1] = peak_power
+        results[genes, 2] = np.where(has_power, 1 / frequencies[peak], np.nan)
+        # 1 - (1 - exp(-P))^Nindependent, accurate for small p-values
+        results[genes, 3] = -np.expm1(results[genes, 5] * np.log1p(-np.exp(-peak_power)))
+
+    return _summary_frame(results, dataset.index)
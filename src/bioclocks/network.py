@@ -0,0 +1,640 @@
+'''Building, drawing, analysing and exporting regulatory networks inferred by LEMpy.'''
+
+import re
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .lem import REGULATION_TYPE_MODELS
+
+EDGE_PATTERN = re.compile(r'^([^=\n]+)=(tf_\w+)\(([^\n]*)\)$', re.MULTILINE)
+
+CYTOSCAPE_STYLES = [{'selector': 'node', 'style': {'content': 'data(label)'}},
+    {'selector': 'edge', 'style': {'curve-style': 'bezier'}},
+    {'selector': '.rep', 'style': {'target-arrow-color': 'red', 'line-color': 'red', 'target-arrow-shape': 'tee'}},
+    {'selector': '.act', 'style': {'target-arrow-color': 'green', 'target-arrow-shape': 'triangle', 'line-color': 'green'}}]
+
+
+def lem_edges_to_dataframe(lem_edge_list):
+    '''
+    Parse a list of edges in LEM specification into an edge dataframe.
+
+    Parameters
+    ----------
+    lem_edge_list : list
+        a list of LEM edges. Each item in the list is in the format 'target=tf_rep(source)'. This is how LEM specifies an edge.
+
+    Returns
+    -------
+    edges : pandas.DataFrame
+        one row per edge with the columns 'source', 'target' and 'type_reg' ('tf_act' or 'tf_rep')
+
+    Examples
+    --------
+    >>> lem_edges_to_dataframe(['SWI4=tf_rep(YHP1)', 'SWI4=tf_rep(YOX1)', 'SWI4=tf_rep(NRM1)'])
+    '''
+
+    lem_edge_list = list(lem_edge_list)
+
+    # parse every edge in one regex pass over the joined list
+    parsed = EDGE_PATTERN.findall('\n'.join(lem_edge_list))
+    if len(parsed) != len(lem_edge_list):
+        invalid = [lem_edge for lem_edge in lem_edge_list if not EDGE_PATTERN.fullmatch(lem_edge)]
+        raise ValueError(f'Edges not in LEM specification: {invalid[:5]}')
+
+    edges = pd.DataFrame(parsed, columns=['target', 'type_reg', 'source'])
+
+    return edges[['source', 'target', 'type_reg']]
+
+
+def lem_results_to_edges(lem_results):
+    '''
+    Convert LEMpy results into an edge dataframe, keeping their score columns.
+
+    Parameters
+    ----------
+    lem_results : pandas.DataFrame
+        either the all_scores dataframe returned by run_lem or load_results (indexed by LEM edges), or the output of aggregate_lem_results or
+        filter_top_regulators_per_target (with `target`, `regulator` and `regulation_type` columns)
+
+    Returns
+    -------
+    edges : pandas.DataFrame
+        one row per edge with the columns 'source', 'target', 'type_reg' and the numeric score columns of lem_results (e.g. 'pld', 'loss', 'norm_loss')
+    '''
+
+    scores = lem_results.select_dtypes(include='number').reset_index(drop=True)
+
+    if {'target', 'regulator', 'regulation_type'}.issubset(lem_results.columns):
+        edges = pd.DataFrame({'source': lem_results['regulator'].to_numpy(),
+                              'target': lem_results['target'].to_numpy(),
+                              'type_reg': lem_results['regulation_type'].map(REGULATION_TYPE_MODELS).to_numpy()})
+        edges = edges.join(scores).dropna(subset=['source', 'target', 'type_reg'])
+        return edges.reset_index(drop=True)
+
+    return lem_edges_to_dataframe(lem_results.index).join(scores)
+
+
+def top_edges_per_node(edges, k, score='pld', max_edges=None):
+    '''
+    Reduce an edge dataframe to the strongest edges around each node, e.g. before rendering it with ipycytoscape.
+
+    Parameters
+    ----------
+    edges : pandas.DataFrame
+        edge dataframe from lem_results_to_edges
+    k : integer
+        an edge is kept when it is among the top k incoming edges of its target or the top k outgoing edges of its source
+    score : string
+        the column to rank edges on. 'pld' ranks high scores first, any other column ranks low scores first. Default: 'pld'
+    max_edges : integer
+        keep at most this many of the remaining edges, ranked by score. Default: None
+
+    Returns
+    -------
+    edges : pandas.DataFrame
+        the kept edges ordered by score
+    '''
+
+    ranked = edges.sort_values(by=score, ascending=(score != 'pld'), kind='mergesort')
+    keep = (ranked.groupby('target', sort=False).cumcount() < k) | (ranked.groupby('source', sort=False).cumcount() < k)
+    ranked = ranked[keep]
+    if max_edges is not None:
+        ranked = ranked.iloc[:int(max_edges)]
+
+    return ranked
+
+
+def edges_to_ipycytoscape(edges):
+    '''
+    Converts an edge dataframe into cytoscape elements which can then be used in ipycytoscape for vizualizing a network. Also returns a cytoscape style dictionary.
+
+    Parameters
+    ----------
+    edges : pandas.DataFrame
+        edge dataframe with the columns 'source', 'target' and 'type_reg', e.g. from lem_edges_to_dataframe or lem_results_to_edges
+
+    Returns
+    -------
+    cyto_elements : dictionary
+        dictionary of nodes and edges in cytoscape node and edge specification format, respectively
+    cyto_styles : dictionary
+        dictionary containing cytoscape node and edge styling parameters
+    '''
+
+    sources = edges['source'].tolist()
+    targets = edges['target'].tolist()
+    classes = np.where(edges['type_reg'].to_numpy() == 'tf_rep', 'rep', 'act').tolist()
+
+    # each node is listed once, in the order of its last appearance as a source or target
+    node_ids = [node for pair in zip(sources, targets) for node in pair]
+    node_ids = list(dict.fromkeys(reversed(node_ids)))[::-1]
+
+    cyto_elements = dict()
+    cyto_elements['nodes'] = [{'data': {'id': node, 'label': node}} for node in node_ids]
+    cyto_elements['edges'] = [{'data': {'id': f'{source}-{target}', 'source': source, 'target': target}, 'classes': edge_class}
+                              for source, target, edge_class in zip(sources, targets, classes)]
+    cyto_styles = [dict(style) for style in CYTOSCAPE_STYLES]
+
+    return cyto_elements, cyto_styles
+
+
+def df_edges_to_ipycytoscape(lem_edge_list):
+    '''
+    converts a list of edges in LEM specification into a cytoscape element which can then be used in ipycytoscape for vizualizing a network. Also returns a cytoscape style dictionary.
+
+    Parameters
+    ----------
+    lem_edge_list : list
+        a list of LEM edges. Each item in the list is in the format 'target=tf_rep(source)'. This is how LEM specifies an edge.
+        Example: If the gene YOX1 represses SWI4 transcription then 'SWI4=tf_rep(YOX1)', or if SWI4 activates YOX1 then 'YOX1=tf_act(SWI4)'.
+
+    Returns
+    -------
+    cyto_elements : dictionary
+        dictionary of nodes and edges in cytoscape node and edge specification format, respectively
+    cyto_styles : dictionary
+        dictionary containing cytoscape node and edge styling parameters
+
+    Examples
+    --------
+    >>> df_edges_to_ipycytoscape(['SWI4=tf_rep(YHP1)', 'SWI4=tf_rep(YOX1)', 'SWI4=tf_rep(NRM1)'])
+
+    '''
+
+    return edges_to_ipycytoscape(lem_edges_to_dataframe(lem_edge_list))
+
+
+def make_network_from_edges(edges):
+    '''
+    Make an interactive graph from an edge dataframe with the columns 'source', 'target' and 'type_reg'.
+
+    Parameters
+    ----------
+    edges : pandas.DataFrame
+        edge dataframe, e.g. from lem_edges_to_dataframe, lem_results_to_edges or top_edges_per_node
+
+    Returns
+    -------
+    Network Graph : ipycytoscape.CytoscapeWidget
+        an interactive network made from the edges.
+    '''
+
+    import ipycytoscape
+
+    elements, styles = edges_to_ipycytoscape(edges)
+    cytonet = ipycytoscape.CytoscapeWidget()
+    # cytonet = ipycytoscape.CytoscapeWidget(user_zooming_enabled=False, panning_enabled=False)
+    cytonet.graph.add_graph_from_json(elements, multiple_edges=True)
+    cytonet.set_style(styles)
+
+    return cytonet
+
+
+def make_network_from_edge_list(lem_edge_list):
+    '''
+    Make an interactive graph from a list of edges in LEM edge specification.
+
+    Parameters
+    ----------
+    lem_edge_list: list
+        a list of LEM edges. Each item in the list is in the format 'target=tf_rep(source)'. This is how LEM specifies an edge.
+        Example: If the gene YOX1 represses SWI4 transcription then 'SWI4=tf_rep(YOX1)', or if SWI4 activates YOX1 then 'YOX1=tf_act(SWI4)'.
+
+    Returns
+    -------
+    Network Graph : ipycytoscape.CytoscapeWidget
+        an interactive network made from the list of LEM edges.
+
+    Examples
+    --------
+    >>> make_network_from_edge_list(['SWI4=tf_rep(YHP1)', 'SWI4=tf_rep(YOX1)', 'SWI4=tf_rep(NRM1)'])
+    '''
+
+    return make_network_from_edges(lem_edges_to_dataframe(lem_edge_list))
+
+
+def make_network_from_lem_results(lem_results, score='pld', edges_per_node=None, max_edges=2000):
+    '''
+    Make an interactive graph directly from LEMpy results, limiting the edges sent to the browser.
+
+    Parameters
+    ----------
+    lem_results : pandas.DataFrame
+        the all_scores dataframe returned by run_lem, or the output of aggregate_lem_results
+    score : string
+        the column to rank edges on. Options are 'pld', 'loss', and 'norm_loss'. Default is 'pld'.
+    edges_per_node : integer
+        keep only the top edges_per_node incoming and outgoing edges of each node. Default: None, which keeps all edges
+    max_edges : integer
+        the maximum number of edges to draw, ranked by score. Default: 2000
+
+    Returns
+    -------
+    Network Graph : ipycytoscape.CytoscapeWidget
+        an interactive network made from the top LEM edges
+
+    Examples
+    --------
+    # draw the 2 best regulators and 2 best targets of each gene
+    >>> make_network_from_lem_results(aggregate_lem_results('../results/yeast_ma__20211005135304_lempy'), edges_per_node=2)
+    '''
+
+    edges = lem_results_to_edges(lem_results)
+    n_edges = len(edges)
+    edges = top_edges_per_node(edges, n_edges if edges_per_node is None else edges_per_node, score=score, max_edges=max_edges)
+    if len(edges) < n_edges:
+        print(f'-- Drawing the top {len(edges)} of {n_edges} edges')
+
+    return make_network_from_edges(edges)
+
+
+def make_top_edge_network(lem_all_scores_df, top_n_edges, score='pld'):
+    '''
+    Make an interactive graph from the top N edges from the LEM all_scores dataframe.
+
+    Parameters
+    ----------
+    lem_all_scores_df: pandas.DataFrame
+        the dataframe containing the all_scores results returned from running LEMpy
+    top_n_edges: integer
+        the integer to threshold the all_scores dataframe on
+    score: string
+        the column in the all_scores dataframe to rank on before thresholding. Options are 'pld', 'loss', and 'norm_loss'. Default is 'pld'.
+
+    Returns
+    -------
+    Network Graph : ipycytoscape.CytoscapeWidget
+        an interactive network made from the list of LEM edges
+
+    Examples
+    --------
+    make_top_edge_network(['SWI4=tf_rep(YHP1)', 'SWI4=tf_rep(YOX1)', 'SWI4=tf_rep(NRM1)'])
+
+    '''
+
+    if score == 'pld':
+        lem_all_scores_df = lem_all_scores_df.sort_values(by=score, ascending=False)
+    else:
+        lem_all_scores_df = lem_all_scores_df.sort_values(by=score)
+    lem_edge_list = lem_all_scores_df.index.tolist()[:int(top_n_edges)]
+
+    return make_network_from_edge_list(lem_edge_list)
+
+def make_ranked_network(top_regulators: DataFrame):
+    '''
+    Build an interactive network from the ranked LEM regulators.
+
+    Parameters
+    ----------
+    top_regulators : pandas.DataFrame
+        Output of rank_top_regulator_per_target. Must contain `target`, `regulator`, and `regulation_type`.
+
+    Returns
+    -------
+    ipycytoscape.CytoscapeWidget
+        Interactive network constructed from the ranked edges.
+    '''
+
+    required_columns = {'target', 'regulator', 'regulation_type'}
+    missing_columns = required_columns - set(top_regulators.columns)
+    if missing_columns:
+        raise KeyError(f'top_regulators is missing required columns: {missing_columns}')
+    if top_regulators.empty:
+        raise ValueError('top_regulators dataframe is empty; nothing to plot.')
+
+    regulation_types = top_regulators['regulation_type']
+    unsupported = ~regulation_types.isin(list(REGULATION_TYPE_MODELS))
+    if unsupported.any():
+        row = top_regulators[unsupported].iloc[0]
+        raise ValueError(f'Unsupported regulation_type "{row["regulation_type"]}" found in row: {row}')
+
+    edges = lem_results_to_edges(top_regulators)
+    if edges.empty:
+        raise ValueError('No valid regulator-target edges could be constructed.')
+
+    return make_network_from_edges(edges)
+
+def lem_signed_adjacency(lem_results, score='pld', min_score=None, edges_per_target=None, weighted=False):
+    '''
+    Convert LEMpy results into a signed sparse adjacency matrix, where entry (i, j) is +1 when gene i activates gene j and -1 when it represses it.
+
+    Parameters
+    ----------
+    lem_results : pandas.DataFrame
+        the all_scores dataframe returned by run_lem, or the output of aggregate_lem_results or filter_top_regulators_per_target
+    score : string
+        the column to rank edges on. 'pld' ranks high scores first, any other column ranks low scores first. Default: 'pld'
+    min_score : float
+        drop edges scoring below min_score ('pld') or above it (any other score). Default: None
+    edges_per_target : integer
+        keep only the top edges_per_target regulators of each target. Default: None
+    weighted : boolean
+        set to True to store the sign multiplied by the score instead of the sign. Default: False
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix
+        the signed adjacency matrix, with regulators as rows and targets as columns
+    nodes : list
+        the gene name of each row and column
+
+    Examples
+    --------
+    >>> adjacency, nodes = lem_signed_adjacency(aggregate_lem_results('../results/yeast_ma__20211005135304_lempy'), min_score=0.1)
+
+    Notes
+    -----
+    LEMpy scores both an activation and a repression model for each regulator-target pair. Only the better scoring one is kept.
+    '''
+
+    edges = lem_results_to_edges(lem_results)
+    high_first = score == 'pld'
+    if min_score is not None:
+        edges = edges[edges[score] >= min_score] if high_first else edges[edges[score] <= min_score]
+
+    edges = edges.sort_values(by=score, ascending=not high_first, kind='mergesort')
+    edges = edges.drop_duplicates(subset=['source', 'target'])
+    if edges_per_target is not None:
+        edges = edges[edges.groupby('target', sort=False).cumcount() < edges_per_target]
+
+    codes, nodes = pd.factorize(np.concatenate([edges['source'].to_numpy(), edges['target'].to_numpy()]))
+    sources, targets = codes[:len(edges)], codes[len(edges):]
+    values = np.where(edges['type_reg'].to_numpy() == 'tf_rep', -1.0, 1.0)
+    if weighted:
+        values = values * edges[score].to_numpy(dtype=float)
+
+    adjacency = sparse.csr_matrix((values, (sources, targets)), shape=(len(nodes), len(nodes)))
+
+    return adjacency, list(nodes)
+
+
+def network_degrees(adjacency, nodes):
+    '''
+    In- and out-degree of each node of a signed adjacency matrix, split by activating and repressing edges, with the strongly connected component of each node.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+
+    Returns
+    -------
+    degree_df : pandas.DataFrame
+        one row per gene, ordered by decreasing out-degree
+    '''
+
+    adjacency = sparse.csr_matrix(adjacency)
+    activating = (adjacency > 0).astype(int)
+    repressing = (adjacency < 0).astype(int)
+
+    degree_df = pd.DataFrame({'in_degree': np.asarray((activating + repressing).sum(axis=0)).ravel(),
+                              'out_degree': np.asarray((activating + repressing).sum(axis=1)).ravel(),
+                              'activating_in': np.asarray(activating.sum(axis=0)).ravel(),
+                              'repressing_in': np.asarray(repressing.sum(axis=0)).ravel(),
+                              'activating_out': np.asarray(activating.sum(axis=1)).ravel(),
+                              'repressing_out': np.asarray(repressing.sum(axis=1)).ravel()},
+                             index=pd.Index(nodes, name='gene'))
+    components = strongly_connected_components(adjacency, nodes)
+    degree_df['component'] = components
+    degree_df['component_size'] = components.map(components.value_counts())
+
+    return degree_df.sort_values(by=['out_degree', 'in_degree'], ascending=False, kind='mergesort')
+
+
+def strongly_connected_components(adjacency, nodes):
+    '''
+    Label the strongly connected components of a regulatory network. Genes in the same component regulate each other through feedback.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+
+    Returns
+    -------
+    components : pandas.Series
+        the component label of each gene. Labels are numbered by decreasing component size
+    '''
+
+    _, labels = csgraph.connected_components(sparse.csr_matrix(adjacency), directed=True, connection='strong')
+    sizes = np.bincount(labels)
+    # relabel so that component 0 is the largest
+    order = np.argsort(-sizes, kind='mergesort')
+    relabel = np.empty_like(order)
+    relabel[order] = np.arange(len(order))
+
+    return pd.Series(relabel[labels], index=pd.Index(nodes, name='gene'), name='component')
+
+
+def find_feedback_loops(adjacency, nodes, max_length=6, max_loops=100000):
+    '''
+    Enumerate the feedback loops (simple directed cycles) of a regulatory network, e.g. to find candidate oscillator cores.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+    max_length : integer
+        the longest loop to enumerate. Default: 6
+    max_loops : integer
+        stop after this many loops. Default: 100000
+
+    Returns
+    -------
+    loops_df : pandas.DataFrame
+        one row per loop with its genes in order ('genes'), its 'length' and its 'sign', which is 'negative' when it has an odd number of repressions and 'positive' otherwise
+
+    Notes
+    -----
+    Cycles only exist inside strongly connected components, so the search is restricted to them. Each loop is found once, starting from
+    its lowest indexed gene, by a depth-first search bounded by max_length.
+    '''
+
+    adjacency = sparse.csr_matrix(adjacency)
+    adjacency.sum_duplicates()
+    _, labels = csgraph.connected_components(adjacency, directed=True, connection='strong')
+    component_sizes = np.bincount(labels)
+    indptr, indices, signs = adjacency.indptr, adjacency.indices, np.sign(adjacency.data)
+    self_loops = adjacency.diagonal() != 0
+
+    loops = list()
+    for start in range(adjacency.shape[0]):
+        if component_sizes[labels[start]] == 1 and not self_loops[start]:
+            continue
+
+        path = [start]
+        path_signs = [1.0]
+        on_path = {start}
+        stack = [iter(range(indptr[start], indptr[start + 1]))]
+        while stack and len(loops) < max_loops:
+            for position in stack[-1]:
+                neighbor = indices[position]
+                if neighbor == start:
+                    loops.append((path.copy(), path_signs[-1] * signs[position]))
+                elif neighbor > start and neighbor not in on_path and labels[neighbor] == labels[start] and len(path) < max_length:
+                    path.append(neighbor)
+                    path_signs.append(path_signs[-1] * signs[position])
+                    on_path.add(neighbor)
+                    stack.append(iter(range(indptr[neighbor], indptr[neighbor + 1])))
+                    break
+            else:
+                stack.pop()
+                on_path.discard(path.pop())
+                path_signs.pop()
+
+    if len(loops) >= max_loops:
+        print(f'-- Stopped after {max_loops} feedback loops. Increase max_loops or decrease max_length to enumerate more.')
+
+    loops_df = pd.DataFrame({'genes': [tuple(nodes[i] for i in loop) for loop, _ in loops],
+                             'length': [len(loop) for loop, _ in loops],
+                             'sign': ['positive' if sign > 0 else 'negative' for _, sign in loops]},
+                            columns=['genes', 'length', 'sign'])
+
+    return loops_df.sort_values(by='length', kind='mergesort').reset_index(drop=True)
+
+
+def find_feed_forward_loops(adjacency, nodes):
+    '''
+    Enumerate the feed-forward loops of a regulatory network, where a regulator controls a target both directly and through an intermediate gene.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+
+    Returns
+    -------
+    ffl_df : pandas.DataFrame
+        one row per loop with the 'regulator', 'intermediate' and 'target' genes, the sign of each of its three edges and whether
+        the loop is 'coherent' (the direct edge has the same sign as the indirect path)
+    '''
+
+    adjacency = sparse.csr_matrix(adjacency)
+    adjacency.sum_duplicates()
+    signs = adjacency.sign()
+    signs.setdiag(0)
+    signs.eliminate_zeros()
+    linked = abs(signs)
+
+    # regulator-target pairs with both a direct edge and a two step path
+    two_step = (linked @ linked).multiply(linked).tocoo()
+    pairs = two_step.row != two_step.col
+    regulators, targets = two_step.row[pairs], two_step.col[pairs]
+
+    rows = list()
+    linked_csc = linked.tocsc()
+    for regulator, target in zip(regulators, targets):
+        out_regulator = linked.indices[linked.indptr[regulator]:linked.indptr[regulator + 1]]
+        in_target = linked_csc.indices[linked_csc.indptr[target]:linked_csc.indptr[target + 1]]
+        for intermediate in np.intersect1d(out_regulator, in_target, assume_unique=True):
+            if intermediate != regulator and intermediate != target:
+                rows.append((regulator, intermediate, target))
+
+    if len(rows) == 0:
+        return pd.DataFrame(columns=['regulator', 'intermediate', 'target', 'regulator_intermediate_sign', 'intermediate_target_sign',
+                                     'regulator_target_sign', 'coherent'])
+
+    rows = np.array(rows, dtype=int)
+    sign_rx = np.asarray(signs[rows[:, 0], rows[:, 1]]).ravel()
+    sign_xt = np.asarray(signs[rows[:, 1], rows[:, 2]]).ravel()
+    sign_rt = np.asarray(signs[rows[:, 0], rows[:, 2]]).ravel()
+    node_names = np.array(nodes, dtype=object)
+
+    ffl_df = pd.DataFrame({'regulator': node_names[rows[:, 0]],
+                           'intermediate': node_names[rows[:, 1]],
+                           'target': node_names[rows[:, 2]],
+                           'regulator_intermediate_sign': sign_rx.astype(int),
+                           'intermediate_target_sign': sign_xt.astype(int),
+                           'regulator_target_sign': sign_rt.astype(int),
+                           'coherent': sign_rt == sign_rx * sign_xt})
+
+    return ffl_df
+
+
+def _xml_attribute(value):
+    # the value escaped for a double-quoted XML attribute
+    return escape(str(value), {'"': '&quot;'})
+
+
+def export_network_graphml(adjacency, nodes, path):
+    '''
+    Write a signed adjacency matrix as a GraphML file, which can be opened in Cytoscape, Gephi or networkx.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+    path : string
+        the output file path
+    '''
+
+    adjacency = sparse.coo_matrix(adjacency)
+    with open(path, 'w') as graphml:
+        graphml.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        graphml.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        graphml.write('  <key id="weight" for="edge" attr.name="weight" attr.type="double"/>\n')
+        graphml.write('  <key id="type_reg" for="edge" attr.name="type_reg" attr.type="string"/>\n')
+        graphml.write('  <graph id="lem" edgedefault="directed">\n')
+        graphml.writelines(f'    <node id="{_xml_attribute(node)}"/>\n' for node in nodes)
+        graphml.writelines(f'    <edge source="{_xml_attribute(nodes[source])}" target="{_xml_attribute(nodes[target])}">'
+                           f'<data key="weight">{weight!r}</data><data key="type_reg">{"tf_rep" if weight < 0 else "tf_act"}</data></edge>\n'
+                           for source, target, weight in zip(adjacency.row.tolist(), adjacency.col.tolist(), adjacency.data.tolist()))
+        graphml.write('  </graph>\n')
+        graphml.write('</graphml>\n')
+
+
+def export_binary_edge_list(adjacency, nodes, path):
+    '''
+    Write a signed adjacency matrix as a compressed binary edge list (.npz) with int32 source and target indices, float32 weights and the gene names.
+
+    Parameters
+    ----------
+    adjacency : scipy.sparse matrix
+        signed adjacency matrix from lem_signed_adjacency
+    nodes : list
+        the gene name of each row and column
+    path : string
+        the output file path
+    '''
+
+    adjacency = sparse.coo_matrix(adjacency)
+    np.savez_compressed(path,
+                        source=adjacency.row.astype(np.int32),
+                        target=adjacency.col.astype(np.int32),
+                        weight=adjacency.data.astype(np.float32),
+                        nodes=np.array(nodes, dtype=str))
+
+
+def load_binary_edge_list(path):
+    '''
+    Read a binary edge list written by export_binary_edge_list.
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix
+        the signed adjacency matrix
+    nodes : list
+        the gene name of each row and column
+    '''
+
+    with np.load(path) as edge_list:
+        nodes = edge_list['nodes'].tolist()
+        adjacency = sparse.csr_matrix((edge_list['weight'].astype(float), (edge_list['source'], edge_list['target'])),
+                                      shape=(len(nodes), len(nodes)))
+
+    return adjacency, nodes
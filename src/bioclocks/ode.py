@@ -0,0 +1,580 @@
+'''Deterministic and stochastic simulation and sensitivity analysis of LEM Hill-function ODE networks.'''
+
+import os
+import time
+import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy import special
+from scipy import integrate
+
+from .lem import MODEL_PATTERN, NULL_MODEL_NAME
+
+def load_lem_ode_network(targets_dir, nodes):
+    '''
+    Build the Hill-function ODE network used in ODE_model_LEM from per-target LEMpy result files. The top ranked model (highest pld) of each target gives its regulator, mode of regulation and parameters.
+
+    Parameters
+    ----------
+    targets_dir : string
+        directory containing the LEMpy target_<gene>_ts0.tsv files, i.e. <lempy results>/targets/ts0 or the targets_tfs folders in ODE_model_LEM
+    nodes : list or string
+        the gene names of the network nodes, or the path to an annotation file (e.g. annot_tfs.tsv) with a `node` column
+
+    Returns
+    -------
+    network : dictionary
+        node names ('nodes') and per-node parameter arrays ('gamma', 'beta', 'alpha', 'K', 'n'), mode of regulation ('type_reg', 'a' or 'r') and regulator index ('reg_nr')
+
+    Examples
+    --------
+    >>> load_lem_ode_network('targets_tfs', 'annot_tfs.tsv')
+    '''
+
+    if isinstance(nodes, str):
+        nodes = pd.read_csv(nodes, sep='\t')['node'].tolist()
+    nodes = list(nodes)
+    node_index = {node: i for i, node in enumerate(nodes)}
+
+    params = np.empty((len(nodes), 5))
+    type_reg = list()
+    reg_nr = np.empty(len(nodes), dtype=int)
+
+    for i, node in enumerate(nodes):
+        target_file = os.path.join(targets_dir, f'target_{node}_ts0.tsv')
+        target_df = pd.read_csv(target_file, sep='\t', index_col=0, comment='#')
+        target_df = target_df.drop(labels=NULL_MODEL_NAME, errors='ignore')
+        top_model = target_df['pld'].idxmax()
+
+        match = MODEL_PATTERN.match(top_model)
+        if not match:
+            raise ValueError(f'Unexpected model "{top_model}" in {target_file}')
+        regulator = match.group(2)
+        if regulator not in node_index:
+            raise ValueError(f'Regulator {regulator} of {node} is not a node of the network')
+
+        type_reg.append(match.group(1)[0])
+        reg_nr[i] = node_index[regulator]
+        params[i] = target_df.loc[top_model, [f'rhs_param_{j}' for j in range(5)]].to_numpy(dtype=float)
+
+    network = {'nodes': nodes,
+               'gamma': params[:, 0],  # basal expression rate
+               'beta': params[:, 1],  # degradation rate
+               'alpha': params[:, 2],  # max transcription rate
+               'K': params[:, 3],  # threshold of regulator
+               'n': params[:, 4],  # Hill coefficient
+               'type_reg': type_reg,
+               'reg_nr': reg_nr}
+
+    return network
+
+
+def _hill_regulation(x_reg, alpha, K, n, is_act):
+    # regulated transcription term for activation (x^n / (x^n + K^n)) or repression (K^n / (x^n + K^n))
+    x_n = x_reg ** n
+    K_n = K ** n
+    return alpha * np.where(is_act, x_n, K_n) / (x_n + K_n)
+
+
+def vectorfield(x, t, nr_nodes, gamma, beta, alpha, K, n, type_reg, reg_nr):
+    '''
+    Right hand side of the LEM Hill-function ODEs, dx_i/dt = gamma_i - beta_i*x_i + alpha_i*hill(x_reg_i), for use with scipy.integrate.odeint.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        the state variables for all nodes
+    t : float
+        time
+    nr_nodes : integer
+        the number of nodes
+    gamma, beta, alpha, K, n : numpy.ndarray
+        the basal expression rate, degradation rate, max transcription rate, regulator threshold and Hill coefficient of each node
+    type_reg : list
+        'a' for activation or 'r' for repression of each node
+    reg_nr : numpy.ndarray
+        the index of the regulator of each node
+
+    Returns
+    -------
+    f : numpy.ndarray
+        the time derivative of each node
+
+    Examples
+    --------
+    >>> odeint(vectorfield, x0, t, args=(nr_nodes, gamma, beta, alpha, K, n, type_reg, reg_nr))
+    '''
+
+    x = np.asarray(x, dtype=float)
+    reg_nr = np.asarray(reg_nr, dtype=int)
+    is_act = np.asarray(type_reg) == 'a'
+
+    return gamma - beta * x + _hill_regulation(x[..., reg_nr], alpha, K, n, is_act)
+
+
+def _trajectory_uniforms(generators, width, chunk=256):
+    # yields one (n_trajectories, width) block of uniforms per step, trajectory i drawing only from generators[i]
+    while True:
+        block = np.stack([generator.random((chunk, width)) for generator in generators], axis=1)
+        for step_uniforms in block:
+            yield step_uniforms
+
+
+def _poisson_from_uniform(u, lam):
+    # Poisson variates by inversion of u, with a normal approximation for large means
+    large = lam > 30
+    lam_small = np.where(large, 0, lam).ravel()
+    u_flat = u.ravel()
+
+    # walk the cdf only for the entries that are still below their uniform
+    counts = np.zeros(lam_small.shape)
+    p = np.exp(-lam_small)
+    search = np.flatnonzero(u_flat > p)
+    u_search, lam_search, p, cdf = u_flat[search], lam_small[search], p[search], p[search]
+    k = 0
+    while search.size:
+        k += 1
+        counts[search] += 1
+        p = p * lam_search / k
+        cdf = cdf + p
+        keep = (u_search > cdf) & (p > 0)
+        search, u_search, lam_search, p, cdf = search[keep], u_search[keep], lam_search[keep], p[keep], cdf[keep]
+    counts = counts.reshape(lam.shape)
+
+    if large.any():
+        counts = np.where(large, np.maximum(np.rint(lam + np.sqrt(lam) * special.ndtri(u)), 0), counts)
+
+    return counts
+
+
+def simulate_stochastic(network, x0, time_points, n_trajectories=1000, method='tau', tau=None, volume=1.0, seed=None):
+    '''
+    Simulate many independent stochastic trajectories of a LEM Hill-function network, where each node is produced at rate gamma + alpha*hill(x_reg) and degraded at rate beta*x.
+
+    Parameters
+    ----------
+    network : dictionary
+        the network returned by load_lem_ode_network
+    x0 : numpy.ndarray
+        the initial expression of each node
+    time_points : list or numpy.ndarray
+        increasing times at which to record the trajectories, starting at the initial time
+    n_trajectories : integer
+        the number of independent trajectories. Default: 1000
+    method : string
+        'tau' for fixed step tau-leaping or 'ssa' for the exact Gillespie algorithm. Default: 'tau'
+    tau : float
+        the tau-leaping step. Default: None, which uses 5% of the fastest degradation time scale
+    volume : float
+        the number of molecules per unit of expression, smaller volumes give noisier trajectories. Default: 1.0
+    seed : integer
+        the base seed. Trajectory i only draws from the i-th child of np.random.SeedSequence(seed), so it is reproducible independently of n_trajectories. Default: None, which uses the current time
+
+    Returns
+    -------
+    trajectories : numpy.ndarray
+        the expression of each node, with shape (n_trajectories, len(time_points), number of nodes)
+
+    Examples
+    --------
+    >>> network = load_lem_ode_network('targets_tfs', 'annot_tfs.tsv')
+    >>> simulate_stochastic(network, x0, np.linspace(0, 48, 13), n_trajectories=5000, volume=10, seed=1)
+
+    Notes
+    -----
+    All trajectories are advanced together as arrays. Tau-leaping is the fast choice for many trajectories; the exact algorithm
+    costs one step per reaction event and is only practical for small volumes.
+    '''
+
+    if method not in ('tau', 'ssa'):
+        raise ValueError(f'method must be either "tau" or "ssa". You entered "{method}".')
+    if seed is None:
+        seed = round(time.time())
+        print(f'-- Using seed {seed}')
+
+    time_points = np.asarray(time_points, dtype=float)
+    nr_nodes = len(network['nodes'])
+    gamma = np.asarray(network['gamma'], dtype=float)
+    beta = np.asarray(network['beta'], dtype=float)
+    alpha = np.asarray(network['alpha'], dtype=float)
+    K = np.asarray(network['K'], dtype=float)
+    n = np.asarray(network['n'], dtype=float)
+    reg_nr = np.asarray(network['reg_nr'], dtype=int)
+    is_act = np.asarray(network['type_reg']) == 'a'
+
+    def propensities(counts):
+        # reactions 0..nr_nodes-1 produce node i, reactions nr_nodes..2*nr_nodes-1 degrade node i
+        production = volume * np.maximum(gamma + _hill_regulation(counts[:, reg_nr] / volume, alpha, K, n, is_act), 0)
+        return np.concatenate([production, beta * counts], axis=1)
+
+    generators = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(n_trajectories)]
+    counts = np.tile(np.rint(np.asarray(x0, dtype=float) * volume), (n_trajectories, 1))
+    trajectories = np.empty((n_trajectories, len(time_points), nr_nodes))
+    trajectories[:, 0] = counts
+
+    if method == 'tau':
+        if tau is None:
+            tau = 0.05 / beta.max()
+        uniforms = _trajectory_uniforms(generators, 2 * nr_nodes)
+        for j in range(1, len(time_points)):
+            interval = time_points[j] - time_points[j - 1]
+            n_steps = max(int(np.ceil(interval / tau)), 1)
+            for _ in range(n_steps):
+                events = _poisson_from_uniform(next(uniforms), propensities(counts) * (interval / n_steps))
+                counts = counts + events[:, :nr_nodes] - np.minimum(events[:, nr_nodes:], counts)
+            trajectories[:, j] = counts
+    else:
+        uniforms = _trajectory_uniforms(generators, 2)
+        rows = np.arange(n_trajectories)
+        t = np.full(n_trajectories, time_points[0])
+        next_record = np.ones(n_trajectories, dtype=int)
+        last_record = len(time_points) - 1
+
+        while (next_record <= last_record).any():
+            u = next(uniforms)
+            a = propensities(counts)
+            a_total = a.sum(axis=1)
+            with np.errstate(divide='ignore'):
+                t_next = t - np.log(u[:, 0]) / a_total
+
+            # the state is constant until the next event, so record every time point it passes
+            record = next_record <= last_record
+            record[record] = time_points[next_record[record]] <= t_next[record]
+            while record.any():
+                trajectories[rows[record], next_record[record]] = counts[record]
+                next_record[record] += 1
+                record &= next_record <= last_record
+                record[record] = time_points[next_record[record]] <= t_next[record]
+
+            fire = (next_record <= last_record) & (a_total > 0)
+            reaction = np.minimum((a.cumsum(axis=1) <= (u[:, 1] * a_total)[:, None]).sum(axis=1), 2 * nr_nodes - 1)
+            counts[rows[fire], reaction[fire] % nr_nodes] += np.where(reaction[fire] < nr_nodes, 1, -1)
+            t = t_next
+
+    return trajectories / volume
+
+
+LEM_ODE_PARAMETERS = ['gamma', 'beta', 'alpha', 'K', 'n']
+
+# period/amplitude features of simulated parameter sets, keyed by parameter hash
+_SIMULATION_CACHE = dict()
+
+
+def network_parameter_names(network):
+    '''Return the names of the flattened network parameters, in the order used by simulate_ode_batch, e.g. "alpha Ophio5|392".'''
+
+    return [f'{param} {node}' for param in LEM_ODE_PARAMETERS for node in network['nodes']]
+
+
+def network_parameter_vector(network):
+    '''Return the network parameters flattened in the order gamma, beta, alpha, K, n with one entry per node for each.'''
+
+    return np.concatenate([np.asarray(network[param], dtype=float) for param in LEM_ODE_PARAMETERS])
+
+
+def simulate_ode_batch(network, param_sets, x0, time_points, method='RK45'):
+    '''
+    Solve the LEM Hill-function ODEs for many parameter sets at once by integrating them as one stacked system.
+
+    Parameters
+    ----------
+    network : dictionary
+        the network returned by load_lem_ode_network. Only its nodes, type_reg and reg_nr are used
+    param_sets : numpy.ndarray
+        parameter sets with shape (number of sets, 5 * number of nodes), flattened as in network_parameter_vector
+    x0 : numpy.ndarray
+        the initial expression of each node
+    time_points : list or numpy.ndarray
+        increasing times at which to return the solution
+    method : string
+        integration method passed to scipy.integrate.solve_ivp. Default: 'RK45'
+
+    Returns
+    -------
+    trajectories : numpy.ndarray
+        the expression of each node, with shape (number of sets, len(time_points), number of nodes). Sets are NaN past the point where the integration failed
+
+    Examples
+    --------
+    >>> simulate_ode_batch(network, np.tile(network_parameter_vector(network), (64, 1)), x0, np.linspace(0, 240, 961))
+    '''
+
+    nr_nodes = len(network['nodes'])
+    time_points = np.asarray(time_points, dtype=float)
+    params = np.asarray(param_sets, dtype=float).reshape(-1, len(LEM_ODE_PARAMETERS), nr_nodes)
+    n_sets = params.shape[0]
+    gamma, beta, alpha, K, n = [params[:, i] for i in range(len(LEM_ODE_PARAMETERS))]
+
+    def rhs(t, y):
+        x = np.maximum(y.reshape(n_sets, nr_nodes), 0)
+        return vectorfield(x, t, nr_nodes, gamma, beta, alpha, K, n, network['type_reg'], network['reg_nr']).ravel()
+
+    sol = integrate.solve_ivp(rhs, (time_points[0], time_points[-1]), np.tile(np.asarray(x0, dtype=float), n_sets),
+                              method=method, t_eval=time_points, rtol=1e-6, atol=1e-8)
+
+    trajectories = np.full((n_sets, len(time_points), nr_nodes), np.nan)
+    trajectories[:, :sol.y.shape[1]] = sol.y.reshape(n_sets, nr_nodes, -1).transpose(0, 2, 1)
+
+    return trajectories
+
+
+def oscillation_features(trajectories, time_points, transient=0.5):
+    '''
+    Measure the period and amplitude of each node in simulated trajectories.
+
+    Parameters
+    ----------
+    trajectories : numpy.ndarray
+        trajectories with shape (number of sets, len(time_points), number of nodes), as returned by simulate_ode_batch
+    time_points : list or numpy.ndarray
+        the times of the trajectories
+    transient : float
+        the fraction of the time series discarded before measuring. Default: 0.5
+
+    Returns
+    -------
+    period : numpy.ndarray
+        the mean peak-to-peak time of each set and node, NaN when fewer than two peaks are found
+    amplitude : numpy.ndarray
+        half of the peak-to-trough difference of each set and node
+    '''
+
+    time_points = np.asarray(time_points, dtype=float)
+    start = int(len(time_points) * transient)
+    x = trajectories[:, start:]
+    t = time_points[start:]
+
+    amplitude = (x.max(axis=1) - x.min(axis=1)) / 2
+
+    # peaks are interior local maxima in the upper half of the swing
+    midline = (x.max(axis=1) + x.min(axis=1)) / 2
+    peaks = np.zeros(x.shape, dtype=bool)
+    peaks[:, 1:-1] = (x[:, 1:-1] > x[:, :-2]) & (x[:, 1:-1] >= x[:, 2:]) & (x[:, 1:-1] > midline[:, None])
+    n_peaks = peaks.sum(axis=1)
+
+    def peak_time(index):
+        # refine the sampled peak with the vertex of the parabola through it and its neighbours
+        index = np.clip(index, 1, len(t) - 2)[:, None]
+        left, center, right = [np.take_along_axis(x, index + shift, axis=1)[:, 0] for shift in (-1, 0, 1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            offset = np.nan_to_num(0.5 * (left - right) / (left - 2 * center + right))
+        index = index[:, 0]
+        return t[index] + np.clip(offset, -0.5, 0.5) * (t[index + 1] - t[index - 1]) / 2
+
+    first_peak = peak_time(peaks.argmax(axis=1))
+    last_peak = peak_time(len(t) - 1 - peaks[:, ::-1].argmax(axis=1))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        period = (last_peak - first_peak) / (n_peaks - 1)
+        oscillating = (n_peaks > 1) & (amplitude > 1e-3 * np.abs(midline))
+    period = np.where(oscillating, period, np.nan)
+
+    return period, amplitude
+
+
+def _ode_features_chunk(args):
+    # process pool worker: simulate one chunk of parameter sets and return [network period, amplitude of each node]
+    network, param_sets, x0, time_points, method = args
+    trajectories = simulate_ode_batch(network, param_sets, x0, time_points, method=method)
+    period, amplitude = oscillation_features(trajectories, time_points)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        network_period = np.nanmedian(period, axis=1)
+    return np.column_stack([network_period, amplitude])
+
+
+def evaluate_parameter_sets(network, param_sets, x0, time_points, num_proc=2, chunk_size=64, method='RK45'):
+    '''
+    Simulate parameter sets in batches across a process pool and return the network period and the amplitude of each node. Results are cached by parameter hash, so sets that were already simulated with the same network structure, initial conditions and time points are not recomputed.
+
+    Parameters
+    ----------
+    network : dictionary
+        the network returned by load_lem_ode_network
+    param_sets : numpy.ndarray
+        parameter sets with shape (number of sets, 5 * number of nodes), flattened as in network_parameter_vector
+    x0 : numpy.ndarray
+        the initial expression of each node
+    time_points : list or numpy.ndarray
+        increasing times at which the ODEs are solved
+    num_proc : integer
+        the number of processes to use. Default: 2
+    chunk_size : integer
+        the number of parameter sets integrated together as one system. Default: 64
+    method : string
+        integration method passed to scipy.integrate.solve_ivp. Default: 'RK45'
+
+    Returns
+    -------
+    features : pandas.DataFrame
+        one row per parameter set with the median period over oscillating nodes ('period') and the amplitude of each node ('amplitude <node>')
+    '''
+
+    param_sets = np.ascontiguousarray(param_sets, dtype=float)
+    time_points = np.asarray(time_points, dtype=float)
+
+    design = hashlib.sha1()
+    for part in (np.asarray(x0, dtype=float), time_points, np.asarray(network['reg_nr'], dtype=int)):
+        design.update(part.tobytes())
+    design.update(''.join(network['type_reg']).encode())
+    design.update(method.encode())
+    design_key = design.hexdigest()
+    keys = [hashlib.sha1(design_key.encode() + row.tobytes()).hexdigest() for row in param_sets]
+
+    # simulate each distinct uncached parameter set once
+    missing = dict()
+    for i, key in enumerate(keys):
+        if key not in _SIMULATION_CACHE and key not in missing:
+            missing[key] = i
+    missing = list(missing.values())
+    if missing:
+        chunks = [(network, param_sets[missing[i:i + chunk_size]], x0, time_points, method) for i in range(0, len(missing), chunk_size)]
+        if num_proc > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=num_proc) as executor:
+                chunk_features = list(executor.map(_ode_features_chunk, chunks))
+        else:
+            chunk_features = [_ode_features_chunk(chunk) for chunk in chunks]
+        for i, row in zip(missing, np.concatenate(chunk_features)):
+            _SIMULATION_CACHE[keys[i]] = row
+
+    columns = ['period'] + [f'amplitude {node}' for node in network['nodes']]
+
+    return pd.DataFrame(np.array([_SIMULATION_CACHE[key] for key in keys]), columns=columns)
+
+
+def _sobol_indices(f_A, f_B, f_AB):
+    # first order (Saltelli 2010) and total (Jansen) indices, ignoring samples where the output is undefined
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        variance = np.nanvar(np.concatenate([f_A, f_B]), axis=0)
+        S1 = np.nanmean(f_B[None] * (f_AB - f_A[None]), axis=1) / variance
+        ST = 0.5 * np.nanmean((f_A[None] - f_AB) ** 2, axis=1) / variance
+    return S1, ST
+
+
+def run_sensitivity(network, x0, method='local', parameters=None, rel_range=0.2, n_samples=256, levels=4, step=0.01,
+                    t_end=240, n_time_points=961, num_proc=2, seed=None):
+    '''
+    Sensitivity of the network period and node amplitudes to the LEM ODE parameters.
+
+    Parameters
+    ----------
+    network : dictionary
+        the network returned by load_lem_ode_network
+    x0 : numpy.ndarray
+        the initial expression of each node
+    method : string
+        'local' for forward finite difference sensitivities at the LEM parameters, 'morris' for Morris elementary effects or 'sobol' for Sobol indices. Default: 'local'
+    parameters : list
+        the parameter kinds to vary, any of 'gamma', 'beta', 'alpha', 'K' and 'n'. Default: None, which varies all of them
+    rel_range : float
+        global methods sample each parameter uniformly within +/- rel_range of its LEM value. Default: 0.2
+    n_samples : integer
+        the number of Morris trajectories or the Sobol base sample size (a power of 2). Default: 256
+    levels : integer
+        the number of grid levels of the Morris design. Default: 4
+    step : float
+        the relative perturbation of the local method. Default: 0.01
+    t_end : float
+        the simulated time; the first half is discarded as transient. Default: 240
+    n_time_points : integer
+        the number of time points the trajectories are sampled at. Default: 961
+    num_proc : integer
+        the number of processes to use. Default: 2
+    seed : integer
+        seed of the Morris and Sobol designs. Default: None
+
+    Returns
+    -------
+    sensitivity_df : pandas.DataFrame
+        one row per varied parameter and one column per (statistic, output) pair. The statistics are 'S' (normalized local sensitivity d ln(y) / d ln(p)),
+        'mu_star' and 'sigma' (Morris) or 'S1' and 'ST' (first order and total Sobol indices). The outputs are 'period' and 'amplitude <node>'
+
+    Examples
+    --------
+    >>> network = load_lem_ode_network('targets_tfs', 'annot_tfs.tsv')
+    >>> run_sensitivity(network, x0, method='sobol', parameters=['alpha', 'K', 'n'], n_samples=512, num_proc=4)['ST']['period'].sort_values()
+
+    Notes
+    -----
+    Global designs perturb every node's parameters, so samples where the network stops oscillating have an undefined period
+    and are left out of the period statistics.
+    '''
+
+    if parameters is None:
+        parameters = LEM_ODE_PARAMETERS
+    invalid_parameters = [param for param in parameters if param not in LEM_ODE_PARAMETERS]
+    if invalid_parameters:
+        raise ValueError(f'Invalid LEM parameters {invalid_parameters} passed')
+
+    base = network_parameter_vector(network)
+    names = network_parameter_names(network)
+    varied = np.array([name.split(' ', 1)[0] in parameters for name in names])
+    n_varied = varied.sum()
+    time_points = np.linspace(0, t_end, n_time_points)
+
+    def evaluate(param_sets):
+        return evaluate_parameter_sets(network, param_sets, x0, time_points, num_proc=num_proc)
+
+    def to_parameters(unit_samples):
+        # map samples of the unit cube onto +/- rel_range around the LEM parameters
+        param_sets = np.tile(base, (len(unit_samples), 1))
+        param_sets[:, varied] = base[varied] * (1 + rel_range * (2 * unit_samples - 1))
+        return param_sets
+
+    if method == 'local':
+        print(f'-- Running local sensitivity analysis on {n_varied} parameters')
+        param_sets = np.tile(base, (n_varied + 1, 1))
+        param_sets[np.arange(1, n_varied + 1), np.flatnonzero(varied)] *= 1 + step
+        features = evaluate(param_sets)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sensitivity = (features.iloc[1:].to_numpy() / features.iloc[0].to_numpy() - 1) / step
+        sensitivity_df = pd.DataFrame(sensitivity, columns=pd.MultiIndex.from_product([['S'], features.columns]))
+
+    elif method == 'morris':
+        print(f'-- Running Morris screening on {n_varied} parameters with {n_samples} trajectories')
+        rs = np.random.RandomState(seed)
+        delta = levels / (2 * (levels - 1))
+        # each trajectory starts on the lower half of the grid and raises one parameter at a time by delta
+        starts = rs.randint(0, levels // 2, size=(n_samples, n_varied)) / (levels - 1)
+        orders = np.argsort(rs.rand(n_samples, n_varied), axis=1)
+        steps = np.zeros((n_samples, n_varied + 1, n_varied))
+        steps[np.arange(n_samples)[:, None], np.arange(1, n_varied + 1)[None], orders] = delta
+        unit_samples = starts[:, None] + np.cumsum(steps, axis=1)
+        features = evaluate(to_parameters(unit_samples.reshape(-1, n_varied)))
+        columns = features.columns
+        features = features.to_numpy().reshape(n_samples, n_varied + 1, -1)
+
+        effects = np.empty((n_samples, n_varied, features.shape[2]))
+        effects[np.arange(n_samples)[:, None], orders] = np.diff(features, axis=1) / delta
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            mu_star = np.nanmean(np.abs(effects), axis=0)
+            sigma = np.nanstd(effects, axis=0)
+        sensitivity_df = pd.concat([pd.DataFrame(mu_star, columns=pd.MultiIndex.from_product([['mu_star'], columns])),
+                                    pd.DataFrame(sigma, columns=pd.MultiIndex.from_product([['sigma'], columns]))], axis=1)
+
+    elif method == 'sobol':
+        print(f'-- Running Sobol analysis on {n_varied} parameters with {n_samples * (n_varied + 2)} simulations')
+        samples = stats.qmc.Sobol(d=2 * n_varied, scramble=True, seed=seed).random(n_samples)
+        A, B = samples[:, :n_varied], samples[:, n_varied:]
+        AB = np.repeat(A[None], n_varied, axis=0)
+        AB[np.arange(n_varied), :, np.arange(n_varied)] = B.T
+        features = evaluate(to_parameters(np.concatenate([A, B, AB.reshape(-1, n_varied)])))
+        columns = features.columns
+        features = features.to_numpy()
+        S1, ST = _sobol_indices(features[:n_samples], features[n_samples:2 * n_samples],
+                                features[2 * n_samples:].reshape(n_varied, n_samples, -1))
+        sensitivity_df = pd.concat([pd.DataFrame(S1, columns=pd.MultiIndex.from_product([['S1'], columns])),
+                                    pd.DataFrame(ST, columns=pd.MultiIndex.from_product([['ST'], columns]))], axis=1)
+
+    else:
+        raise ValueError(f'method must be one of "local", "morris" or "sobol". You entered "{method}".')
+
+    sensitivity_df.index = pd.Index(np.array(names)[varied], name='parameter')
+
+    return sensitivity_df
@@ -0,0 +1,758 @@
+'''Selecting periodic genes and running pyJTK, pyDL, Lomb-Scargle and DLxJTK.'''
+
+import os
+import ntpath
+import datetime
+import platform
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from .io import load_results
+from .preprocessing import preprocess, triage_genes
+from .lombscargle import LS_METHODS, SEARCH_MODES, lomb_scargle
+from .jtk import jtk_cycle
+from .tracing import traced, trace_stage, trace_environment
+
+def get_genelist_from_top_n_genes(periodicity_result, filtering_column, top_genes, reverse=False):
+    '''
+    Return gene list consisting of top n genes based off of the periodicity inputs and a specified number of genes.
+
+    Parameters
+    ----------
+    periodicity_result : pandas.DataFrame or string
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can consist of a path to a file or a dataframe.
+    filtering_column : string
+        the name of a column in the periodicity result. For example, for JTK specifying 'p-value' will allow for the top n genes ranked based off of the JTK p-value.
+    top_genes : integer
+        the number of top genes to keep
+
+    Returns
+    -------
+    gene_list : list
+        the list of top genes
+
+    Examples
+    --------
+    # supplying a pyJTK results dataframe and filtering on p-value
+    >>> get_genelist_from_top_n_genes(pyjtk_results_df, 'p-value', 10)
+
+    # supplying a pyJTK results filename and filtering on p-value
+    >>> get_genelist_from_top_n_genes('yeast_ma_test__20211005135303_pyjtk_p75-100s5.tsv', 'p-value', 10)
+
+    '''
+
+    if type(periodicity_result) == str:
+        print('Loading periodicity results')
+        periodicity_df = load_results(periodicity_result)
+    elif type(periodicity_result)==pd.core.frame.DataFrame:
+        periodicity_df = periodicity_result
+    if filtering_column in periodicity_df.columns:
+        periodicity_df=periodicity_df.sort_values(by=filtering_column, ascending=not reverse)
+        gene_list = list(periodicity_df.iloc[0:top_genes].index)
+        return gene_list
+    else:
+        print('filtering column must be a numeric column in the periodicity result dataframe.')
+        return None
+
+
+def get_genelist_from_threshold(periodicity_result, filtering_column, threshold, threshold_below=True):
+    '''
+    Return gene list consisting of top genes based off of the periodicity inputs and a specified numeric threshold.
+
+    Parameters
+    ----------
+    periodicity_result : pandas.DataFrame or string
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can consist of a path to a file or a dataframe.
+    filtering_column : string
+        the name of a column in the periodicity result above. For example, for JTK specifying 'p-value' will allow for the top genes based off of the supplied p-value threshold.
+    threshold : float
+        value corresponding to the threshold for the filtering column
+    threshold_below : boolean
+        setting to True will include genes with a periodicity score below the threshold. When False will take genes with a periodicity score above the threshold. Default: True
+
+    Returns
+    -------
+    gene_list : list
+        the list of top genes
+
+    Examples
+    --------
+    # supplying a pyJTK results dataframe and filtering on p-value
+    >>> get_genelist_from_top_n_genes(pyjtk_results_df, 'p-value', 0.02)
+
+    # supplying a pyJTK results filename and filtering on p-value
+    >>> get_genelist_from_top_n_genes('yeast_ma_test__20211005135303_pyjtk_p75-100s5.tsv', 'p-value', 0.02)
+    '''
+
+    if type(periodicity_result) == str:
+        print('Loading periodicity results')
+        periodicity_df = load_results(periodicity_result)
+    elif type(periodicity_result)==pd.core.frame.DataFrame:
+        periodicity_df = periodicity_result
+
+    if threshold_below:
+        gene_list = list(periodicity_df.loc[periodicity_df[filtering_column]<threshold].index)
+    else:
+        gene_list= list(periodicity_df.loc[periodicity_df[filtering_column]>threshold].index)
+    return gene_list
+
+@traced
+def run_pyjtk(dataset, min_period, max_period, period_step, filename, return_results=True, is_tmp=False, method='pyjtk', search='dense'):
+    '''
+    Use pyJTK to analyze a time series dataset.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : integer
+        the minimum period to examine
+    max_period : integer
+        the maximum period to examine
+    period_step : integer
+        the stepsize for building the range of periods to examine
+    filename : string
+        a name to include in the file name of the results
+    return_results : boolean
+        set to True to save the results in a file and to return the results as a dataframe. Set to False to only save the results to a file. Default: True
+    is_tmp : boolean
+        this is used in the function run_periodicity and there should be no reason to change this. Default: False
+    method : string
+        'pyjtk' to run pyJTK, or 'python' to run JTK in this process with the null distributions and reference waveforms cached by sampling design, see jtk_cycle. Default: 'pyjtk'
+    search : string
+        'dense' or, with method='python', 'coarse_to_fine' to test a coarse period grid first and refine around each gene's best periods, see jtk_cycle. Default: 'dense'
+
+    Returns
+    -------
+    if return_results == True
+        results_df : pandas.DataFrame
+            pyJTK results
+    if results_results == False
+        outdir : string
+            the file name of the pyJTK results. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the results as a dataframe and save them to a file
+    >>> run_pyjtk(data_df, 75, 100, 5, 96, 'yeast_ma')
+
+    # only save the results to a file and return the file name
+    >>> run_pyjtk(data_df, 75, 100, 5, 96, 'yeast_ma', return_results=False)
+    '''
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+    periods = np.arange(min_period, max_period+period_step, period_step).tolist()
+    # convert periods to string
+    str_periods = ', '.join([str(p) for p in periods])
+
+    pyjtk_path = '../src/pyjtk/pyjtk.py'
+
+    if method not in ['pyjtk', 'python']:
+        raise ValueError(f'method must be "pyjtk" or "python", not "{method}"')
+    if search not in SEARCH_MODES or (search != 'dense' and method != 'python'):
+        raise ValueError(f'search must be "dense", or one of {SEARCH_MODES} with method="python", not "{search}"')
+
+    if method == 'python':
+        if is_tmp:
+            dataset = pd.read_csv(filename, sep='\t', index_col=0, comment='#')
+            filename = ntpath.basename(filename).split('__')[0]
+        outfile = f'{filename}__{datetimestr}_pyjtk_p{min_period}-{max_period}s{period_step}.tsv'
+
+        print(f'-- Running JTK on dataset, testing period(s) of {periods}')
+        with trace_stage('compute'):
+            results_df = jtk_cycle(dataset, periods, search=search)
+        with trace_stage('serialize'):
+            results_df.to_csv(os.path.join('../results', outfile), sep='\t')
+        print(f'-- Results saved as {outfile} in the results directory')
+
+        return results_df if return_results else outfile
+
+    if is_tmp:
+        data_path = filename
+        filename = ntpath.basename(data_path).split('__')[0]
+    else:
+        datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        data_path = f'../tmp/{filename}__{datetimestr}.tsv'
+        with trace_stage('serialize'):
+            dataset.to_csv(data_path, sep='\t')
+
+    outfile = f'{filename}__{datetimestr}_pyjtk_p{min_period}-{max_period}s{period_step}.tsv'
+    outdir = f'../results/{outfile}'
+
+    full_cmd = ['python', pyjtk_path, data_path, '-T', str_periods, '-o', outdir]
+
+    print(f'-- Running pyJTK on dataset, testing period(s) of {periods}')
+
+    with trace_stage('spawn'):
+        submit_cmd = subprocess.Popen(full_cmd,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE)
+
+    print(f'-- Command used: {" ".join(full_cmd)}')
+
+    with trace_stage('compute'):
+        output, error = submit_cmd.communicate()
+    str_error = error.decode("utf-8").split('\n')
+    str_output = output.decode("utf-8").split('\n')
+    if len(str_error) > 1:
+        print(f'-- Error:')
+        [print(e) for e in str_error]
+
+    print(f'-- Results saved as {outfile} in the results directory')
+
+    if not is_tmp:
+        os.remove(data_path)
+
+    if return_results:
+        with trace_stage('parse'):
+            results_df = load_results(outfile)
+        return results_df
+    else:
+        return outfile
+
+
+@traced
+def run_pydl(dataset, period, filename, numb_reg=1000000, numb_per=100000, log_trans=True, verbose=False, return_results=True, is_tmp=False, windows_issues=False, num_proc=2, method='pydl', significance=None, null_values=None, nr_untested=0):
+
+    '''
+    Use pyDL to analyze a time series dataset.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    period : integer
+        the period to examine
+    filename : string
+        a name to include in the file name of the results
+    numb_reg : integer
+        number of random curves for empirical regulation p-value. Default: 1000000
+    numb_per : integer
+        number of random curves for empirical periodicity p-value. Default: 100000
+    log_trans : boolean
+        set to True if data should be log transformed. Default: True
+    verbose : boolean
+        set to Trueif progress should be displayed. Default: False
+    return_results : boolean
+        set to True to save the results in a file and to return the results as a dataframe. Set to False to only save the results to a file. Default: True
+    is_tmp : boolean
+        this is used in the function run_periodicity and there should be no reason to change this. Default: False
+    windows_issues : boolean
+        Set to True if you are having trouble running this function on a Windows computer.
+    num_proc : integer
+        the number of processors to use. Default: 2
+    method : string
+        'pydl' to run pyDL, or 'python' to run the DL tests in this process, see de_lichtenberg. Default: 'pydl'
+    significance : float
+        only with method='python': a p-value threshold, e.g. 0.05, at which to stop drawing random curves for a gene once its
+        p-values are confidently above or below it. The number of curves drawn per gene is added to the results. Default: None,
+        to draw numb_reg and numb_per curves for every gene
+    null_values, nr_untested : numpy.ndarray, integer
+        only with method='python': the regulation null and the number of left out genes of a dataset that is part of a larger one,
+        see de_lichtenberg. Default: None, 0
+
+    Returns
+    -------
+    if return_results == True
+        results_df : pandas.DataFrame
+            pyDL results
+    if results_results == False
+        outdir : string
+            the file name of the pyDL results. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the results as a dataframe and save them to a file
+    >>> run_pydl(data_df, 95, 'yeast_ma')
+
+    # only save the results to a file and return the file name
+    >>> run_pydl(data_df, 95, 'yeast_ma', return_results=False)
+    '''
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+    # convert periods to string
+    if isinstance(period, list):
+        print(f'** ERROR: pyDL can only take one period. You set <period> to {period}.\nSelect one, set it for period and run again  **')
+        return
+    else:
+        period = str(period)
+
+    pydl_path = '../src/pydl/pydl.py'
+
+    if method not in ['pydl', 'python']:
+        raise ValueError(f'method must be "pydl" or "python", not "{method}"')
+    if significance is not None and method != 'python':
+        raise ValueError('Adaptive sampling (significance) is only available with method="python"')
+    if (null_values is not None or nr_untested) and method != 'python':
+        raise ValueError('null_values and nr_untested are only available with method="python"')
+
+    if method == 'python':
+        from .dl import de_lichtenberg
+
+        if is_tmp:
+            dataset = pd.read_csv(filename, sep='\t', index_col=0, comment='#')
+            filename = ntpath.basename(filename).split('__')[0]
+        outfile = f'{filename}__{datetimestr}_pydl_p{period}.tsv'
+
+        print(f'-- Running DL on dataset, testing a period of {period}')
+        with trace_stage('compute'):
+            results_df = de_lichtenberg(dataset, float(period), numb_reg=numb_reg, numb_per=numb_per, log_trans=log_trans, significance=significance,
+                                        null_values=null_values, nr_untested=nr_untested)
+        with trace_stage('serialize'):
+            results_df.to_csv(os.path.join('../results', outfile), sep='\t')
+        print(f'-- Results saved as {outfile} in the results directory')
+
+        return results_df if return_results else outfile
+
+    if is_tmp:
+        data_path = filename
+        filename = ntpath.basename(data_path).split('__')[0]
+    else:
+        datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        data_path = f'../tmp/{filename}__{datetimestr}.tsv'
+        with trace_stage('serialize'):
+            dataset.to_csv(data_path, sep='\t')
+
+    outfile = f'{filename}__{datetimestr}_pydl_p{period}.tsv'
+    outdir = f'../results/{outfile}'
+
+    system = platform.system()
+    if system == 'Windows' and windows_issues:
+        print('** IMPORTANT: System was detected as Windows. ** There is currently an issue running pyDL on Windows through the Jupyter notebook. Two commands will be printed below. Go into the terminal and change into the biological_clocks_class folder as described in the README.Then copy and paste the following commands. ')
+        print(f' -- Printing command for pyDL on dataset, testing period of {period}:')
+        pydl_path_windows = pydl_path.replace("../", "")
+        data_path_windows = data_path.replace("../", "")
+        outdir_windows = outdir.replace("../", "")
+        command0 ='Command 1: conda activate BioClocksClass'
+        command = f'Command 2: mpiexec -n 2 python {pydl_path_windows} {data_path_windows} -T {period} -o {outdir_windows} -r {numb_reg} -p {numb_per} -l {log_trans} -v {verbose}'
+        print(command0)
+        print(command)
+    else:
+        print(f'-- Running pyDL on dataset, testing a period of {period}')
+
+        full_cmd = ['mpiexec', '-n', str(num_proc), 'python', pydl_path, data_path, '-T', period, '-o', outdir, 
+                    '-r', str(numb_reg), 
+                    '-p', str(numb_per), 
+                    '-l', str(log_trans), 
+                    '-v', str(verbose)]
+        print(f'-- Command used: {" ".join(full_cmd)}')
+
+        with trace_stage('spawn'):
+            submit_cmd = subprocess.Popen(full_cmd,
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.PIPE)
+
+        with trace_stage('compute'):
+            output, error = submit_cmd.communicate()
+        str_error = error.decode("utf-8").split('\n')
+        str_output = output.decode("utf-8").split('\n')
+        # print(str_output)
+        if len(str_error) > 1:
+            print(f'-- Error:')
+            [print(e) for e in str_error]
+
+        print(f'-- Results saved as {outfile} in the results directory')
+
+    if not is_tmp:
+        os.remove(data_path)
+
+    if return_results:
+        with trace_stage('parse'):
+            results_df = load_results(outfile)
+        return results_df
+    else:
+        return outfile
+
+
+@traced
+def run_ls(dataset, min_period, max_period, filename, test_freq=4, unit_type='minutes', is_tmp=False, return_results=True, method='R', search='dense'):
+    '''
+    Use Lomg-Scargle to analyze a time series dataset.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : integer
+        the minimum periods to examine
+    max_period : integer
+        the maximum periods to examine
+    filename : string
+        a name to include in the file name of the results
+    test_freq : integer
+        number of test frequencies to scan, per time point of the dataset
+    unit_type : string
+        the unit of measurement for the time series
+    is_tmp : boolean
+        this is used in the function run_periodicity and there should be no reason to change this. Default: False
+    return_results : boolean
+        set to True to save the results in a directory and to return the results as a dataframe. Set to False to only save the results to a directory. Default: True
+    method : string
+        'R' to run LombScargle.R, or 'exact' or 'fast' to compute the periodogram in Python, see lomb_scargle. 'fast' is only faster than 'exact' for time series of about a thousand time points or more. Default: 'R'
+    search : string
+        'dense' or, with method 'exact' or 'fast', 'coarse_to_fine' to scan a coarse frequency grid first and refine around each gene's best peaks, see lomb_scargle. Default: 'dense'
+
+    Returns
+    -------
+    if return_results == True
+        results_df : pandas.DataFrame
+            Lomb-Scargle summary results
+    if results_results == False
+        outdir : string
+            the directory name of the Lomb-Scargle results. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the results as a dataframe and save them to a directory
+    >>> run_ls(data_df, 75, 100, 'yeast_ma')
+
+    # only save the results to a directory and return the directory name
+    >>> run_ls(data_df, 75, 100, 'yeast_ma', return_results=False)
+
+    # a time series of thousands of time points, where the Press-Rybicki method is faster
+    >>> run_ls(long_df, 75, 100, 'long_series', method='fast')
+
+    '''
+    if method != 'R' and method not in LS_METHODS:
+        raise ValueError(f'method must be "R" or one of {LS_METHODS}, not "{method}"')
+    if search not in SEARCH_MODES or (search != 'dense' and method == 'R'):
+        raise ValueError(f'search must be "dense", or one of {SEARCH_MODES} with method "exact" or "fast", not "{search}"')
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+    if method in LS_METHODS:
+        if is_tmp:
+            dataset = pd.read_csv(filename, sep='\t', index_col=0, comment='#')
+            filename = ntpath.basename(filename).split('__')[0]
+        ls_outdir = f'{filename}__{datetimestr}_ls_p{min_period}-{max_period}f{test_freq}'
+
+        print(f'-- Running Lomb-Scargle ({method}) on dataset, testing {test_freq} frequencies per time point for periods {min_period}-{max_period} {unit_type}')
+        with trace_stage('compute'):
+            results_df = lomb_scargle(dataset, min_period, max_period, test_freq, method=method, search=search)
+
+        # same layout as the LombScargle.R summary, so load_results can read it
+        with trace_stage('serialize'):
+            os.makedirs(os.path.join('../results', ls_outdir), exist_ok=True)
+            results_df.rename_axis('probe').reset_index().to_csv(os.path.join('../results', ls_outdir, f'{ls_outdir}_summary.tsv'), sep='\t', index_label='index')
+        print(f'-- Results saved in {ls_outdir} in the results directory')
+
+        return results_df if return_results else ls_outdir
+
+    ls_path = '../src/ls/_run_ls_params.py'
+
+    if is_tmp:
+        data_path = filename
+        filename = ntpath.basename(data_path).split('__')[0]
+    else:
+        datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        data_path = f'../tmp/{filename}__{datetimestr}.tsv'
+        with trace_stage('serialize'):
+            dataset.to_csv(data_path, sep='\t')
+
+    outdir = f'../results'
+
+    full_cmd = ['python', ls_path, data_path, outdir, str(min_period), str(max_period), str(test_freq), unit_type]
+
+    print(f'-- Running Lomb-Scargle on dataset, testing periods {min_period}-{max_period} at a frequency of {test_freq} {unit_type}')
+
+    # _run_ls_params.py records the R run in this run's trace
+    with trace_stage('spawn'):
+        submit_cmd = subprocess.Popen(full_cmd,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.PIPE,
+                                      env=trace_environment())
+
+    print(f'-- Command used: {" ".join(full_cmd)}')
+
+    with trace_stage('compute'):
+        output, error = submit_cmd.communicate()
+    str_error = error.decode("utf-8").split('\n')
+    str_output = output.decode("utf-8").split('\n')
+    if len(str_error) > 1:
+        print(f'-- Error:')
+        [print(e) for e in str_error]
+
+    ls_outdir = f'{filename}__{datetimestr}_ls_p{min_period}-{max_period}f{test_freq}'
+    print(f'-- Results saved in {ls_outdir} in the results directory')
+
+    if not is_tmp:
+        os.remove(data_path)
+
+    if return_results:
+        with trace_stage('parse'):
+            results_df = load_results(ls_outdir)
+        return results_df
+    else:
+        return ls_outdir
+
+
+@traced
+def run_periodicity(dataset, min_period, max_period, period_step, avg_period, filename, numb_reg=1000000, numb_per=100000, return_results=True, windows_issues=False, num_proc=2, preprocessing=None, pydl_method='pydl', significance=None, triage=None, jtk_method='pyjtk', search='dense', ls_method='R', triage_action='drop'):
+
+    '''
+    Run pyJTK, pyDL and Lomb-Scargle on a single dataset.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_period : integer
+        the minimum periods to examine in pyJTK and Lomb-Scargle
+    max_period : integer
+        the maximum periods to examine in pyJTK and Lomb-Scargle
+    avg_period : integer
+        the period to examine in pyDL
+    period_step : integer
+        the stepsize for building the range of periods to examine in pyJTK and Lomb-Scargle
+    filename : string
+        a name to include in the file name of the results
+    numb_reg : integer
+        number of random curves for empirical regulation p-value in pyDL. Default: 1000000
+    numb_per : integer
+        number of random curves for empirical periodicity p-value in pyDL. Default: 100000
+    return_results : boolean
+        set to True to save the results in a directory and to return the results as a dataframe. Set to False to only save the results to a directory. Default: True
+    windows_issues : boolean
+        Set to True if you are having trouble running the run_pydl() function on a Windows computer.
+    num_proc : integer
+        the number of processors to use. Default: 2
+    preprocessing : list
+        preprocessing steps to run on the dataset first, see preprocess. The dataset can then also be a dataset name. Default: None
+    pydl_method : string
+        'pydl' or 'python', see run_pydl. Default: 'pydl'
+    significance : float
+        p-value threshold for adaptive sampling in pyDL, requires pydl_method='python', see run_pydl. Default: None
+    triage : dict
+        rules for removing genes that cannot score as periodic before the algorithms run, e.g. {'min_expression': 1,
+        'min_amplitude': 0.2}, see triage_genes. The removed genes are saved as <filename>__<datetime>_triage.tsv in the results
+        directory and returned after the results. With pydl_method='python' the DL regulation null and the median normalizations
+        are those of the whole dataset, counting the removed genes as p-values of 1; pyDL computes them from the kept genes only.
+        Default: None
+    triage_action : string
+        'drop' to leave the removed genes out of the results, or 'defer' to add them after the tested genes, with p-values of 1 and
+        no other statistics, so that the results cover every gene of the dataset. Default: 'drop'
+    jtk_method : string
+        'pyjtk' or 'python', see run_pyjtk. Default: 'pyjtk'
+    search : string
+        'dense' or, with jtk_method='python', 'coarse_to_fine', see run_pyjtk. Also used by Lomb-Scargle when ls_method is not 'R'.
+        Default: 'dense'
+    ls_method : string
+        'R', 'exact' or 'fast', see run_ls. Default: 'R'
+
+    Returns
+    -------
+    if return_results == True
+        pjyk_results : pandas.DataFrame
+            pyJTK results
+        pydl_results : pandas.DataFrame
+            pyDL results
+        ls_results : pandas.DataFrame
+            Lomb-Scargle summary results
+        triage_df : pandas.DataFrame
+            only with triage: the removed genes, see triage_genes
+    if results_results == False
+        pyjtk_results_path : string
+            the file name of the pyJTK results. Can then be used in load_results().
+        pydl_results_path : string
+            the file name of the pyDL results. Can then be used in load_results().
+        ls_results_path : string
+            the directory name of the Lomb-Scargle results. Can then be used in load_results().
+        triage_file : string
+            only with triage: the file name of the removed genes. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the results as dataframes and save them to the results directory
+    >>> run_periodicity(data_df, 75, 100, 5, 95, 'yeast_ma')
+
+    # only save the results to a directory and return the directory name
+    >>> run_periodicity(data_df, 75, 100, 5, 95, 'yeast_ma', return_results=False)
+
+    # all three algorithms in process, with coarse-to-fine JTK and Lomb-Scargle period searches
+    >>> run_periodicity(data_df, 75, 100, 1, 95, 'yeast_ma', jtk_method='python', search='coarse_to_fine', pydl_method='python',
+    ...                 ls_method='exact')
+
+    # skip the flat and barely expressed genes of an RNA-seq dataset, and list them last in the results
+    >>> jtk_df, dl_df, ls_df, triage_df = run_periodicity(data_df, 20, 28, 1, 24, 'ophio_dd', pydl_method='python',
+    ...                                                   triage={'min_expression': 1, 'min_amplitude': 0.2}, triage_action='defer')
+
+    '''
+
+    if preprocessing is not None:
+        with trace_stage('preprocess'):
+            dataset = preprocess(dataset, preprocessing)
+
+    print(f'Running periodicity algorithms')
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+
+    triage_df = None
+    dl_options = dict()
+    if triage is not None:
+        if triage_action not in ['drop', 'defer']:
+            raise ValueError(f'triage_action must be "drop" or "defer", not "{triage_action}"')
+        with trace_stage('preprocess'):
+            full_dataset = dataset
+            dataset, triage_df = triage_genes(dataset, **triage)
+            if pydl_method == 'python':
+                from .dl import dl_null_values
+
+                # the regulation null and median normalizations of the whole dataset, so that triage does not change the kept genes' scores
+                dl_options = {'null_values': dl_null_values(full_dataset), 'nr_untested': len(triage_df)}
+        triage_file = f'{filename}__{datetimestr}_triage.tsv'
+        triage_df.to_csv(os.path.join('../results', triage_file), sep='\t')
+        print(f'-- Triage removed {len(triage_df)} of {len(full_dataset)} genes ({triage_df["reason"].value_counts().to_dict()}), listed in {triage_file}')
+
+    data_path = f'../tmp/{filename}__{datetimestr}.tsv'
+    with trace_stage('serialize'):
+        dataset.to_csv(data_path, sep='\t')
+
+    print('Running pyJTK')
+    pyjtk_results_path = run_pyjtk(data_path, min_period, max_period, period_step, data_path, return_results=False, is_tmp=True, method=jtk_method, search=search)
+
+    print('Running pyDL')
+
+    pydl_results_path = run_pydl(data_path, avg_period, data_path, numb_reg=numb_reg, numb_per=numb_per, return_results=False, is_tmp=True, windows_issues=windows_issues, num_proc=num_proc, method=pydl_method, significance=significance, **dl_options)
+
+    print('Running Lomb-Scargle')
+    ls_results_path = run_ls(dataset, min_period, max_period, filename, return_results=False, method=ls_method, search='dense' if ls_method == 'R' else search)
+
+    system = platform.system()
+    if system == 'Windows' and windows_issues:
+        pjyk_results = pd.read_csv(pyjtk_results_path, sep='\t', index_col=0, comment='#')
+        pydl_results = pydl_results_path
+        print('After pyDL has completed in the terminal, please run the following line in the next cell in the Jupyter notebook. You can also delete the temp file that was created in the tmp folder.')
+        command = 'pydl_results = load_results(pydl_results)'
+        print(f"Code for jupyter cell: {command}")
+    else:
+        if triage_df is not None and triage_action == 'defer':
+            with trace_stage('serialize'):
+                for results_path in (pyjtk_results_path, pydl_results_path, ls_results_path):
+                    _append_untested(results_path, triage_df.index)
+        if return_results:
+            with trace_stage('parse'):
+                # the runs return names in the results directory
+                pjyk_results = load_results(pyjtk_results_path)
+                pydl_results = load_results(pydl_results_path)
+                ls_results = load_results(ls_results_path)
+            os.remove(data_path)
+            if triage_df is not None:
+                return pjyk_results, pydl_results, ls_results, triage_df
+            return pjyk_results, pydl_results, ls_results
+        else:
+            os.remove(data_path)
+            if triage_df is not None:
+                return pyjtk_results_path, pydl_results_path, ls_results_path, triage_file
+            return pyjtk_results_path, pydl_results_path, ls_results_path
+
+
+def _append_untested(results_name, genes):
+    # add genes that were not tested after the others in a results file, with p-values of 1, no draws and no other statistics
+    if '_ls_' in results_name:
+        results_path = os.path.join('../results', results_name, f'{os.path.basename(results_name)}_summary.tsv')
+    else:
+        results_path = os.path.join('../results', results_name if results_name.endswith('.tsv') else f'{results_name}.tsv')
+    results_df = load_results(results_name)
+
+    untested_df = pd.DataFrame(np.nan, index=genes, columns=results_df.columns)
+    for column in results_df.columns:
+        if column in ('p-value', 'raw p-value', 'p_reg', 'p_per'):
+            untested_df[column] = 1.0
+        elif column.endswith('_draws'):
+            untested_df[column] = 0
+    for column in ('p_reg', 'p_per'):
+        # the normalized p-values divide by a median, the same for every gene
+        if f'{column}_norm' in results_df.columns and len(results_df):
+            untested_df[f'{column}_norm'] = (results_df[f'{column}_norm'] / results_df[column]).iloc[0]
+    results_df = pd.concat([results_df, untested_df])
+
+    if '_ls_' in results_name:
+        results_df.rename_axis('probe').reset_index().to_csv(results_path, sep='\t', index_label='index')
+    else:
+        results_df.to_csv(results_path, sep='\t')
+
+
+def dlxjtk_func(row):
+    # computes DLxJTK score for one gene in df
+    amp = row["dl_reg_pval_norm"]
+    per = row["jtk_per_pval_norm"]
+    return per * amp * (1 + ((per / 0.001) ** 2)) * (1 + ((amp / 0.001) ** 2))
+
+
+@traced
+def run_dlxjtk(pyjtk_results, pydl_results, filename, return_results=True):
+    '''
+    Computes the DLxJTK score using results from pyJTK and pyDL. The pyJTK and pyDL results must be from the same time series.
+
+    Parameters
+    ----------
+    pyjtk_results : pandas.DataFrame or string
+        results from running pyJTK on a time series file as pyDL was run on
+    pydl_results : pandas.DataFrame or string
+        results from running pyDL on the same time series file as pyJTK was run on
+    filename : string
+        a name to include in the file name of the results
+    return_results : boolean
+        set to True to save the results in a file and to return the results as a dataframe. Set to False to only save the results to a file. Default: True
+
+    Returns
+    -------
+    if return_results == True
+        dlxjtk_df : pandas.DataFrame
+            DLxJTK results
+    if results_results == False
+        outfile : string
+            the file name of the pyDL results. Can then be used in load_results().
+
+    Examples
+    --------
+    # return the results as a dataframe and save them to the results directory
+    >>> run_dlxjtk(pyjtk_results, pydl_results, 'yeast_ma')
+
+    # only save the results to a file and return the file name
+    >>> run_dlxjtk(pyjtk_results, pydl_results, 'yeast_ma', return_results=False)
+    '''
+
+    with trace_stage('parse'):
+        if type(pyjtk_results) == str:
+            print('Loading periodicity results')
+            jtk_df = load_results(pyjtk_results)
+        elif type(pyjtk_results)==pd.core.frame.DataFrame:
+            jtk_df = pyjtk_results
+        if type(pydl_results) == str:
+            print('Loading periodicity results')
+            dl_df = load_results(pydl_results)
+        elif type(pydl_results)==pd.core.frame.DataFrame:
+            dl_df = pydl_results
+
+    print('-- Running DLxJTK on pyJTK and pyDL results')
+
+    with trace_stage('compute'):
+        dl_df.rename(columns={'p_reg': 'dl_reg_pval', 'p_reg_norm': 'dl_reg_pval_norm'}, inplace=True)
+        jtk_df.rename(columns={'p-value': 'jtk_per_pval'}, inplace=True)
+
+        # normalize jtk p-values for use in dlxjtk score
+        jtk_df['jtk_per_pval_norm'] = jtk_df['jtk_per_pval'] / np.median(jtk_df['jtk_per_pval'])
+
+        # merge dl and jtk dataframes
+        dlxjtk_df = pd.merge(dl_df, jtk_df, left_index=True, right_index=True)
+        dlxjtk_df = dlxjtk_df[['dl_reg_pval', 'dl_reg_pval_norm', 'jtk_per_pval', 'jtk_per_pval_norm']]
+
+        # compute dlxjtk score and sort genes by the score
+        dlxjtk_df['dlxjtk_score'] = dlxjtk_df.apply(dlxjtk_func, axis=1)
+        dlxjtk_df.sort_values(by='dlxjtk_score', axis=0, ascending=True, inplace=True)
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    outfile = f'{filename}__{datetimestr}_dlxjtk.tsv'
+    with trace_stage('serialize'):
+        dlxjtk_df.to_csv(os.path.join('../results/', outfile), sep='\t')
+    print(f'-- Results saved as {outfile} in the results directory')
+
+    if return_results:
+        return dlxjtk_df
+    else:
+        return outfile
@@ -0,0 +1,213 @@
+'''Querying gene records from PlasmoDB.'''
+
+import os
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+
+PLASMODB_RECORD_BASE_URL = 'https://plasmodb.org/plasmo/service/record-types/gene/records'
+PLASMODB_ATTRIBUTES = [
+    "transcript_count",
+    "type_with_pseudo",
+    "gene_type",
+    "genus_species",
+    "is_pseudo",
+    "representative_transcript",
+    "name",
+    "external_db_name",
+    "external_db_version",
+    "source_id",
+    "ds_annotation_version",
+    "chromosome",
+    "location_text",
+    "sequence_id",
+    "strand_plus_minus",
+    "dataset_id",
+    "organism_text",
+    "ec_inferred_description",
+    "show_strains",
+    "strain",
+    "hts_noncoding_snps",
+    "hts_nonsyn_syn_ratio",
+    "hts_nonsynonymous_snps",
+    "hts_stop_codon_snps",
+    "hts_synonymous_snps",
+    "total_hts_snps",
+    "organism_full",
+    "protein_expression_gtracks",
+    "new_gene_name",
+    "new_product_name"
+]
+
+PLASMODB_CACHE_PATH = '../tmp/plasmodb_cache.sqlite'
+PLASMODB_RETRY_STATUS = [429, 500, 502, 503, 504]
+
+
+def plasmodb_session(pool_size=8, retries=3, backoff=0.5):
+    '''
+    Create a requests session for PlasmoDB that keeps up to pool_size connections open and retries failed requests.
+
+    Parameters
+    ----------
+    pool_size : integer
+        the number of connections kept open for reuse. Default: 8
+    retries : integer
+        how often to retry a request after a connection error or a 429/5xx response. Default: 3
+    backoff : float
+        retries wait backoff * 2**(retry - 1) seconds. Default: 0.5
+
+    Returns
+    -------
+    session : requests.Session
+        the configured session
+    '''
+
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=PLASMODB_RETRY_STATUS,
+                  allowed_methods=['POST'], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def _plasmodb_cache_key(gene, attributes):
+    '''Cache key of a query: the gene and its sorted attribute set.'''
+
+    return gene + '\t' + ','.join(sorted(attributes))
+
+
+def _open_plasmodb_cache(cache_path):
+    '''Open (and create if needed) the on-disk PlasmoDB response cache.'''
+
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    cache = sqlite3.connect(cache_path)
+    cache.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)')
+
+    return cache
+
+
+def get_plasmodb_data(genes, attributes, num_threads=8, cache_path=PLASMODB_CACHE_PATH, timeout=30, retries=3, base_url=PLASMODB_RECORD_BASE_URL):
+    '''
+    Retrieve a specific set of attributes for each gene in a given set of genes from PlasmoDB.
+
+    Genes are queried concurrently over a pool of reused connections, failed requests are retried with exponential backoff, and
+    every response is stored in an on-disk cache keyed by gene and attribute set, so repeated lookups do not go over the network.
+
+    Parameters
+    ----------
+    genes : list, tuple
+        a list of genes for which to retrieve the passed attributes
+    attributes : list, tuple, str
+        the desired list of attributes to retrieve from PlasmoDB for each of the passed genes, or "all"; PLASMODB_ATTRIBUTES is the list of all valid attributes
+    num_threads : integer
+        the number of concurrent requests. Default: 8
+    cache_path : string
+        path of the sqlite response cache. Set to None to always query PlasmoDB. Default: PLASMODB_CACHE_PATH
+    timeout : float
+        seconds to wait for PlasmoDB to respond to a request before retrying it. Default: 30
+    retries : integer
+        how often to retry a failed request. Default: 3
+    base_url : string
+        the PlasmoDB record service URL. Default: PLASMODB_RECORD_BASE_URL
+
+    Returns
+    -------
+    A dictionary whose keys are the passed genes and values are the results of querying PlasmoDB for the passed attributes for that gene. Additionally, the key 'failed' returns a list of genes for which there was a problem querying PlasmoDB.
+
+    Examples
+    --------
+    # get the "gene_type" attribute for "PVP01_0000010" and "PVP01_0000020"
+    >>> get_plasmodb_data(["PVP01_0000010", "PVP01_0000020"], ["gene_type"])
+    {'failed': [], 'PVP01_0000010': {'gene_type': 'protein coding gene'}, 'PVP01_0000020': {'gene_type': 'protein coding gene'}}
+    '''
+    if type(genes) is str:
+        raise TypeError("Argument 'genes' must be of type list or tuple, not str")
+    if type(attributes) is str:
+        if attributes.lower() == "all":
+            attributes = PLASMODB_ATTRIBUTES
+        else:
+            attributes = (attributes,)
+    attributes = list(set(attributes))
+
+    invalid_attributes = []
+    for attribute in attributes:
+        if attribute not in PLASMODB_ATTRIBUTES:
+            invalid_attributes.append(attribute)
+    if len(invalid_attributes) > 0:
+        raise ValueError(f"Invalid PlasmoDB attributes {invalid_attributes} passed")
+
+    unique_genes = list(dict.fromkeys(genes))
+    results = dict()
+    cache = _open_plasmodb_cache(cache_path) if cache_path is not None else None
+    if cache is not None:
+        keys = {gene: _plasmodb_cache_key(gene, attributes) for gene in unique_genes}
+        for gene in unique_genes:
+            row = cache.execute('SELECT response FROM responses WHERE key = ?', (keys[gene],)).fetchone()
+            if row is not None:
+                results[gene] = json.loads(row[0])
+
+    failed = set()
+    to_query = [gene for gene in unique_genes if gene not in results]
+    if to_query:
+        session = plasmodb_session(pool_size=num_threads, retries=retries)
+        with session, ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = {executor.submit(query_plasmodb_gene, gene, attributes, session=session, timeout=timeout, base_url=base_url): gene
+                       for gene in to_query}
+            # responses are written to the cache from this thread only
+            for future in as_completed(futures):
+                gene = futures[future]
+                try:
+                    results[gene] = future.result()
+                except RequestException:
+                    failed.add(gene)
+                    continue
+                if cache is not None:
+                    cache.execute('INSERT OR REPLACE INTO responses VALUES (?, ?)', (keys[gene], json.dumps(results[gene])))
+        if cache is not None:
+            cache.commit()
+    if cache is not None:
+        cache.close()
+
+    data = {'failed': [gene for gene in unique_genes if gene in failed]}
+    for gene in unique_genes:
+        if gene in results:
+            data[gene] = results[gene]
+    return data
+
+# plasmoDB HTTP request helper function
+def query_plasmodb_gene(gene, attributes, session=None, timeout=30, base_url=PLASMODB_RECORD_BASE_URL):
+    request_body_json = {
+        "attributes": attributes,
+        "primaryKey": [
+            {
+                "name":"source_id",
+                "value": gene
+            },
+            {
+                "name":"project_id",
+                "value":"PlasmoDB"
+            }
+        ],
+        "tables": []
+    }
+
+    try:
+        response = (session or requests).post(base_url, json=request_body_json, timeout=timeout)
+    except RequestException as e:
+        raise RequestException(f"[ERROR] Could not reach PlasmoDB for gene '{gene}': {e}") from e
+    try:
+        if response.status_code == 200:
+            return response.json()['attributes']
+        else:
+            raise RequestException()
+    except (KeyError, RequestException) as e:
+        raise RequestException(f"[ERROR] Received HTTP status code {response.status_code} from PlasmoDB for gene '{gene}'")
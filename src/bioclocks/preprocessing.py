@@ -0,0 +1,748 @@
+'''Cleaning, normalizing and interpolating time series datasets.'''
+
+import os
+import hashlib
+import warnings
+
+import numpy as np
+import pandas as pd
+from . import io as dataset_io
+
+
+def convert_periods_to_str(periods):
+    '''Convert a list of strings or integers to a single string or convert an integer to a string.'''
+
+    # convert periods to string
+    if isinstance(periods, int):
+        periods = str(periods)
+    elif isinstance(periods, list):
+        if len(periods) > 1:
+            periods = [str(p) for p in periods]
+            periods = ' '.join(periods)
+        else:
+            periods = str(periods[0])
+
+    return periods
+
+
+def duplicate_check(dataset):
+    '''
+    Checks for duplicates and prints out tips for what to do with the duplicates.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        a time series gene expression dataset, where rows are genes and columns are time points
+
+    Returns
+    -------
+    answer : boolean
+        returns True if there are no duplicate gene names in the dataset. Returns False and tips on what to do if duplicate gene names are detected
+    '''
+
+    if dataset.index.is_unique:
+        print('This dataset has no duplicate gene names.')
+        answer = True
+    else:
+        print('This dataset has duplicate gene names. This needs to be corrected.')
+        print('You can either drop duplicates or relabel duplicates.')
+        print('-- Use remove_duplicates() to only keep the duplicate with either the highest gene expression at any time point or highest average gene expression.')
+        print('-- Use relabel_duplicates() to append "dupN" to each duplicate gene name, where N is an integer.')
+        answer = False
+
+    return answer
+
+
+def remove_duplicates(dataset, method):
+    '''
+    Removes duplicate gene names by one of two methods.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        a time series gene expression dataset, where rows are genes and columns are time points
+    method : string
+        either 'max' or 'average'. See Notes for details
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        a time series gene expression dataset with duplicates removed, where rows are genes and columns are time points
+
+    Examples
+    --------
+    # remove duplicates using 'max'
+    >>> remove_duplicates(data_df, 'max')
+
+    # remove duplicates using 'average'
+    >>> remove_duplicates(data_df, 'average')
+
+    Notes
+    -----
+    Method 1 (max): keep only the duplicate with the highest gene expression at any time points.
+    Method 2 (average): keep the duplicate with the hightest average gene expression.
+
+    '''
+
+    df = dataset.copy()
+    df = df.reset_index()
+    idx_drops = list()
+
+    if method == 'average':
+        df[method] = df.mean(numeric_only=True, axis=1)
+    elif method == 'max':
+        df[method] = df.max(numeric_only=True, axis=1)
+    else:
+        print(f'Error: Method must be either "max" or "average". You entered "{method}".')
+        return
+
+    for genename, expression in df.groupby('time_points'):
+        if expression.shape[0] > 1:
+            keep_idx = expression[method].idxmax()
+            drop_idx_list = expression[expression.index != keep_idx].index.tolist()
+            idx_drops += drop_idx_list
+
+    df = df[~df.index.isin(idx_drops)]
+    df = df.set_index('time_points')
+    df = df.drop(labels=[method], axis=1)
+
+    return df
+
+
+def relabel_duplicates(dataset):
+    '''
+    Relabel duplicate gene names by appending "dupN" to each duplicate name where N is an integer.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        a time series gene expression dataset, where rows are genes and columns are time points
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        a time series gene expression dataset with duplicates relabeled, where rows are genes and columns are time points
+
+    Examples
+    --------
+    >>> relabel_duplicates(data_df)
+    '''
+
+    df = dataset.copy()
+    new_index = list()
+
+    for genename, expression in df.groupby('time_points'):
+        if expression.shape[0] > 1:
+            index_list = expression.index.tolist()
+            [new_index.append(f'{idx} dup{i+1}') for idx, i in zip(index_list, range(len(index_list)))]
+        else:
+            new_index.append(genename)
+
+    df.index = new_index
+    df.index.name = 'time_points'
+
+    return df
+
+
+def intersection(lst1, lst2):
+
+    lst2 = set(lst2)
+    lst3 = [value for value in lst1 if value in lst2]
+
+    return lst3
+
+
+def uniques(lst1, lst2, intersection):
+
+    intersection = set(intersection)
+    uniq_lst1 = [value for value in lst1 if value not in intersection]
+    uniq_lst2 = [value for value in lst2 if value not in intersection]
+
+    return uniq_lst1, uniq_lst2
+
+def closest_column(list_columns, n):
+    '''
+    Returns the column from a list of columns that is closest to the number n. List of columns must contain numbers.
+
+    Parameters
+    ----------
+    list_columns : list
+        list of time points taken from the columns of a time series dataframe
+    n : integer or float
+        number which to find closest number in list_columns to
+
+    Returns
+    -------
+    closest_column_int : integer
+        the number in list_columns which n is closest to
+
+    '''
+
+    return list_columns[min(range(len(list_columns)), key = lambda i: abs(list_columns[i]-n))]
+
+
+def get_closest_column_from_period(dataset_df, period):
+    '''
+    Returns the column from the supplied dataset that is closest to the supplied period.
+
+    Parameters
+    ----------
+    dataset_df : pandas.DataFrame
+         time series gene expression dataset, where rows are genes and columns are time points
+    period : integer
+        period which to find the closest timepoint in dataset_df to
+
+    Returns
+    -------
+    closest_column_int : integer
+        the timepoint in dataset_df's columns which the period is closest to
+
+    '''
+    columns_in_df = list(dataset_df.columns)
+    timepoints_numeric = [int(i) for i in columns_in_df]
+    closest_column_int = closest_column(timepoints_numeric, period)
+    return closest_column_int
+
+
+def _zscore_rows(values):
+    '''
+    Z-score each row of a 2D array, matching scipy.stats.zscore(values, axis=1). Rows with zero variance become NaN.
+    '''
+
+    values = np.asarray(values, dtype=float)
+    centered = values - values.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / centered.std(axis=1, keepdims=True)
+
+
+def normalize_data(dataset):
+    ''''
+    Z-score normalize a time series dataframe.
+    '''
+    import scipy.stats
+
+    z_pyjtk = scipy.stats.zscore(dataset, axis=1)
+    return pd.DataFrame(z_pyjtk, index=dataset.index, columns=dataset.columns)
+
+## STRIPEYS
+## function to interpolate stripeys
+# interpolation bases keyed by (source time points, target time points, method, extrapolate)
+_INTERPOLATION_BASES = dict()
+
+INTERPOLATION_METHODS = ['pchip', 'linear', 'spline']
+
+
+def time_point_labels(time_points):
+    '''Column labels for numeric time points, in the dataset convention ('0', '4', '2.5').'''
+
+    return [str(int(tp)) if float(tp).is_integer() else str(float(tp)) for tp in time_points]
+
+
+def interpolation_basis(time_points, target_time_points, method='linear', extrapolate=False):
+    '''
+    Matrix that maps values sampled at time_points onto target_time_points, so that resampled = values @ basis.T for every gene at once.
+    Only linear methods have a basis, so method must be 'linear' or 'spline' (not-a-knot cubic spline). Bases are cached.
+
+    Parameters
+    ----------
+    time_points : list
+        increasing numeric time points the values are sampled at
+    target_time_points : list
+        numeric time points to interpolate at
+    method : string
+        'linear' or 'spline'. Default: 'linear'
+    extrapolate : boolean
+        when False, target time points outside the sampled range give NaN. Default: False
+
+    Returns
+    -------
+    basis : numpy.ndarray
+        array of shape (len(target_time_points), len(time_points))
+    '''
+
+    key = (tuple(time_points), tuple(target_time_points), method, extrapolate)
+    if key in _INTERPOLATION_BASES:
+        return _INTERPOLATION_BASES[key]
+
+    from scipy import interpolate
+
+    time_points = np.asarray(time_points, dtype=float)
+    target_time_points = np.asarray(target_time_points, dtype=float)
+    identity = np.eye(len(time_points))
+    if method == 'linear':
+        interpolant = interpolate.make_interp_spline(time_points, identity, k=1)
+    elif method == 'spline':
+        interpolant = interpolate.CubicSpline(time_points, identity, axis=0, bc_type='not-a-knot' if len(time_points) > 3 else 'natural')
+    else:
+        raise ValueError(f'method must be "linear" or "spline" to build an interpolation basis, not "{method}"')
+
+    basis = interpolant(target_time_points)
+    if not extrapolate:
+        basis[(target_time_points < time_points[0]) | (target_time_points > time_points[-1])] = np.nan
+    _INTERPOLATION_BASES[key] = basis
+
+    return basis
+
+
+def _sorted_time_points(columns):
+    '''Numeric time points of dataset columns in increasing order, with the column order that sorts them.'''
+
+    time_points = pd.to_numeric(columns).to_numpy(dtype=float)
+    column_order = np.argsort(time_points, kind='stable')
+    time_points = time_points[column_order]
+    if (np.diff(time_points) == 0).any():
+        raise ValueError('dataset has duplicate time points. Use remove_duplicates or relabel_duplicates first.')
+
+    return time_points, column_order
+
+
+def _target_grid(time_points, target_time_points=None, step=None):
+    '''Sorted target time points, or a uniform grid over time_points with the given step (default: the median spacing).'''
+
+    if target_time_points is None:
+        if step is None:
+            step = np.median(np.diff(time_points))
+        target_time_points = np.arange(time_points[0], time_points[-1] + step / 2, step)
+
+    return np.sort(np.asarray(target_time_points, dtype=float))
+
+
+def _resample_values(values, time_points, target_time_points, method='pchip', extrapolate=False):
+    '''Interpolate the rows of values, sampled at increasing time_points, onto target_time_points. See resample_timepoints.'''
+
+    from scipy.interpolate import PchipInterpolator
+
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f'method must be one of {INTERPOLATION_METHODS}, not "{method}"')
+
+    resampled = np.full((values.shape[0], len(target_time_points)), np.nan)
+    missing = np.isnan(values)
+    if missing.any():
+        patterns, gene_pattern = np.unique(missing, axis=0, return_inverse=True)
+        gene_pattern = gene_pattern.ravel()
+    else:
+        patterns, gene_pattern = missing[:1], np.zeros(values.shape[0], dtype=int)
+
+    for pattern_nr, pattern in enumerate(patterns):
+        genes = gene_pattern == pattern_nr
+        observed = ~pattern
+        if observed.sum() < 2:
+            # too few points to interpolate between: keep the observed values where the targets include their time points
+            target, source = np.nonzero(target_time_points[:, None] == time_points[observed][None])
+            resampled[np.ix_(genes, target)] = values[genes][:, observed][:, source]
+            continue
+        if method == 'pchip':
+            interpolant = PchipInterpolator(time_points[observed], values[genes][:, observed], axis=1, extrapolate=extrapolate)
+            resampled[genes] = interpolant(target_time_points)
+        else:
+            basis = interpolation_basis(time_points[observed], target_time_points, method=method, extrapolate=extrapolate)
+            resampled[genes] = values[genes][:, observed] @ basis.T
+
+    return resampled
+
+
+def resample_timepoints(dataset, target_time_points=None, method='pchip', step=None, extrapolate=False):
+    '''
+    Interpolate every gene of a dataset onto a new set of time points at once, e.g. to fill in missing time points or to put an unevenly
+    sampled dataset on a uniform grid for FFT based periodicity methods.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points. Columns do not need to be sorted or evenly spaced
+    target_time_points : list
+        numeric time points to interpolate at. When None, a uniform grid from the first to the last time point is used. Default: None
+    method : string
+        'pchip' (shape preserving cubic), 'linear' or 'spline' (not-a-knot cubic spline). Default: 'pchip'
+    step : float
+        spacing of the uniform grid when target_time_points is None. Defaults to the median spacing of the dataset
+    extrapolate : boolean
+        when False, time points outside the sampled range are NaN. Default: False
+
+    Returns
+    -------
+    resampled_df : pandas.DataFrame
+        the dataset at the target time points, with sorted string column labels
+
+    Examples
+    --------
+    # put an unevenly sampled dataset on a 5 minute grid
+    >>> resample_timepoints(data_df, step=5)
+
+    # spline interpolate onto specific time points
+    >>> resample_timepoints(data_df, [0, 10, 20, 30], method='spline')
+
+    Notes
+    -----
+    Linear and spline interpolation are linear in the data, so they are applied as one matrix product with a cached basis. PCHIP slopes depend
+    on the data, so it is evaluated with one vectorized PchipInterpolator call over all genes instead. Genes with missing values are grouped by
+    their pattern of missing time points and interpolated from the time points they do have. Genes observed at fewer than two time points
+    keep their observed values and are NaN at the other target time points.
+    '''
+
+    time_points, column_order = _sorted_time_points(dataset.columns)
+    values = dataset.to_numpy(dtype=float)[:, column_order]
+    target_time_points = _target_grid(time_points, target_time_points, step)
+    resampled = _resample_values(values, time_points, target_time_points, method, extrapolate)
+
+    return pd.DataFrame(resampled, index=dataset.index, columns=pd.Index(time_point_labels(target_time_points), name=dataset.columns.name))
+
+
+def interpolate_timepoints(df, timepoints, method_option = "pchip"):
+
+    '''
+    Interpolate specified timepoints from a pandas timeseries DataFrame.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        the time series dataset as a dataframe.
+    timepoints: list
+        the list of the names of the timepoints to be interpolated
+    method_option : string
+        'pchip', 'linear' or 'spline'. Default: 'pchip'
+
+    Returns
+    -------
+    dataset: pandas.DataFrame
+        Time series dataset with interpolated timepoints, with the columns in time order
+
+    Examples
+    --------
+    # interpolate the timepoints 145, 175, 180
+    >>> interpolate_timepoints(data_df, ["145", "175", "180"])
+    '''
+    time_points = pd.to_numeric(df.columns).to_numpy(dtype=float)
+    new_time_points = pd.to_numeric(pd.Index(timepoints)).to_numpy(dtype=float)
+
+    return resample_timepoints(df, np.union1d(time_points, new_time_points), method=method_option)
+
+
+def _quantile_normalize(values, dtype=np.float64):
+    '''Quantile normalize the columns of a 2D array. See qn_normalize.'''
+
+    # one row per sample so that every sort runs over contiguous memory
+    samples = np.ascontiguousarray(np.asarray(values, dtype=dtype).T)
+    nr_cols, nr_rows = samples.shape
+
+    # one sort per column, NaNs go last
+    order = np.argsort(samples, axis=1)
+    sorted_samples = np.take_along_axis(samples, order, axis=1)
+    nr_valid = nr_rows - np.isnan(samples).sum(axis=1)
+
+    if (nr_valid == nr_rows).all():
+        reference = sorted_samples.mean(axis=0, dtype=np.float64).astype(dtype)
+        targets = np.broadcast_to(reference, samples.shape)
+    else:
+        # map every column onto a common quantile grid, then back onto its own non-NaN ranks
+        grid = np.linspace(0, 1, nr_rows)
+        quantiles = np.full(samples.shape, np.nan)
+        for col in np.flatnonzero(nr_valid):
+            quantiles[col] = np.interp(grid * (nr_valid[col] - 1), np.arange(nr_valid[col]), sorted_samples[col, :nr_valid[col]])
+        reference = np.nanmean(quantiles, axis=0)
+        targets = np.full(samples.shape, np.nan, dtype=dtype)
+        for col in np.flatnonzero(nr_valid):
+            rank_quantiles = np.arange(nr_valid[col]) / max(nr_valid[col] - 1, 1)
+            targets[col, :nr_valid[col]] = np.interp(rank_quantiles, grid, reference)
+
+    # average the targets over each run of tied values, numbering the runs across all columns
+    new_run = np.ones(samples.shape, dtype=bool)
+    new_run[:, 1:] = sorted_samples[:, 1:] != sorted_samples[:, :-1]
+    if new_run.all():
+        averaged = targets
+    else:
+        runs = np.cumsum(new_run.ravel()) - 1
+        flat_targets = targets.ravel()
+        valid = ~np.isnan(flat_targets)
+        run_sums = np.bincount(runs[valid], weights=flat_targets[valid], minlength=runs[-1] + 1)
+        run_sizes = np.bincount(runs[valid], minlength=runs[-1] + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averaged = (run_sums / run_sizes)[runs].reshape(samples.shape).astype(dtype)
+        averaged[np.isnan(targets)] = np.nan
+
+    normalized = np.empty_like(samples)
+    np.put_along_axis(normalized, order, averaged, axis=1)
+
+    return normalized.T
+
+
+#function to quantial normalize pandas df
+#function from Rob Moseley
+def qn_normalize(df, dtype=np.float64, inplace=False):
+    '''
+    Perform basic quantile normalization on a pandas dataframe
+
+    Every column is mapped onto the mean of the sorted columns. Tied values get the average of the reference values over the ranks they
+    share. NaNs are left in place and each column's non-NaN values are mapped onto the reference by quantile.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        the time series dataset as a dataframe. T
+    dtype : numpy dtype
+        floating point type to compute in. np.float32 halves the memory of large datasets. Default: np.float64
+    inplace : boolean
+        write the normalized values into df instead of a new dataframe. Default: False
+
+    Returns
+    -------
+    dataset: pandas.DataFrame
+        quantile normalized time series dataset (df itself when inplace is True)
+
+    Examples
+    --------
+    # return the QN'd dataset
+    >>> qn_normalize(data_df)
+
+    '''
+    normalized = _quantile_normalize(df.to_numpy(dtype=dtype), dtype)
+
+    if inplace:
+        df[df.columns] = normalized
+        return df
+
+    return pd.DataFrame(normalized, index=df.index, columns=df.columns)
+
+
+############ Preprocessing pipeline ############
+
+# steps a preprocessing pipeline can contain, with their default options
+PREPROCESSING_STEPS = {
+    'remove_duplicates': {'method': 'max'},
+    'relabel_duplicates': {},
+    'interpolate_timepoints': {'timepoints': (), 'method': 'pchip'},
+    'resample': {'target_time_points': None, 'step': None, 'method': 'pchip', 'extrapolate': False},
+    'qn_normalize': {'dtype': 'float64'},
+    'normalize_data': {},
+}
+
+# materialized pipelines keyed by (dataset key, pipeline spec)
+_PREPROCESSING_CACHE = dict()
+
+
+def preprocessing_spec(steps):
+    '''
+    Validate a list of preprocessing steps and return it as a hashable spec with every option filled in.
+
+    Parameters
+    ----------
+    steps : list
+        step names, or (name, options dict) tuples. See PREPROCESSING_STEPS for the steps and their options
+
+    Returns
+    -------
+    spec : tuple
+        one (name, ((option, value), ...)) tuple per step
+
+    Examples
+    --------
+    >>> preprocessing_spec(['remove_duplicates', ('resample', {'step': 2}), 'qn_normalize'])
+    '''
+
+    spec = list()
+    for step in steps:
+        name, options = (step, dict()) if isinstance(step, str) else (step[0], dict(step[1]))
+        if name not in PREPROCESSING_STEPS:
+            raise ValueError(f'Unknown preprocessing step "{name}". Choose from {list(PREPROCESSING_STEPS)}')
+        unknown = set(options) - set(PREPROCESSING_STEPS[name])
+        if unknown:
+            raise ValueError(f'Unknown options {sorted(unknown)} for preprocessing step "{name}"')
+        if name == 'remove_duplicates' and options.get('method', 'max') not in ('max', 'average'):
+            raise ValueError(f'Method must be either "max" or "average". You entered "{options["method"]}".')
+
+        options = {**PREPROCESSING_STEPS[name], **options}
+        options = {key: tuple(value) if isinstance(value, (list, np.ndarray, pd.Index)) else value for key, value in options.items()}
+        if 'dtype' in options:
+            options['dtype'] = np.dtype(options['dtype']).name
+        spec.append((name, tuple(sorted(options.items()))))
+
+    return tuple(spec)
+
+
+def _dataset_key(dataset):
+    '''Cache key of a dataset name (with the file modification time) or dataframe (with a hash of its contents).'''
+
+    if isinstance(dataset, str):
+        dataset_name = dataset if '.tsv' in dataset else dataset + '.tsv'
+        return ('file', dataset_name, os.path.getmtime(os.path.join(dataset_io.DATADIR, dataset_name)))
+
+    content_hash = hashlib.sha1(pd.util.hash_pandas_object(dataset, index=True).to_numpy().tobytes())
+    content_hash.update(repr(list(dataset.columns)).encode())
+
+    return ('frame', content_hash.hexdigest())
+
+
+def preprocess(dataset, steps, use_cache=True):
+    '''
+    Run a preprocessing pipeline on a dataset and cache the result, so that run_periodicity, run_lem and plotting functions can share
+    one preprocessed matrix.
+
+    The steps are fused: duplicate handling only selects and relabels rows, the expression values are copied out of the dataset once,
+    and quantile and z-score normalization work on that single array instead of a new dataframe per step.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame or string
+        time series gene expression dataset, where rows are genes and columns are time points, or the name of a dataset to load
+    steps : list
+        step names, or (name, options dict) tuples, applied in order:
+        'remove_duplicates' (method: 'max' or 'average'), 'relabel_duplicates', 'interpolate_timepoints' (timepoints, method),
+        'resample' (target_time_points, step, method, extrapolate), 'qn_normalize' (dtype) and 'normalize_data'
+    use_cache : boolean
+        return the cached result when the same dataset was run through the same steps before. Default: True
+
+    Returns
+    -------
+    preprocessed_df : pandas.DataFrame
+        the preprocessed dataset. Cached results are shared, so copy it before modifying it in place
+
+    Examples
+    --------
+    >>> steps = ['remove_duplicates', ('resample', {'step': 2, 'method': 'pchip'}), 'qn_normalize']
+    >>> data_df = preprocess('Scerevisiae_WT1_Microarray', steps)
+    >>> run_periodicity('Scerevisiae_WT1_Microarray', 75, 100, 5, 95, 'yeast_ma', preprocessing=steps)
+    '''
+
+    spec = preprocessing_spec(steps)
+    key = (_dataset_key(dataset), spec) if use_cache else None
+    if key in _PREPROCESSING_CACHE:
+        return _PREPROCESSING_CACHE[key]
+
+    frame = dataset_io.load_dataset(dataset) if isinstance(dataset, str) else dataset
+    source = frame.to_numpy(dtype=float, copy=False)
+    rows = np.arange(source.shape[0])
+    genes = frame.index
+    labels = frame.columns
+    values = None
+
+    for name, options in spec:
+        options = dict(options)
+
+        if name == 'remove_duplicates':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                scores = (np.nanmax if options['method'] == 'max' else np.nanmean)(source[rows] if values is None else values, axis=1)
+            scores = np.where(np.isnan(scores), -np.inf, scores)
+            codes = pd.factorize(genes)[0]
+            # for each gene keep the first row with the highest score, in the original row order
+            order = np.lexsort((np.arange(len(codes)), -scores, codes))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = codes[order][1:] != codes[order][:-1]
+            keep = np.sort(order[first])
+            rows, genes = rows[keep], genes[keep]
+            if values is not None:
+                values = values[keep]
+
+        elif name == 'relabel_duplicates':
+            codes = pd.factorize(genes)[0]
+            duplicated = np.bincount(codes)[codes] > 1
+            occurrence = pd.Series(codes).groupby(codes).cumcount().to_numpy() + 1
+            relabeled = genes.astype(str) + ' dup' + pd.Index(occurrence.astype(str))
+            genes = pd.Index(np.where(duplicated, relabeled, genes.astype(str)), name=genes.name)
+
+        else:
+            if values is None:
+                # first step that changes values: copy them out of the dataset once
+                values = source[rows] if len(rows) < source.shape[0] else source.copy()
+
+            if name in ('interpolate_timepoints', 'resample'):
+                time_points, column_order = _sorted_time_points(labels)
+                if name == 'interpolate_timepoints':
+                    target = np.union1d(time_points, pd.to_numeric(pd.Index(options['timepoints'])).to_numpy(dtype=float))
+                    extrapolate = False
+                else:
+                    target = _target_grid(time_points, options['target_time_points'], options['step'])
+                    extrapolate = options['extrapolate']
+                values = _resample_values(values[:, column_order], time_points, target, options['method'], extrapolate)
+                labels = pd.Index(time_point_labels(target), name=labels.name)
+            elif name == 'qn_normalize':
+                values = _quantile_normalize(values, np.dtype(options['dtype']))
+            elif name == 'normalize_data':
+                values -= values.mean(axis=1, keepdims=True)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values /= values.std(axis=1, keepdims=True)
+
+    if values is None:
+        values = source[rows] if len(rows) < source.shape[0] else source.copy()
+    preprocessed_df = pd.DataFrame(values, index=genes, columns=labels, copy=False)
+
+    if use_cache:
+        _PREPROCESSING_CACHE[key] = preprocessed_df
+
+    return preprocessed_df
+
+
+def clear_preprocessing_cache():
+    '''Forget every cached preprocess result.'''
+
+    _PREPROCESSING_CACHE.clear()
+
+
+############ Gene triage ############
+
+# triage rules and their defaults. None turns a rule off
+TRIAGE_RULES = {
+    'min_expression': None,
+    'min_variance': None,
+    'min_amplitude': None,
+    'max_missing': None,
+}
+
+
+def triage_genes(dataset, min_expression=None, min_variance=None, min_amplitude=None, max_missing=None):
+    '''
+    Remove genes that cannot score as periodic before running the periodicity algorithms: genes that are never expressed, are flat,
+    or have too many missing values. Each rule is one vectorized summary statistic over the time points.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    min_expression : float
+        remove genes whose highest expression is below this floor. Default: None
+    min_variance : float
+        remove genes whose variance over time is below this. Default: None
+    min_amplitude : float
+        remove genes whose peak-to-trough range is below this fraction of their mean expression. Default: None
+    max_missing : float
+        remove genes with more than this fraction of missing time points. Default: None
+
+    Returns
+    -------
+    kept_df : pandas.DataFrame
+        the genes that passed every rule
+    triage_df : pandas.DataFrame
+        the removed genes with their summary statistics and the first rule each one failed ('reason')
+
+    Examples
+    --------
+    >>> kept_df, triage_df = triage_genes(data_df, min_expression=1, min_amplitude=0.2)
+    '''
+
+    values = dataset.to_numpy(dtype=float)
+    missing = np.isnan(values)
+    with warnings.catch_warnings():
+        # all-missing genes give NaN statistics and fail the rules below
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        maximum = np.nanmax(values, axis=1)
+        minimum = np.nanmin(values, axis=1)
+        mean = np.nanmean(values, axis=1)
+        variance = np.nanvar(values, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amplitude = np.where(mean != 0, (maximum - minimum) / np.abs(mean), 0.0)
+    statistics = pd.DataFrame({'max_expression': maximum, 'mean_expression': mean, 'variance': variance,
+                               'amplitude': amplitude, 'missing': missing.mean(axis=1)}, index=dataset.index)
+
+    rules = [('max_missing', statistics['missing'].to_numpy() > max_missing if max_missing is not None else None),
+             ('min_expression', ~(maximum >= min_expression) if min_expression is not None else None),
+             ('min_variance', ~(variance >= min_variance) if min_variance is not None else None),
+             ('min_amplitude', ~(amplitude >= min_amplitude) if min_amplitude is not None else None)]
+    reason = np.full(len(values), '', dtype=object)
+    for rule, failed in rules:
+        if failed is not None:
+            reason[(reason == '') & failed] = rule
+    removed = reason != ''
+
+    triage_df = statistics[removed].assign(reason=reason[removed])
+
+    return dataset[~removed], triage_df
@@ -0,0 +1,218 @@
+'''
+JTK, DL and Lomb-Scargle on replicate time series of the same genes, e.g. Scerevisiae_noAPC_r1 and Scerevisiae_noAPC_r2.
+
+All replicates go through each algorithm together twice: once stacked (the genes of every replicate as rows, on the union of their time
+points) for the per-replicate statistics, and once side by side (every observation of a gene as a column, repeated time points being
+replicates) for the joint statistics. The reference waveforms and null distributions of JTK and the frequency grid of Lomb-Scargle are
+then set up once per distinct sampling design instead of once per replicate.
+'''
+
+import os
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .io import load_dataset
+from .preprocessing import preprocess
+from .jtk import jtk_cycle
+from .dl import dl_null_values, de_lichtenberg
+from .lombscargle import LS_METHODS, lomb_scargle
+from .distributed import periodicity_output_names
+from .tracing import traced, trace_stage
+
+
+def align_replicates(datasets, replicate_names=None):
+    '''
+    Load replicate datasets and keep the genes they have in common.
+
+    Parameters
+    ----------
+    datasets : list
+        the replicate datasets, as dataframes or dataset names
+    replicate_names : list
+        a short name for each replicate, used in the result column names. Default: None, for the dataset names or r1, r2, ...
+
+    Returns
+    -------
+    replicates : dict
+        replicate name -> dataset, all with the same genes in the same order and with numeric time points as columns
+    '''
+
+    if len(datasets) < 2:
+        raise ValueError('Give at least two replicate datasets')
+    if replicate_names is None:
+        replicate_names = [dataset if isinstance(dataset, str) else f'r{nr + 1}' for nr, dataset in enumerate(datasets)]
+    if len(set(replicate_names)) != len(datasets):
+        raise ValueError(f'Give one unique name per replicate, not {replicate_names}')
+
+    frames = [load_dataset(dataset) if isinstance(dataset, str) else dataset for dataset in datasets]
+    if not all(frame.index.equals(frames[0].index) for frame in frames[1:]):
+        if any(frame.index.duplicated().any() for frame in frames):
+            raise ValueError('The replicates list different genes and some genes more than once. Run remove_duplicates on them first')
+        common = frames[0].index[frames[0].index.isin(frames[1].index)]
+        for frame in frames[2:]:
+            common = common[common.isin(frame.index)]
+        frames = [frame.loc[common] for frame in frames]
+
+    replicates = dict()
+    for name, frame in zip(replicate_names, frames):
+        frame = frame.copy()
+        frame.columns = pd.to_numeric(frame.columns).astype(float)
+        replicates[name] = frame
+
+    return replicates
+
+
+def _split_replicates(results_df, names, nr_genes, genes):
+    # per-replicate results of the stacked genes (rows in replicate order), as columns <column>_<replicate> in the original gene order
+    results_df = results_df.sort_index()
+    columns = list()
+    for nr, name in enumerate(names):
+        columns.append(results_df.iloc[nr * nr_genes:(nr + 1) * nr_genes].reset_index(drop=True).add_suffix(f'_{name}'))
+
+    return pd.concat(columns, axis=1).set_axis(genes)
+
+
+def replicate_periodicity(replicates, min_period, max_period, period_step, avg_period, test_freq=4, ls_method='exact', numb_reg=1000000,
+                          numb_per=100000, significance=None, seed=None):
+    '''
+    Joint and per-replicate JTK, DL and Lomb-Scargle statistics of aligned replicates.
+
+    Parameters
+    ----------
+    replicates : dict
+        replicate name -> dataset, from align_replicates
+    min_period, max_period, period_step : integer
+        the periods to examine in JTK and Lomb-Scargle
+    avg_period : integer
+        the period to examine in DL
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    numb_reg, numb_per : integer
+        number of random curves for the DL regulation and periodicity p-values. Default: 1000000, 100000
+    significance : float
+        p-value threshold for adaptive sampling in DL, see de_lichtenberg. Default: None
+    seed : integer
+        seed of the DL random curves. Default: None
+
+    Returns
+    -------
+    jtk_df, dl_df, ls_df : pandas.DataFrame
+        for each gene the joint statistics, in the columns of jtk_cycle, de_lichtenberg and lomb_scargle, followed by the same columns
+        for each replicate with the replicate name appended (e.g. 'p-value_r1'), sorted by the joint p-value
+    '''
+
+    if ls_method not in LS_METHODS:
+        raise ValueError(f'ls_method must be one of {LS_METHODS}, not "{ls_method}"')
+
+    names = list(replicates)
+    genes = replicates[names[0]].index
+    nr_genes = len(genes)
+    periods = np.arange(min_period, max_period + period_step, period_step).tolist()
+
+    # the genes of all replicates as rows on the union of their time points, numbered so that the order can be restored
+    stacked = pd.concat(replicates.values(), ignore_index=True).sort_index(axis=1)
+    # every observation of a gene as a column, repeated time points are replicates
+    joint = pd.concat([frame.set_axis(range(nr_genes)) for frame in replicates.values()], axis=1)
+    null_values = dl_null_values(stacked)
+
+    results = list()
+    for engine in ('jtk', 'dl', 'ls'):
+        engine_results = list()
+        for frame in (joint, stacked):
+            if engine == 'jtk':
+                engine_results.append(jtk_cycle(frame, periods))
+            elif engine == 'dl':
+                engine_results.append(de_lichtenberg(frame, avg_period, numb_reg=numb_reg, numb_per=numb_per, significance=significance,
+                                                     seed=seed, null_values=null_values))
+            else:
+                # one frequency grid for the joint and the per replicate scans, sized for the time points of one replicate
+                engine_results.append(lomb_scargle(frame, min_period, max_period, test_freq, method=ls_method,
+                                                   nr_time_points=stacked.shape[1]))
+        joint_df, stacked_df = engine_results
+        joint_df = joint_df.sort_index().set_axis(genes)
+        results_df = pd.concat([joint_df, _split_replicates(stacked_df, names, nr_genes, genes)], axis=1)
+        sort_column = {'jtk': 'p-value', 'dl': 'p_reg', 'ls': 'p-value'}[engine]
+        results.append(results_df.sort_values(sort_column, kind='stable'))
+
+    return tuple(results)
+
+
+@traced
+def run_periodicity_replicates(datasets, min_period, max_period, period_step, avg_period, filename, replicate_names=None, test_freq=4,
+                               ls_method='exact', numb_reg=1000000, numb_per=100000, significance=None, preprocessing=None,
+                               return_results=True):
+    '''
+    Run JTK, DL and Lomb-Scargle jointly on replicate datasets of the same genes, see replicate_periodicity. The results are saved under
+    the same names as those of run_pyjtk, run_pydl and run_ls, with the per-replicate columns next to the joint ones, so load_results
+    and run_dlxjtk (which uses the joint p-values) read them unchanged. Each algorithm runs once for all replicates, see
+    replicate_periodicity.
+
+    Parameters
+    ----------
+    datasets : list
+        the replicate datasets, as dataframes or dataset names
+    min_period : integer
+        the minimum periods to examine in JTK and Lomb-Scargle
+    max_period : integer
+        the maximum periods to examine in JTK and Lomb-Scargle
+    period_step : integer
+        the stepsize for building the range of periods to examine in JTK
+    avg_period : integer
+        the period to examine in DL
+    filename : string
+        a name to include in the file name of the results
+    replicate_names : list
+        a short name for each replicate, see align_replicates. Default: None
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls. Default: 4
+    ls_method : string
+        'exact' or 'fast', see lomb_scargle. Default: 'exact'
+    numb_reg : integer
+        number of random curves for empirical regulation p-value in DL. Default: 1000000
+    numb_per : integer
+        number of random curves for empirical periodicity p-value in DL. Default: 100000
+    significance : float
+        p-value threshold for adaptive sampling in DL, see de_lichtenberg. Default: None
+    preprocessing : list
+        preprocessing steps to run on each replicate first, see preprocess. Default: None
+    return_results : boolean
+        set to True to save the results and to return them as dataframes. Set to False to only save the results. Default: True
+
+    Returns
+    -------
+    if return_results == True
+        jtk_results, dl_results, ls_results : pandas.DataFrame
+    if return_results == False
+        pyjtk_results_path, pydl_results_path, ls_results_path : string
+            the names of the results, which can be used in load_results()
+
+    Examples
+    --------
+    >>> run_periodicity_replicates(['Scerevisiae_noAPC_r1', 'Scerevisiae_noAPC_r2'], 75, 100, 5, 95, 'noAPC', replicate_names=['r1', 'r2'])
+    '''
+
+    with trace_stage('preprocess'):
+        if preprocessing is not None:
+            datasets = [preprocess(dataset, preprocessing) for dataset in datasets]
+        replicates = align_replicates(datasets, replicate_names)
+
+    print(f'-- Running JTK, DL and Lomb-Scargle on {len(replicates)} replicates of {len(next(iter(replicates.values())))} genes')
+    with trace_stage('compute'):
+        results = replicate_periodicity(replicates, min_period, max_period, period_step, avg_period, test_freq=test_freq,
+                                        ls_method=ls_method, numb_reg=numb_reg, numb_per=numb_per, significance=significance)
+
+    datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    outputs = periodicity_output_names(f'{filename}__{datetimestr}', min_period, max_period, period_step, avg_period, test_freq)
+    with trace_stage('serialize'):
+        results[0].to_csv(os.path.join('../results', outputs[0]), sep='\t')
+        results[1].to_csv(os.path.join('../results', outputs[1]), sep='\t')
+        os.makedirs(os.path.join('../results', outputs[2]), exist_ok=True)
+        results[2].rename_axis('probe').reset_index().to_csv(os.path.join('../results', outputs[2], f'{outputs[2]}_summary.tsv'),
+                                                            sep='\t', index_label='index')
+    print(f'-- Results saved as {outputs[0]}, {outputs[1]} and in {outputs[2]} in the results directory')
+
+    return results if return_results else outputs
@@ -0,0 +1,292 @@
+'''
+JTK and Lomb-Scargle results of a time course that grows one time point at a time, e.g. while an experiment is being sampled.
+
+The state keeps, for every gene, Kendall's S against each JTK reference waveform and the Lomb-Scargle sums over time points at each test
+frequency. Adding a time point adds its pairs with the earlier observations to S, in O(genes x observations x references), and its
+terms to the sums, in O(genes x frequencies), instead of recomputing everything from the whole matrix. The results are the same as
+those of jtk_cycle and lomb_scargle (method 'exact') on the matrix seen so far, including genes with missing values. The Lomb-Scargle
+frequency grid is fixed when the stream starts, sized for the number of time points the complete course will have, so lomb_scargle
+gives the same results with nr_time_points set to that number. The one exception is JTK for genes missing the first time point: jtk_cycle counts their reference phases from their own first time point, so unless the
+periods and that offset are multiples of the phase step it tests slightly different phases, and it may break ties differently.
+'''
+
+import numpy as np
+import pandas as pd
+
+from .jtk import _jtk_upper_tail, _jtk_references
+from .lombscargle import SUMMARY_COLUMNS, test_frequencies, independent_frequencies, _nyquist_frequency, _summary_frame
+
+# the number of (gene, frequency) values processed at a time
+_CHUNK_SIZE = 2**22
+
+
+def streaming_state(genes, min_period, max_period, period_step, test_freq, nr_time_points, phase_step):
+    '''
+    An empty streaming periodicity state, to which time points are added with add_time_point.
+
+    Parameters
+    ----------
+    genes : list
+        the genes, in the order of the values of each time point
+    min_period, max_period, period_step : float
+        the periods to examine, as in run_pyjtk (JTK) and run_ls (Lomb-Scargle)
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls
+    nr_time_points : integer
+        the number of time points of the complete course, which with test_freq sets the Lomb-Scargle frequency grid
+    phase_step : float
+        the spacing of the JTK phases, usually the sampling interval
+
+    Returns
+    -------
+    state : dict
+        the running statistics. Use it only through add_time_point and streaming_results
+    '''
+
+    periods = np.arange(min_period, max_period + period_step, period_step)
+    frequencies = test_frequencies(min_period, max_period, test_freq, nr_time_points)
+    references = _jtk_references(periods.astype(float), phase_step)
+    nr_genes = len(genes)
+
+    return {'genes': pd.Index(genes),
+            'references': references,
+            'frequencies': frequencies,
+            'first_time_point': None,
+            'time_points': list(),
+            # every observation so far, for the pairs of the next one. Columns are allocated in doubling blocks
+            'values': np.empty((nr_genes, 0)),
+            'waveforms': np.empty((0, len(references))),
+            'jtk_s': np.zeros((nr_genes, len(references))),
+            # the sums of (value - shift), (value - shift)^2 and (value - shift) exp(2 pi i f t), shifted by the first value of each
+            # gene to keep the variance accurate
+            'shift': np.full(nr_genes, np.nan),
+            'sum_values': np.zeros(nr_genes),
+            'sum_squares': np.zeros(nr_genes),
+            'trig_sums': np.zeros((nr_genes, len(frequencies)), dtype=complex),
+            # genes observed at the same time points share a pattern, with the replicate count of each time point and the sums of
+            # exp(2 pi i f t) and exp(4 pi i f t) over them
+            'gene_pattern': np.zeros(nr_genes, dtype=int),
+            'patterns': [{'counts': dict(), 'nr_observed': 0, 'trig': np.zeros(len(frequencies), dtype=complex),
+                          'trig2': np.zeros(len(frequencies), dtype=complex)}],
+            # JTK null distribution upper tails by replicate counts
+            'null_tails': dict()}
+
+
+def add_time_point(state, time_point, values):
+    '''
+    Add the values of one time point to a streaming state. Repeated time points are replicates.
+
+    Parameters
+    ----------
+    state : dict
+        from streaming_state, updated in place
+    time_point : float
+        the sampling time, in the units of the periods
+    values : pandas.Series or numpy.ndarray
+        the expression of each gene, by gene name or in the order of the state's genes. Missing values (NaN) are left out
+
+    Returns
+    -------
+    state : dict
+        the same state
+    '''
+
+    if isinstance(values, pd.Series) and not values.index.equals(state['genes']):
+        values = values.reindex(state['genes'])
+    values = np.asarray(values, dtype=float)
+    if values.shape != state['shift'].shape:
+        raise ValueError(f'Give one value per gene ({len(state["shift"])}), not {values.shape}')
+    if state['first_time_point'] is None:
+        state['first_time_point'] = float(time_point)
+    # relative to the first time point and rounded as in jtk_design_key, so that tied reference values tie exactly
+    t = round(float(time_point) - state['first_time_point'], 6)
+    observed = ~np.isnan(values)
+
+    # JTK: the pairs of this observation with each earlier one at another time point
+    periods, phases = state['references'].T
+    waveform = np.round(np.cos(2 * np.pi * (t - phases) / periods), 10)
+    nr_observations = len(state['time_points'])
+    if nr_observations:
+        reference_signs = np.sign(waveform - state['waveforms'][:nr_observations])
+        reference_signs[np.array(state['time_points']) == t] = 0
+        value_signs = np.nan_to_num(np.sign(values[:, None] - state['values'][:, :nr_observations]))
+        state['jtk_s'] += value_signs @ reference_signs
+    if nr_observations == state['values'].shape[1]:
+        capacity = max(2 * nr_observations, 16)
+        state['values'] = np.concatenate([state['values'], np.full((len(values), capacity - nr_observations), np.nan)], axis=1)
+        state['waveforms'] = np.concatenate([state['waveforms'], np.zeros((capacity - nr_observations, len(waveform)))])
+    state['values'][:, nr_observations] = values
+    state['waveforms'][nr_observations] = waveform
+    state['time_points'].append(t)
+
+    # Lomb-Scargle
+    first = observed & np.isnan(state['shift'])
+    state['shift'][first] = values[first]
+    shifted = np.where(observed, values - state['shift'], 0)
+    phasor = np.exp(2j * np.pi * state['frequencies'] * t)
+    state['sum_values'] += shifted
+    state['sum_squares'] += shifted**2
+    state['trig_sums'] += shifted[:, None] * phasor
+
+    # the new patterns of observed time points
+    pattern_keys, gene_pattern = np.unique(2 * state['gene_pattern'] + observed, return_inverse=True)
+    patterns = list()
+    for pattern_key in pattern_keys:
+        pattern = state['patterns'][pattern_key // 2]
+        if pattern_key % 2:
+            counts = dict(pattern['counts'])
+            counts[t] = counts.get(t, 0) + 1
+            pattern = {'counts': counts, 'nr_observed': pattern['nr_observed'] + 1, 'trig': pattern['trig'] + phasor,
+                       'trig2': pattern['trig2'] + phasor**2}
+        patterns.append(pattern)
+    state['patterns'] = patterns
+    state['gene_pattern'] = gene_pattern.ravel()
+
+    return state
+
+
+def _streaming_jtk(state, genes, pattern):
+    # the best reference of each gene of one pattern and its p-values, as _jtk_values in jtk
+    counts = tuple(pattern['counts'][t] for t in sorted(pattern['counts']))
+    if counts not in state['null_tails']:
+        state['null_tails'][counts] = _jtk_upper_tail(counts)
+    max_s = (pattern['nr_observed']**2 - np.sum(np.square(counts))) // 2
+
+    s = state['jtk_s'][genes]
+    best = np.abs(s).argmax(axis=1)
+    best_s = s[np.arange(len(s)), best]
+    j = np.ceil((np.abs(best_s) + max_s) / 2).astype(int)
+    p_value = np.minimum(2 * state['null_tails'][counts][j], 1.0)
+    period, phase = state['references'][best].T
+    phase = np.where(best_s < 0, (phase + period / 2) % period, phase)
+
+    return np.column_stack([period, phase, best_s / max_s, p_value, np.minimum(p_value * len(state['references']), 1.0)])
+
+
+def _streaming_ls(state, genes, pattern):
+    # the peak index, power, period and p-value of each gene of one pattern, as lomb_scargle, from the running sums
+    nr_observed = pattern['nr_observed']
+    # the time offset tau of LombScargle.R, as the angle 2 omega tau of the sum of exp(2 i omega t)
+    two_omega_tau = np.angle(pattern['trig2'])
+    cos_tau, sin_tau = np.cos(two_omega_tau / 2), np.sin(two_omega_tau / 2)
+    cc = 0.5 * (nr_observed + np.abs(pattern['trig2']))
+    ss = nr_observed - cc
+
+    results = np.empty((len(genes), 4))
+    chunk = max(1, _CHUNK_SIZE // len(state['frequencies']))
+    for start in range(0, len(genes), chunk):
+        chunk_genes = genes[start:start + chunk]
+        mean = state['sum_values'][chunk_genes] / nr_observed
+        variance = (state['sum_squares'][chunk_genes] - nr_observed * mean**2) / (nr_observed - 1)
+        residual_sums = state['trig_sums'][chunk_genes] - mean[:, None] * pattern['trig']
+        yc = residual_sums.real * cos_tau + residual_sums.imag * sin_tau
+        ys = residual_sums.imag * cos_tau - residual_sums.real * sin_tau
+        # at the Nyquist period of evenly sampled data every sin(omega (t - tau)) is 0 and so are ss and ys, leave that term out
+        sin_term = np.divide(ys**2, ss, out=np.zeros_like(ys), where=ss > 1e-9 * nr_observed)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            power = (yc**2 / cc + sin_term) / (2 * variance[:, None])
+        power[variance <= 0] = np.nan
+        has_power = ~np.isnan(power).all(axis=1)
+        peak = np.nanargmax(np.where(has_power[:, None], power, 0), axis=1)
+        results[start:start + chunk, 0] = np.where(has_power, peak + 1, np.nan)
+        results[start:start + chunk, 1] = power[np.arange(len(chunk_genes)), peak]
+        results[start:start + chunk, 2] = np.where(has_power, 1 / state['frequencies'][peak], np.nan)
+
+    # 1 - (1 - exp(-P))^Nindependent, accurate for small p-values
+    results[:, 3] = -np.expm1(independent_frequencies(nr_observed) * np.log1p(-np.exp(-results[:, 1])))
+
+    return results
+
+
+def streaming_results(state):
+    '''
+    The JTK and Lomb-Scargle results of the time points added to a streaming state so far.
+
+    Parameters
+    ----------
+    state : dict
+        from streaming_state and add_time_point
+
+    Returns
+    -------
+    jtk_df, ls_df : pandas.DataFrame
+        the results of jtk_cycle and lomb_scargle on the dataset of all added time points, in the same columns, sorted by p-value.
+        The JTK lag is relative to the first added time point
+    '''
+
+    jtk_results = np.full((len(state['genes']), 5), np.nan)
+    ls_results = np.full((len(state['genes']), len(SUMMARY_COLUMNS)), np.nan)
+    for pattern_nr, pattern in enumerate(state['patterns']):
+        genes = np.flatnonzero(state['gene_pattern'] == pattern_nr)
+        ls_results[genes, 4] = pattern['nr_observed']
+        ls_results[genes, 5] = independent_frequencies(pattern['nr_observed'])
+        ls_results[genes, 6] = _nyquist_frequency(np.repeat(list(pattern['counts']), list(pattern['counts'].values())))
+        if len(pattern['counts']) >= 3:
+            jtk_results[genes] = _streaming_jtk(state, genes, pattern)
+        if pattern['nr_observed'] >= 3:
+            ls_results[genes, :4] = _streaming_ls(state, genes, pattern)
+
+    jtk_df = pd.DataFrame(jtk_results, index=state['genes'], columns=['period', 'lag', 'tau', 'raw p-value', 'p-value'])
+    jtk_df[['raw p-value', 'p-value']] = jtk_df[['raw p-value', 'p-value']].fillna(1.0)
+
+    return jtk_df.sort_values('p-value', kind='stable'), _summary_frame(ls_results, state['genes'])
+
+
+def stream_periodicity(samples, min_period, max_period, period_step, test_freq, nr_time_points, genes=None, dataset=None,
+                       phase_step=None, callback=None):
+    '''
+    Updated JTK and Lomb-Scargle rankings after every new time point of a growing time course.
+
+    Parameters
+    ----------
+    samples : iterable
+        (time point, values) pairs as they arrive, where values are the expression of each gene (see add_time_point). Can be a
+        generator that waits for the next sample
+    min_period, max_period, period_step : float
+        the periods to examine, as in run_pyjtk and run_ls
+    test_freq : integer
+        number of Lomb-Scargle test frequencies per time point, as in run_ls
+    nr_time_points : integer
+        the number of time points the course will have, including those of dataset. With test_freq it sets the Lomb-Scargle
+        frequency grid, which stays the same as time points arrive
+    genes : list
+        the genes. Default: None, for the genes of dataset
+    dataset : pandas.DataFrame
+        time points already sampled, where rows are genes and columns are time points. Default: None
+    phase_step : float
+        the spacing of the JTK phases. Default: None, for the median spacing of the time points of dataset, as in jtk_cycle
+    callback : function
+        called as callback(time_point, jtk_df, ls_df) after every sample, e.g. to refresh a dashboard. Default: None
+
+    Yields
+    ------
+    time_point, jtk_df, ls_df
+        the time point just added and the results of all time points so far, see streaming_results
+
+    Examples
+    --------
+    >>> for time_point, jtk_df, ls_df in stream_periodicity(new_samples(), 75, 100, 5, 4, 48, dataset=first_hours_df):
+    ...     print(time_point, jtk_df.index[:10].tolist())
+    '''
+
+    if genes is None:
+        if dataset is None:
+            raise ValueError('Give the genes or a dataset')
+        genes = dataset.index
+    if phase_step is None:
+        distinct = np.unique(pd.to_numeric(dataset.columns)) if dataset is not None else []
+        if len(distinct) < 2:
+            raise ValueError('Give phase_step, or a dataset with at least two time points to take it from')
+        phase_step = np.median(np.diff(distinct))
+
+    state = streaming_state(genes, min_period, max_period, period_step, test_freq, nr_time_points, phase_step)
+    if dataset is not None:
+        for time_point, values in dataset.items():
+            add_time_point(state, float(time_point), values.to_numpy(dtype=float))
+
+    for time_point, values in samples:
+        add_time_point(state, time_point, values)
+        jtk_df, ls_df = streaming_results(state)
+        if callback is not None:
+            callback(time_point, jtk_df, ls_df)
+        yield time_point, jtk_df, ls_df
@@ -0,0 +1,298 @@
+'''Synthetic oscillatory time series datasets with known periods, phases and regulators, for scaling and accuracy tests.'''
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import io as dataset_io
+from .preprocessing import time_point_labels
+
+# model time simulated before the network is sampled, so that it has settled on its limit cycle
+_NETWORK_BURN_IN = 100.0
+
+
+def _draw(rng, value, size):
+    # a scalar is used as is, a (low, high) tuple is drawn uniformly per gene
+    if np.isscalar(value):
+        return np.full(size, float(value))
+    low, high = value
+    return rng.uniform(low, high, size)
+
+
+def _write_rows(file, genes, values):
+    # numpy formats floats several times faster than DataFrame.to_csv with a float_format
+    buffer = io.StringIO()
+    np.savetxt(buffer, values, fmt='%.6g', delimiter='\t')
+    file.writelines(f'{gene}\t{row}\n' for gene, row in zip(genes, buffer.getvalue().splitlines()))
+
+
+def synthetic_time_points(nr_time_points, step=4, jitter=0.0, missing=0.0, seed=None):
+    '''
+    Sampling times for a synthetic dataset, evenly spaced or unevenly spaced with jitter and missing samples.
+
+    Parameters
+    ----------
+    nr_time_points : integer
+        the number of time points before removing missing samples
+    step : float
+        the spacing of the even grid. Default: 4
+    jitter : float
+        each time point is moved by up to jitter * step, keeping the order. Default: 0.0
+    missing : float
+        the fraction of time points dropped at random. The first and last time points are always kept. Default: 0.0
+    seed : integer
+        random seed. Default: None
+
+    Returns
+    -------
+    time_points : numpy.ndarray
+        increasing sampling times
+
+    Examples
+    --------
+    >>> synthetic_time_points(24, step=4, jitter=0.25, missing=0.1, seed=0)
+    '''
+
+    if not 0 <= jitter < 0.5:
+        raise ValueError('jitter must be at least 0 and below 0.5 to keep the time points in order')
+    if not 0 <= missing < 1:
+        raise ValueError('missing must be at least 0 and below 1')
+
+    rng = np.random.default_rng(seed)
+    time_points = np.arange(nr_time_points) * float(step)
+    time_points[1:] += rng.uniform(-jitter, jitter, nr_time_points - 1) * step
+
+    nr_missing = int(round(missing * (nr_time_points - 2)))
+    if nr_missing > 0:
+        dropped = rng.choice(np.arange(1, nr_time_points - 1), nr_missing, replace=False)
+        time_points = np.delete(time_points, dropped)
+
+    return np.round(time_points, 2)
+
+
+def random_hill_network(nr_nodes, cycle_length=3, max_depth=3, seed=None):
+    '''
+    A randomly wired Hill-function network that oscillates, in the format of load_lem_ode_network.
+
+    The first cycle_length nodes repress each other in a ring (a repressilator). Every other node is activated or repressed by
+    one randomly chosen earlier node at most max_depth steps downstream of the ring, so the whole network follows the ring's rhythm.
+
+    Parameters
+    ----------
+    nr_nodes : integer
+        the number of nodes
+    cycle_length : integer
+        the length of the repression ring, an odd number of at least 3. Default: 3
+    max_depth : integer
+        the maximum number of regulation steps between a node and the ring. Default: 3
+    seed : integer
+        random seed. Default: None
+
+    Returns
+    -------
+    network : dictionary
+        node names ('nodes') and per-node parameter arrays ('gamma', 'beta', 'alpha', 'K', 'n'), mode of regulation ('type_reg', 'a' or 'r'),
+        regulator index ('reg_nr') and the LEM edge of each node ('edges', e.g. 'net4=tf_act(net1)'), which is the ground truth
+
+    Examples
+    --------
+    >>> network = random_hill_network(50, seed=0)
+    >>> simulate_ode_batch(network, network_parameter_vector(network)[None], np.ones(50), np.linspace(0, 100, 1001))
+    '''
+
+    if cycle_length < 3 or cycle_length % 2 == 0:
+        raise ValueError('cycle_length must be an odd number of at least 3, other rings do not oscillate')
+    if nr_nodes < cycle_length:
+        raise ValueError(f'nr_nodes must be at least cycle_length ({cycle_length})')
+
+    from .ode import simulate_ode_batch, network_parameter_vector
+
+    rng = np.random.default_rng(seed)
+    reg_nr = np.zeros(nr_nodes, dtype=int)
+    depth = np.zeros(nr_nodes, dtype=int)
+    reg_nr[:cycle_length] = np.roll(np.arange(cycle_length), 1)
+    for node in range(cycle_length, nr_nodes):
+        reg_nr[node] = rng.choice(np.flatnonzero(depth[:node] < max_depth))
+        depth[node] = depth[reg_nr[node]] + 1
+    type_reg = ['r'] * cycle_length + list(rng.choice(['a', 'r'], nr_nodes - cycle_length))
+
+    nodes = [f'net{node}' for node in range(nr_nodes)]
+    network = {'nodes': nodes,
+               'gamma': rng.uniform(0.05, 0.2, nr_nodes),
+               'beta': rng.uniform(0.8, 1.2, nr_nodes),
+               'alpha': rng.uniform(10, 20, nr_nodes),
+               'K': rng.uniform(0.5, 2, nr_nodes),
+               'n': rng.uniform(2.5, 4, nr_nodes),
+               'type_reg': type_reg,
+               'reg_nr': reg_nr,
+               'edges': [f'{nodes[node]}={"tf_act" if type_reg[node] == "a" else "tf_rep"}({nodes[reg_nr[node]]})' for node in range(nr_nodes)]}
+
+    # a node only responds to its regulator if its threshold lies within the regulator's swing, so set each threshold to the
+    # middle of the regulator's oscillation, one depth at a time because a regulator's swing depends on its own threshold
+    time_points = np.linspace(0, 2 * _NETWORK_BURN_IN, 2001)
+    x0 = rng.uniform(0, 2, nr_nodes)
+    for level in range(1, depth.max() + 1):
+        trajectory = simulate_ode_batch(network, network_parameter_vector(network)[None], x0, time_points)[0, len(time_points) // 2:]
+        midline = (trajectory.max(axis=0) + trajectory.min(axis=0)) / 2
+        network['K'][depth == level] = midline[reg_nr[depth == level]]
+
+    return network
+
+
+def _network_expression(network, time_points, period, rng):
+    # simulate the network with its model time stretched so that it oscillates with the given period, and measure each node's phase
+    from .ode import simulate_ode_batch, network_parameter_vector, oscillation_features
+
+    params = network_parameter_vector(network)[None]
+    x0 = rng.uniform(0, 2, len(network['nodes']))
+
+    probe_times = np.linspace(0, 2 * _NETWORK_BURN_IN, 4001)
+    model_period = np.nanmedian(oscillation_features(simulate_ode_batch(network, params, x0, probe_times), probe_times)[0])
+    if np.isnan(model_period):
+        raise ValueError('The network does not oscillate')
+
+    # data time t is model time _NETWORK_BURN_IN + t * scale
+    scale = model_period / period
+    model_times = _NETWORK_BURN_IN + (time_points - time_points[0]) * scale
+    dense_times = np.arange(0, model_times[-1] + model_period, model_period / 100)
+    trajectory = simulate_ode_batch(network, params, x0, dense_times)[0]
+    values = np.stack([np.interp(model_times, dense_times, trajectory[:, node]) for node in range(trajectory.shape[1])])
+
+    # phase: the first peak after the burn-in, in data time
+    first_cycle = (dense_times >= _NETWORK_BURN_IN) & (dense_times < _NETWORK_BURN_IN + model_period)
+    peak_times = dense_times[first_cycle][trajectory[first_cycle].argmax(axis=0)]
+    phase = ((peak_times - _NETWORK_BURN_IN) / scale + time_points[0]) % period
+    cycle_values = trajectory[first_cycle]
+    amplitude = (cycle_values.max(axis=0) - cycle_values.min(axis=0)) / 2
+    baseline = (cycle_values.max(axis=0) + cycle_values.min(axis=0)) / 2
+
+    return values, phase, amplitude, baseline
+
+
+def generate_synthetic_dataset(dataset_name, nr_genes, time_points, periodic_fraction=0.5, period=(20, 30), amplitude=(1, 3), baseline=(5, 10),
+                               noise=0.2, trend=0.0, network_size=0, chunk_size=10000, outdir=None, seed=None):
+    '''
+    Write a synthetic time series dataset of any size, together with the ground truth of every gene, streaming both to disk in chunks.
+
+    Periodic genes are baseline + amplitude * cos(2 * pi * (t - phase) / period), the other genes are flat at their baseline. All genes
+    get a linear trend and gaussian noise, and expression is clipped at 0. The first network_size genes instead follow a random_hill_network, sampled so that it
+    oscillates with a period drawn from period, whose edges are recorded in the ground truth.
+
+    Parameters
+    ----------
+    dataset_name : string
+        the dataset is written to <dataset_name>.tsv and the ground truth to <dataset_name>_truth.tsv
+    nr_genes : integer
+        the number of genes, including the network genes
+    time_points : list or numpy.ndarray
+        the sampling times, evenly or unevenly spaced, e.g. from synthetic_time_points
+    periodic_fraction : float
+        the fraction of the genes outside the network that oscillate. Default: 0.5
+    period : float or tuple
+        the period of the periodic genes, or the (low, high) range it is drawn from per gene. Default: (20, 30)
+    amplitude : float or tuple
+        the amplitude, or the range it is drawn from per gene. Default: (1, 3)
+    baseline : float or tuple
+        the mean expression, or the range it is drawn from per gene. Default: (5, 10)
+    noise : float
+        the standard deviation of the noise, relative to each gene's amplitude. Default: 0.2
+    trend : float
+        the standard deviation of each gene's drift over the whole time series, relative to its amplitude. Default: 0.0
+    network_size : integer
+        the number of genes driven by a random Hill-function network, named net0, net1, ... Default: 0
+    chunk_size : integer
+        the number of genes generated and written at a time. The output for a given seed also depends on chunk_size. Default: 10000
+    outdir : string
+        directory to write to. Default: None, for the datasets directory, so the dataset can be opened with load_dataset
+    seed : integer
+        random seed. Default: None
+
+    Returns
+    -------
+    data_path : string
+        the path of the dataset
+    truth_path : string
+        the path of the ground truth, with the columns periodic, period, phase, amplitude, baseline, trend (slope per time unit),
+        noise (standard deviation), regulator and regulation_type for each gene
+
+    Examples
+    --------
+    # 100k genes sampled unevenly every ~2 hours, with a 200 gene regulatory network
+    >>> time_points = synthetic_time_points(24, step=2, jitter=0.2, seed=0)
+    >>> generate_synthetic_dataset('synthetic_100k', 100000, time_points, network_size=200, seed=0)
+    >>> data_df = load_dataset('synthetic_100k')
+    '''
+
+    time_points = np.asarray(time_points, dtype=float)
+    if np.any(np.diff(time_points) <= 0):
+        raise ValueError('time_points must be increasing')
+    if not 0 <= network_size <= nr_genes:
+        raise ValueError(f'network_size must be between 0 and nr_genes ({nr_genes})')
+    if not 0 <= periodic_fraction <= 1:
+        raise ValueError('periodic_fraction must be between 0 and 1')
+
+    outdir = dataset_io.DATADIR if outdir is None else outdir
+    os.makedirs(outdir, exist_ok=True)
+    data_path = os.path.join(outdir, f'{dataset_name}.tsv')
+    truth_path = os.path.join(outdir, f'{dataset_name}_truth.tsv')
+
+    rng = np.random.default_rng(seed)
+    duration = max(time_points[-1] - time_points[0], 1e-12)
+    elapsed = time_points - time_points[0]
+
+    if network_size > 0:
+        network = random_hill_network(network_size, seed=rng.integers(2**32))
+        network_period = _draw(rng, period, 1)[0]
+        network_values, network_phase, network_amplitude, network_baseline = _network_expression(network, time_points, network_period, rng)
+
+    with open(data_path, 'w') as data_file, open(truth_path, 'w') as truth_file:
+        data_file.write('\t'.join(['time_points'] + time_point_labels(time_points)) + '\n')
+
+        for start in range(0, nr_genes, chunk_size):
+            genes = np.arange(start, min(start + chunk_size, nr_genes))
+            size = len(genes)
+            in_network = genes < network_size
+
+            truth_df = pd.DataFrame({
+                'periodic': rng.uniform(size=size) < periodic_fraction,
+                'period': _draw(rng, period, size),
+                'phase': 0.0,
+                'amplitude': _draw(rng, amplitude, size),
+                'baseline': _draw(rng, baseline, size),
+                'regulator': None,
+                'regulation_type': None,
+            }, index=pd.Index([f'net{gene}' if gene < network_size else f'gene{gene}' for gene in genes], name='gene'))
+            truth_df['phase'] = rng.uniform(size=size) * truth_df['period']
+
+            angle = 2 * np.pi * (time_points[None, :] - truth_df['phase'].to_numpy()[:, None]) / truth_df['period'].to_numpy()[:, None]
+            values = truth_df['amplitude'].to_numpy()[:, None] * np.cos(angle) * truth_df['periodic'].to_numpy()[:, None]
+            values += truth_df['baseline'].to_numpy()[:, None]
+
+            if in_network.any():
+                nodes = genes[in_network]
+                values[in_network] = network_values[nodes]
+                truth_df.loc[in_network, 'periodic'] = True
+                truth_df.loc[in_network, 'period'] = network_period
+                truth_df.loc[in_network, 'phase'] = network_phase[nodes]
+                truth_df.loc[in_network, 'amplitude'] = network_amplitude[nodes]
+                truth_df.loc[in_network, 'baseline'] = network_baseline[nodes]
+                truth_df.loc[in_network, 'regulator'] = [network['nodes'][network['reg_nr'][node]] for node in nodes]
+                truth_df.loc[in_network, 'regulation_type'] = ['activator' if network['type_reg'][node] == 'a' else 'repressor' for node in nodes]
+
+            gene_amplitude = truth_df['amplitude'].to_numpy()
+            truth_df['trend'] = rng.normal(0, trend, size) * gene_amplitude / duration
+            truth_df['noise'] = noise * gene_amplitude
+            truth_df['period'] = truth_df['period'].where(truth_df['periodic'])
+            truth_df['phase'] = truth_df['phase'].where(truth_df['periodic'])
+            values += truth_df['trend'].to_numpy()[:, None] * elapsed[None, :]
+            values += rng.normal(size=values.shape) * truth_df['noise'].to_numpy()[:, None]
+            np.maximum(values, 0, out=values)
+
+            _write_rows(data_file, truth_df.index, values)
+            truth_df.to_csv(truth_file, sep='\t', header=(start == 0))
+
+    print(f'-- Wrote {nr_genes} genes x {len(time_points)} time points to {data_path} and the ground truth to {truth_path}')
+
+    return data_path, truth_path
@@ -0,0 +1,209 @@
+'''Indexed catalog of the transcription factor families in transcription_factors/, for building LEM regulator lists.'''
+
+import os
+import pickle
+
+TF_DIR = '../transcription_factors'
+TF_CATALOG_CACHE_PATH = '../tmp/tf_catalog.pkl'
+
+# catalogs already loaded in this session, keyed by (TF directory, file signature)
+_TF_CATALOGS = dict()
+
+
+def _tf_files_signature(tf_dir):
+    '''Name, size and modification time of every family file, so that a cached catalog can tell when it is out of date.'''
+
+    files = sorted(file for file in os.listdir(tf_dir) if file.endswith('.txt'))
+    return tuple((file, os.path.getsize(os.path.join(tf_dir, file)), os.path.getmtime(os.path.join(tf_dir, file))) for file in files)
+
+
+def build_tf_catalog(tf_dir=TF_DIR):
+    '''
+    Read every family file in tf_dir into a catalog. Each file holds one family, named after the file, with one gene per line.
+
+    Parameters
+    ----------
+    tf_dir : string
+        directory with one <family>.txt file per transcription factor family. Default: TF_DIR
+
+    Returns
+    -------
+    catalog : dict
+        'families' maps each family to the frozenset of its genes, 'genes' maps each gene to the frozenset of its families and
+        'signature' identifies the files the catalog was built from
+    '''
+
+    if not os.path.isdir(tf_dir):
+        raise FileNotFoundError(f'Transcription factor directory {tf_dir} does not exist')
+
+    signature = _tf_files_signature(tf_dir)
+    families = dict()
+    for file, _, _ in signature:
+        with open(os.path.join(tf_dir, file)) as family_file:
+            genes = {line.split('\t')[0].strip() for line in family_file}
+        genes.discard('')
+        families[file[:-len('.txt')]] = frozenset(genes)
+
+    gene_families = dict()
+    for family, genes in families.items():
+        for gene in genes:
+            gene_families.setdefault(gene, set()).add(family)
+
+    return {'families': families,
+            'genes': {gene: frozenset(gene_families[gene]) for gene in sorted(gene_families)},
+            'signature': signature}
+
+
+def load_tf_catalog(tf_dir=TF_DIR, cache_path=TF_CATALOG_CACHE_PATH, rebuild=False):
+    '''
+    Load the transcription factor catalog, from memory or from its binary cache when the family files have not changed since it was built.
+
+    Parameters
+    ----------
+    tf_dir : string
+        directory with one <family>.txt file per transcription factor family. Default: TF_DIR
+    cache_path : string
+        path of the pickled catalog. Set to None to not use a cache file. Default: TF_CATALOG_CACHE_PATH
+    rebuild : boolean
+        set to True to read the family files even if a cached catalog is up to date. Default: False
+
+    Returns
+    -------
+    catalog : dict
+        see build_tf_catalog
+
+    Examples
+    --------
+    >>> catalog = load_tf_catalog()
+    >>> catalog['genes']['Ophio5|6831']
+    frozenset({'ARID_BRIGHT'})
+    '''
+
+    signature = _tf_files_signature(tf_dir)
+    key = (os.path.abspath(tf_dir), signature)
+    if not rebuild and key in _TF_CATALOGS:
+        return _TF_CATALOGS[key]
+
+    catalog = None
+    if not rebuild and cache_path is not None and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as cache_file:
+            cached = pickle.load(cache_file)
+        if cached.get('signature') == signature:
+            catalog = cached
+
+    if catalog is None:
+        catalog = build_tf_catalog(tf_dir)
+        if cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            with open(cache_path, 'wb') as cache_file:
+                pickle.dump(catalog, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _TF_CATALOGS[key] = catalog
+
+    return catalog
+
+
+def _family_genes(catalog, families):
+    '''Union of the genes of the given families (every family when None).'''
+
+    if families is None:
+        return frozenset(catalog['genes'])
+    if isinstance(families, str):
+        families = [families]
+    unknown = [family for family in families if family not in catalog['families']]
+    if unknown:
+        raise KeyError(f'Unknown transcription factor families {unknown}. Choose from {sorted(catalog["families"])}')
+
+    return frozenset().union(*(catalog['families'][family] for family in families))
+
+
+def get_tf_genes(families=None, dataset=None, catalog=None):
+    '''
+    Transcription factors of the given families, optionally restricted to the genes of a dataset.
+
+    Parameters
+    ----------
+    families : list or string
+        family names (the family file names without .txt). Default: None, for every family
+    dataset : pandas.DataFrame or list
+        a time series dataset or a list of gene names. When given, only transcription factors in it are returned, in its order. Default: None
+    catalog : dict
+        a catalog from load_tf_catalog. Default: None, to load the default catalog
+
+    Returns
+    -------
+    tf_list : list
+        the transcription factor gene names
+
+    Examples
+    --------
+    >>> get_tf_genes(['Forkhead', 'bZIP'], dataset=data_df)
+    '''
+
+    if catalog is None:
+        catalog = load_tf_catalog()
+    tf_genes = _family_genes(catalog, families)
+
+    if dataset is None:
+        return sorted(tf_genes)
+    genes = dataset.index if hasattr(dataset, 'index') else dataset
+
+    return [gene for gene in genes if gene in tf_genes]
+
+
+def get_gene_families(genes, catalog=None):
+    '''
+    Transcription factor families of each gene.
+
+    Parameters
+    ----------
+    genes : list
+        gene names
+    catalog : dict
+        a catalog from load_tf_catalog. Default: None, to load the default catalog
+
+    Returns
+    -------
+    gene_families : dict
+        the sorted list of families of each gene, which is empty for genes that are not transcription factors
+    '''
+
+    if catalog is None:
+        catalog = load_tf_catalog()
+
+    return {gene: sorted(catalog['genes'].get(gene, ())) for gene in genes}
+
+
+def get_regulator_lists(dataset, repressor_families=None, activator_families=None, catalog=None):
+    '''
+    Build the repressor and activator lists for run_lem from the transcription factors in a dataset.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame or list
+        a time series dataset or a list of gene names, e.g. the periodic genes passed to run_lem as targets
+    repressor_families : list
+        families whose members are used as repressors. Default: None, for every family
+    activator_families : list
+        families whose members are used as activators. Default: None, for every family
+    catalog : dict
+        a catalog from load_tf_catalog. Default: None, to load the default catalog
+
+    Returns
+    -------
+    repressor_list : list
+        transcription factors in the dataset to use as repressors, in dataset order
+    activator_list : list
+        transcription factors in the dataset to use as activators, in dataset order
+
+    Examples
+    --------
+    >>> repressors_list, activators_list = get_regulator_lists(data_df.loc[targets_list])
+    >>> run_lem(data_df, targets_list, repressors_list, activators_list, 'ophio')
+    '''
+
+    if catalog is None:
+        catalog = load_tf_catalog()
+
+    return (get_tf_genes(repressor_families, dataset=dataset, catalog=catalog),
+            get_tf_genes(activator_families, dataset=dataset, catalog=catalog))
@@ -0,0 +1,247 @@
+'''Per-stage timing and resource traces of the periodicity and LEM runs.'''
+
+import os
+import sys
+import json
+import time
+import datetime
+import functools
+import contextlib
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is then not recorded
+    resource = None
+
+# one <function>__<datetimestr>_<pid>_trace.jsonl file per run is written here. Set to None to turn tracing off
+TRACE_DIR = '../results/traces'
+
+TRACE_STAGES = ['preprocess', 'serialize', 'spawn', 'compute', 'parse']
+
+# the environment variable that passes the current run to subprocesses (see trace_environment), so that traced scripts they run,
+# e.g. src/ls/_run_ls_params.py, write to the same trace
+TRACE_ENV = 'BIOCLOCKS_TRACE'
+
+# the runs in progress, outermost first. Runs started inside another run (e.g. run_pyjtk in run_periodicity) write to its trace
+_ACTIVE_RUNS = list()
+
+
+def _bytes_written():
+    # bytes written by this process and the subprocesses it has waited for (Linux only)
+    try:
+        with open('/proc/self/io') as io_file:
+            for line in io_file:
+                if line.startswith('wchar'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def _peak_rss_mb(who):
+    # peak resident set size so far, of this process or of its largest finished subprocess
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _children_cpu_time():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _usage():
+    return {'wall': time.perf_counter(), 'cpu': time.process_time(), 'children_cpu': _children_cpu_time(), 'bytes': _bytes_written()}
+
+
+def _write_record(run, record):
+    with open(run['trace_file'], 'a') as trace_file:
+        trace_file.write(json.dumps(record) + '\n')
+
+
+@contextlib.contextmanager
+def trace_run(function):
+    '''
+    Trace a run of function, writing a 'total' record when it ends. Stages recorded with trace_stage while it is active go to
+    the same trace file. Runs started inside another run, also in a subprocess started with trace_environment, are recorded in the
+    trace of the outer run.
+
+    Parameters
+    ----------
+    function : string
+        the name of the traced function
+
+    Examples
+    --------
+    >>> with trace_run('run_pyjtk'):
+    ...     with trace_stage('compute'):
+    ...         ...
+    '''
+
+    if TRACE_DIR is None:
+        yield None
+        return
+
+    if _ACTIVE_RUNS:
+        run = dict(_ACTIVE_RUNS[0], function=function)
+    elif os.environ.get(TRACE_ENV):
+        run = dict(json.loads(os.environ[TRACE_ENV]), function=function)
+    else:
+        datetimestr = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        run_id = f'{function}__{datetimestr}_{os.getpid()}'
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        run = {'run_id': run_id, 'function': function, 'trace_file': os.path.join(TRACE_DIR, f'{run_id}_trace.jsonl')}
+
+    _ACTIVE_RUNS.append(run)
+    try:
+        with trace_stage('total'):
+            yield run
+    finally:
+        _ACTIVE_RUNS.pop()
+
+
+@contextlib.contextmanager
+def trace_stage(stage):
+    '''
+    Record the wall time, CPU time, peak RSS and bytes written of one stage of the current run. Does nothing outside trace_run.
+
+    Parameters
+    ----------
+    stage : string
+        the stage name, one of TRACE_STAGES ('total' is recorded by trace_run)
+    '''
+
+    if not _ACTIVE_RUNS:
+        yield
+        return
+
+    run = _ACTIVE_RUNS[-1]
+    start_time = datetime.datetime.now().isoformat(timespec='milliseconds')
+    start = _usage()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        end = _usage()
+        _write_record(run, {
+            'run_id': run['run_id'],
+            'function': run['function'],
+            'stage': stage,
+            'start': start_time,
+            'wall_s': end['wall'] - start['wall'],
+            'cpu_s': end['cpu'] - start['cpu'],
+            'children_cpu_s': end['children_cpu'] - start['children_cpu'],
+            'peak_rss_mb': _peak_rss_mb('self'),
+            'children_peak_rss_mb': _peak_rss_mb('children'),
+            'bytes_written': end['bytes'] - start['bytes'] if start['bytes'] is not None else None,
+            'failed': failed,
+        })
+
+
+def trace_environment():
+    '''
+    The environment for a subprocess of the current run: that of this process, plus TRACE_ENV naming the run's trace when one is
+    active.
+
+    Examples
+    --------
+    >>> subprocess.Popen(full_cmd, env=trace_environment())
+    '''
+
+    env = dict(os.environ)
+    if _ACTIVE_RUNS:
+        run = _ACTIVE_RUNS[0]
+        env[TRACE_ENV] = json.dumps({'run_id': run['run_id'], 'trace_file': os.path.abspath(run['trace_file'])})
+
+    return env
+
+
+def traced(function):
+    '''Decorator that runs function inside trace_run.'''
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with trace_run(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def load_traces(trace_dir=None):
+    '''
+    Load every trace record in trace_dir into one dataframe, one row per stage of each run.
+
+    Parameters
+    ----------
+    trace_dir : string
+        directory with the trace files. Default: None, for TRACE_DIR
+
+    Returns
+    -------
+    traces_df : pandas.DataFrame
+        the trace records, with the columns run_id, function, stage, start, wall_s, cpu_s, children_cpu_s, peak_rss_mb,
+        children_peak_rss_mb, bytes_written and failed
+    '''
+
+    trace_dir = TRACE_DIR if trace_dir is None else trace_dir
+    if trace_dir is None or not os.path.isdir(trace_dir):
+        raise FileNotFoundError(f'Trace directory {trace_dir} does not exist')
+
+    trace_files = sorted(file for file in os.listdir(trace_dir) if file.endswith('_trace.jsonl'))
+    traces = [pd.read_json(os.path.join(trace_dir, file), lines=True) for file in trace_files]
+    traces = [trace_df for trace_df in traces if not trace_df.empty]
+    if not traces:
+        return pd.DataFrame(columns=['run_id', 'function', 'stage', 'start', 'wall_s', 'cpu_s', 'children_cpu_s', 'peak_rss_mb',
+                                     'children_peak_rss_mb', 'bytes_written', 'failed'])
+
+    return pd.concat(traces, ignore_index=True)
+
+
+def summarize_traces(traces=None):
+    '''
+    Summary table of where the time goes: the number of runs and the total and mean resources of each stage of each function.
+
+    Parameters
+    ----------
+    traces : pandas.DataFrame or string
+        trace records from load_traces, or a trace directory. Default: None, for TRACE_DIR
+
+    Returns
+    -------
+    summary_df : pandas.DataFrame
+        one row per function and stage, sorted by total wall time
+
+    Examples
+    --------
+    >>> summarize_traces().loc['run_pydl']
+    '''
+
+    if traces is None or isinstance(traces, str):
+        traces = load_traces(traces)
+
+    # CPU time of the process plus its subprocesses, which is where pyJTK, pyDL, Lomb-Scargle and LEMpy spend theirs
+    traces = traces.assign(total_cpu_s=traces['cpu_s'] + traces['children_cpu_s'])
+    # (column, aggregation) -> summary column. Named aggregation would need pandas 0.25
+    columns = {('run_id', 'nunique'): 'runs',
+               ('wall_s', 'sum'): 'wall_s',
+               ('wall_s', 'mean'): 'mean_wall_s',
+               ('total_cpu_s', 'sum'): 'cpu_s',
+               ('peak_rss_mb', 'max'): 'max_peak_rss_mb',
+               ('children_peak_rss_mb', 'max'): 'max_children_peak_rss_mb',
+               ('bytes_written', 'sum'): 'bytes_written',
+               ('failed', 'sum'): 'failed'}
+    aggregations = dict()
+    for column, aggregation in columns:
+        aggregations.setdefault(column, []).append(aggregation)
+    summary_df = traces.groupby(['function', 'stage']).agg(aggregations)
+    summary_df.columns = [columns[column] for column in summary_df.columns]
+    summary_df = summary_df[list(columns.values())]
+
+    return summary_df.sort_values('wall_s', ascending=False)
@@ -0,0 +1,506 @@
+'''Heatmaps, line plots and histograms of time series datasets and periodicity results.'''
+
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from .io import load_results
+from .periodicity import get_genelist_from_top_n_genes, get_genelist_from_threshold
+from .preprocessing import _zscore_rows, get_closest_column_from_period, normalize_data
+
+# For normalizing data and getting Haase Lab coloring in heatmaps
+norm = matplotlib.colors.Normalize(-1.5,1.5)
+colors = [[norm(-1.5), "cyan"],
+      [norm(0), "black"],
+     [norm(1.5), "yellow"]]
+haase = matplotlib.colors.LinearSegmentedColormap.from_list("", colors)
+
+
+def _peak_phase_order(z_values, first_period_index):
+    '''
+    Row order that sorts genes by the time point of their peak expression within the first period. Ties keep the input order.
+    '''
+
+    first_period = np.where(np.isnan(z_values[:, :first_period_index]), -np.inf, z_values[:, :first_period_index])
+    return np.argsort(first_period.argmax(axis=1), kind='mergesort')
+
+
+def _bin_rows(values, n_bins):
+    '''
+    Average consecutive rows of a 2D array into n_bins rows. Arrays with n_bins rows or fewer are returned unchanged.
+    '''
+
+    if values.shape[0] <= n_bins:
+        return values
+    edges = np.linspace(0, values.shape[0], n_bins + 1).astype(int)[:-1]
+    counts = np.diff(np.append(edges, values.shape[0]))
+    return np.add.reduceat(np.nan_to_num(values), edges, axis=0) / counts[:, np.newaxis]
+
+
+def plot_heatmap(dataset, periodicity_result, period, filtering_column, top_genes=1000, threshold=None, threshold_below=True, save_path=None, fast=False, max_rows=None):
+    '''
+    Plot genes from a single dataset in a heatmap ordered by peak gene expression during first period. Genes included will depend on the top_genes or threshold values. Top_genes defaults to 1000, so by default the top 1000 genes based off the
+    supplied periodicity result will be plotted.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    periodicity_result:
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can consist of a path to a file or a dataframe. Set to None to plot every gene in the dataset
+    period : integer
+        period length
+    filtering_column: string
+        is the name of a column in the periodicity result to treshold on
+    top_genes: integer
+        an integer that specifies the number of top genes to include (default 1000, set to None if you want to filter the genes based off of a threshold instead)
+    threshold: float
+        numeric value corresponding to the threshold for the filtering column (default None, set to a value (i.e. 0.5) and set top_genes to None to filter based off of a threshold)
+    threshold_below : boolean
+        when True will include genes with a periodicity score below the threshold. When False will take genes with a periodicity score above the threshold. Default: True
+    fast : boolean
+        draw the heatmap as a single rasterized image instead of one seaborn cell per gene and time point. Use this for thousands of genes. Default: False
+    max_rows : integer
+        with fast=True, average neighbouring genes (after ordering) into at most max_rows rows. Defaults to the pixel height of the plot
+
+    Returns
+    -------
+    heatmap : seaborn.heatmap
+        heatmap of the genes found after applying threshold, ordered by peak gene expression during first period
+
+    Examples
+    --------
+    # plot the top 20 genes based on ranking all genes on their pyJTK's p-value and order by peak expression within the first 96 minutes
+    >>> plot_heatmap(data_df, pyjtk_results_df, 96, 'p-value', top_genes=20)
+
+    # plot all genes with a pyJTK p-value less than 0.01 and order by peak expression within the first 96 minutes
+    >>> plot_heatmap(data_df, pyjtk_results_df, 96, 'p-value', top_genes=None, threshold=0.01)
+
+    # plot every gene in the dataset
+    >>> plot_heatmap(data_df, None, 96, None, fast=True)
+
+    '''
+
+    if periodicity_result is None:
+        gene_list = list(dataset.index)
+    elif top_genes is not None and threshold is None:
+        gene_list = get_genelist_from_top_n_genes(periodicity_result, filtering_column, top_genes)
+    elif top_genes is not None and threshold is not None:
+        gene_list = get_genelist_from_top_n_genes(periodicity_result, filtering_column, top_genes)
+        print('Note: both threshold and top genes were supplied with a value. Using top genes. To use threshold, please set top genes to None.')
+    else:
+        if threshold is not None:
+            gene_list = get_genelist_from_threshold(periodicity_result, filtering_column, threshold, threshold_below)
+        else:
+            print('Either top_genes or threshold must be not None.')
+    dataset = dataset.reindex(gene_list)
+    data = dataset.loc[gene_list]
+    if len(gene_list)>75:
+        yticks = False
+    else:
+        yticks = True
+
+    first_period = get_closest_column_from_period(data, period)
+    first_period_index = data.columns.get_loc(str(first_period))
+
+    fig = plt.figure(figsize = (8,8))
+
+    if periodicity_result is None:
+        subtitle = "All " + str(len(gene_list)) + " genes\n"
+    elif top_genes is not None:
+        subtitle = "Filtered by " + filtering_column +": top " + str(top_genes) +" genes\n"
+    elif threshold is not None:
+        subtitle = "Filtered by " + filtering_column +" with threshold = "+ str(threshold) +"\n"
+    title = 'Time Series Data'
+    plt.title(subtitle, fontsize = 13, y = .96)
+    plt.suptitle(title, fontsize=15, ha='center', x = 0.435, y = .96)
+    fig.subplots_adjust(top = 0.90)
+
+    if fast:
+        z_values = _zscore_rows(data.to_numpy())
+        order = _peak_phase_order(z_values, first_period_index)
+        z_values = z_values[order]
+
+        ax = plt.gca()
+        if max_rows is None:
+            max_rows = int(ax.get_window_extent().height)
+        image = ax.imshow(_bin_rows(z_values, max_rows), cmap=haase, vmin=-1.5, vmax=1.5, aspect='auto', interpolation='nearest',
+                          extent=(-0.5, data.shape[1] - 0.5, len(gene_list) - 0.5, -0.5), rasterized=True)
+        xticks = np.unique(np.linspace(0, data.shape[1] - 1, min(data.shape[1], 20)).round().astype(int))
+        ax.set_xticks(xticks)
+        ax.set_xticklabels(data.columns[xticks], rotation=90)
+        if yticks:
+            ax.set_yticks(np.arange(len(gene_list)))
+            ax.set_yticklabels(data.index[order])
+        else:
+            ax.set_yticks([])
+        fig.colorbar(image, ax=ax)
+    else:
+        z_pyjtk_df = normalize_data(data)
+
+        z_pyjtk_1stperiod = z_pyjtk_df.iloc[:, 0:first_period_index]
+        max_time = z_pyjtk_1stperiod.idxmax(axis=1)
+        z_pyjtk_df["max"] = max_time
+        z_pyjtk_df["max"] = pd.to_numeric(z_pyjtk_df["max"])
+        z_pyjtk_df = z_pyjtk_df.sort_values(by="max", axis=0)
+        z_pyjtk_df = z_pyjtk_df.drop(columns=['max'])
+
+        sns.heatmap(z_pyjtk_df, cmap=haase, vmin=-1.5, vmax=1.5, yticklabels = yticks, cbar = True)
+
+    if save_path is not None:
+        plt.savefig(save_path)
+
+    plt.show()
+
+
+def plot_heatmap_in_supplied_order(dataset, gene_order):
+    '''
+    Plot genes from a single dataset in a heatmap ordered by the supplied order.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    gene_order : list
+        a list of gene names. Must be in the dataset index
+
+    Returns
+    -------
+    heatmap : seaborn.heatmap
+        heatmap of the genes ordered based on their order in order
+
+    Examples
+    --------
+    >>> plot_heatmap_in_supplied_order(data_df, ['geneA', 'geneB', 'geneC'])
+
+    '''
+
+    if len(gene_order)>100:
+        yticks = False
+    else:
+        yticks = True
+
+    dataset = dataset.reindex(gene_order)
+    data = dataset.loc[gene_order]
+    z_pyjtk_df = normalize_data(data)
+
+    fig = plt.figure(figsize = (8,8))
+    subtitle = "Ordered by supplied genelist"
+    title = 'Time Series Data'
+    plt.title(subtitle, fontsize = 13, y = .995)
+    plt.suptitle(title, fontsize=15, ha='center', x = 0.435, y = .96)
+    fig.subplots_adjust(top = 0.90)
+
+    sns.heatmap(z_pyjtk_df, cmap=haase, vmin=-1.5, vmax=1.5, yticklabels = yticks, cbar= True)
+    plt.show()
+
+
+def plot_linegraphs_from_gene_list(dataset, gene_list, norm_data=False, graphs_per_row=5, save_path=None):
+    '''
+    Plots supplied genes in the genelist from a single dataset in lineplots. Can only plot between 1 and 10 genes.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    gene_list : list
+        a list of gene names to plot. Must be in the dataset index
+    norm_data : boolean
+        applies z-score normalization to each gene's expression when set to True. Default: False
+    graphs_per_row : int
+        number of graphs to plot in a single row before wrapping around to the next
+
+    Returns
+    -------
+    lineplot : seaborn.lineplot
+        line plots for each gene in gene_list
+
+    Examples
+    --------
+    >>> plot_linegraphs_from_gene_list(data_df, ['geneA', 'geneB', 'geneC'])
+
+    '''
+
+    if norm_data:
+        dataset = normalize_data(dataset)
+
+    num_rows = int(np.ceil(len(gene_list) / graphs_per_row))
+    num_columns = np.min((len(gene_list), graphs_per_row))
+    fig_height = 3 * num_rows
+    fig_width = 4 * np.min((len(gene_list), graphs_per_row))
+
+    fig = plt.figure(figsize = (fig_width, fig_height))
+    px_size = fig.get_size_inches() * fig.dpi
+    subplots_margin_top = np.min((0.99, (np.floor((px_size[1] - 40) / px_size[1] * 100) / 100)))
+
+    fig.subplots_adjust(hspace=0.3, wspace=0.3, top=subplots_margin_top)
+    plt.suptitle('Time Series Data', fontsize=15, y = 1)
+
+    for i, genename in enumerate(gene_list):
+        plt.subplot(num_rows, num_columns, i+1)
+        sns.lineplot(x = dataset.columns, y = dataset.loc[genename,:]).set_title(genename)
+
+    if save_path is not None:
+        plt.savefig(save_path)
+
+    plt.show()
+
+
+def plot_line_graphs_from_top_periodicity(dataset, periodicity_result, filtering_column, top_gene_number, norm_data=False):
+    '''
+    Plots top n genes from a dataset in lineplots. Top genes are determined based off of supplied top gene number and the supplied periodicity results. To
+
+    Parameters
+    ----------
+    dataset_df : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    periodicity_result : pandas.DataFrame or string
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can consist of a path to a file or a dataframe.
+    filtering_column: string
+        name of a column in the periodicity result. For example, for JTK specifying 'p-value' will allow for the top n genes ranked based off of the JTK p-value.
+    top_gene_number : integer
+        specifies the number of top genes to include. Must be between 1 and 10.
+    norm_data : boolean
+        applies z-score normalization to each gene's expression when set to True. Default: False
+
+    Returns
+    -------
+    lineplot : seaborn.lineplot
+        line plots for each gene
+
+    Examples
+    --------
+    # plot the top 10 genes based on ranking all genes on their pyJTK's p-value
+    >>> plot_line_graphs_from_top_periodicity(data_df, pyjtk_results_df, 'p-value', 10)
+    '''
+
+    if top_gene_number not in list(range(1,11)):
+        print("top_gene_number must be between 1 and 10")
+    else:
+
+        if type(periodicity_result) == str:
+            print('Loading periodicity results')
+            periodicity_df = load_results(periodicity_result)
+        elif type(periodicity_result)==pd.core.frame.DataFrame:
+            periodicity_df = periodicity_result
+
+        gene_list = get_genelist_from_top_n_genes(periodicity_df, filtering_column, top_gene_number)
+        plot_linegraphs_from_gene_list(dataset, gene_list, norm_data=norm_data)
+
+
+def _render_linegraph_pages(args):
+    '''
+    Worker for export_linegraphs_from_gene_list. Renders a run of pages by updating the lines and titles of a single reused figure, without pyplot.
+    '''
+
+    values, gene_names, time_points, first_page, graphs_per_row, rows_per_page, path, fmt, dpi = args
+    graphs_per_page = graphs_per_row * rows_per_page
+
+    fig = Figure(figsize=(4 * graphs_per_row, 3 * rows_per_page))
+    FigureCanvasAgg(fig)
+    fig.subplots_adjust(hspace=0.4, wspace=0.3, top=0.93)
+    title = fig.suptitle('', fontsize=15)
+    axes = fig.subplots(rows_per_page, graphs_per_row, squeeze=False).ravel()
+    lines = [ax.plot(time_points, np.full(len(time_points), np.nan))[0] for ax in axes]
+
+    written = list()
+    pdf = PdfPages(path) if fmt == 'pdf' else None
+    for start in range(0, len(gene_names), graphs_per_page):
+        page = first_page + start // graphs_per_page
+        title.set_text(f'Time Series Data - page {page}')
+        for i, (ax, line) in enumerate(zip(axes, lines)):
+            if start + i < len(gene_names):
+                line.set_ydata(values[start + i])
+                ax.set_title(gene_names[start + i])
+                ax.relim()
+                ax.autoscale_view()
+                ax.set_visible(True)
+            else:
+                ax.set_visible(False)
+        if pdf is not None:
+            pdf.savefig(fig, dpi=dpi)
+        else:
+            page_path = f'{path}_page{page:03d}.{fmt}'
+            fig.savefig(page_path, dpi=dpi)
+            written.append(page_path)
+
+    if pdf is not None:
+        pdf.close()
+        written.append(path)
+    fig.clear()
+
+    return written
+
+
+def export_linegraphs_from_gene_list(dataset, gene_list, output_path, norm_data=False, graphs_per_row=5, rows_per_page=4, fmt='pdf', dpi=100, num_proc=None):
+    '''
+    Save line plots of any number of genes to paginated files, rendering the pages in parallel without displaying them. Use this instead of
+    plot_linegraphs_from_gene_list to review hundreds of genes.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    gene_list : list
+        a list of gene names to plot. Must be in the dataset index
+    output_path : string
+        output path without extension, e.g. '../results/top_genes'
+    norm_data : boolean
+        applies z-score normalization to each gene's expression when set to True. Default: False
+    graphs_per_row : int
+        number of graphs in a row of a page. Default: 5
+    rows_per_page : int
+        number of rows of graphs on a page. Default: 4
+    fmt : string
+        'pdf' for multipage PDF files, or an image format such as 'png' for one file per page. Default: 'pdf'
+    dpi : int
+        resolution of the rendered pages. Default: 100
+    num_proc : int
+        number of worker processes. Default: None, for 1 with fmt='pdf', so that all pages go to one <output_path>.pdf, and 2 otherwise
+
+    Returns
+    -------
+    written : list
+        paths of the files written, empty when gene_list is
+
+    Examples
+    --------
+    >>> export_linegraphs_from_gene_list(data_df, gene_list, '../results/yeast_top_genes')
+
+    Notes
+    -----
+    Each worker renders a contiguous run of pages into its own multipage PDF, so with fmt='pdf' and num_proc > 1 the output is split into
+    <output_path>_pages<first>-<last>.pdf files.
+    '''
+
+    if num_proc is None:
+        num_proc = 1 if fmt == 'pdf' else 2
+
+    if norm_data:
+        dataset = normalize_data(dataset)
+
+    missing = [gene for gene in gene_list if gene not in dataset.index]
+    if missing:
+        raise KeyError(f'{len(missing)} genes are not in the dataset index, e.g. {missing[:5]}')
+
+    values = dataset.loc[gene_list].to_numpy(dtype=float)
+    time_points = pd.to_numeric(dataset.columns).to_numpy(dtype=float)
+    graphs_per_page = graphs_per_row * rows_per_page
+    nr_pages = int(np.ceil(len(gene_list) / graphs_per_page))
+    if nr_pages == 0:
+        print('-- No genes to plot')
+        return []
+
+    # split the pages into one contiguous run per worker
+    page_runs = [run for run in np.array_split(np.arange(nr_pages), min(num_proc, nr_pages)) if len(run)]
+    tasks = list()
+    for run in page_runs:
+        first, last = run[0], run[-1]
+        genes = slice(first * graphs_per_page, (last + 1) * graphs_per_page)
+        if fmt == 'pdf':
+            path = f'{output_path}.pdf' if len(page_runs) == 1 else f'{output_path}_pages{first + 1:03d}-{last + 1:03d}.pdf'
+        else:
+            path = output_path
+        tasks.append((values[genes], list(gene_list[genes]), time_points, first + 1, graphs_per_row, rows_per_page, path, fmt, dpi))
+
+    if len(tasks) == 1:
+        written = _render_linegraph_pages(tasks[0])
+    else:
+        with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            written = [path for paths in executor.map(_render_linegraph_pages, tasks) for path in paths]
+
+    print(f'-- Saved {nr_pages} pages of {len(gene_list)} genes to {len(written)} files')
+
+    return written
+
+
+def export_line_graphs_from_top_periodicity(dataset, periodicity_result, filtering_column, top_gene_number, output_path, norm_data=False, **kwargs):
+    '''
+    Save line plots of the top n genes of a periodicity result to paginated files. See export_linegraphs_from_gene_list for the other arguments.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        time series gene expression dataset, where rows are genes and columns are time points
+    periodicity_result : pandas.DataFrame or string
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can consist of a path to a file or a dataframe.
+    filtering_column: string
+        name of a column in the periodicity result. For example, for JTK specifying 'p-value' will allow for the top n genes ranked based off of the JTK p-value.
+    top_gene_number : integer
+        specifies the number of top genes to include
+    output_path : string
+        output path without extension
+    norm_data : boolean
+        applies z-score normalization to each gene's expression when set to True. Default: False
+
+    Returns
+    -------
+    written : list
+        paths of the files written
+
+    Examples
+    --------
+    # save the top 500 genes based on ranking all genes on their pyJTK's p-value
+    >>> export_line_graphs_from_top_periodicity(data_df, pyjtk_results_df, 'p-value', 500, '../results/yeast_top500')
+    '''
+
+    gene_list = get_genelist_from_top_n_genes(periodicity_result, filtering_column, top_gene_number)
+
+    return export_linegraphs_from_gene_list(dataset, gene_list, output_path, norm_data=norm_data, **kwargs)
+
+
+def plot_periodicity_histogram(periodicity_result, score_column, bins=40, title=None, ax=None, save_path=None):
+    '''
+    Plot the distribution of periodicity scores using a histogram.
+
+    Parameters
+    ----------
+    periodicity_result : pandas.DataFrame or string
+        output from run_periodicity, run_ls, run_pyjtk, or run_pydl. Can be a path to a TSV results file or a dataframe.
+    score_column : string
+        name of the column in the periodicity results to visualize.
+    bins : int, optional
+        number of histogram bins. Default: 40
+    title : string, optional
+        custom plot title. When None, defaults to "Histogram of <score_column>".
+    ax : matplotlib.axes.Axes, optional
+        axes to draw the histogram on. When None, a new figure and axes are created.
+
+    Returns
+    -------
+    matplotlib.axes.Axes
+        axes containing the rendered histogram.
+    '''
+    if isinstance(periodicity_result, pd.DataFrame):
+        results_df = periodicity_result
+    elif isinstance(periodicity_result, str):
+        results_df = load_results(periodicity_result)
+    else:
+        raise TypeError('periodicity_result must be a pandas DataFrame or path/string identifier.')
+
+    if score_column not in results_df.columns:
+        raise ValueError(f'Column "{score_column}" not found in periodicity results.')
+
+    score_series = results_df[score_column].dropna()
+    if score_series.empty:
+        raise ValueError(f'Column "{score_column}" contains only NaN values after filtering.')
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(6, 4))
+
+    sns.histplot(score_series, bins=bins, ax=ax)
+    ax.set_xlabel(score_column)
+    ax.set_ylabel('Count')
+    ax.set_title(title if title is not None else f'Histogram of {score_column}')
+
+    if save_path is not None:
+        plt.savefig(save_path)
+
+    return ax
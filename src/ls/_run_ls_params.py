@@ -23,10 +23,15 @@
 #	3. makes a directory <results_dir>/ls/<run_name>
 #	4. writes parameters to file <results_dir>/ls/<run_name>/<run_name>_params.txt
 #	5. calls _run_ls_params.R with arguments
-#	6. saves log to file <results_dir>/ls/<run_name>/<run_name>_log.txt
+#	6. records the time and resources of the R run with bioclocks.tracing, in the
+#		trace of the run_ls call that started it, or else in a trace of its own
+#		in ../results/traces
 
 
-import os, sys, datetime
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bioclocks.tracing import trace_run, trace_stage
 
 
 #THE ALGORITHM"S ABBR FOR NAMING FILES AND DIRECTORIES
@@ -93,29 +98,14 @@ param_file.write("test_freq:\t" + str(test_freq) + "\n")
 param_file.write("unit:\t" + unit_type + "\n")
 param_file.close()
 
-#MAKE COMMAND & RUN ALGORITHM, TIME IT
+#MAKE COMMAND & RUN ALGORITHM, TRACE IT
 consout_path = resrun_dir + "/" + run_name + "_consout.txt"
 
 cmd1 = "Rscript ../src/ls/_run_ls_params.R %s %s %s %s %s %s %s | tee %s" %(os.path.abspath(data_file), os.path.abspath(resrun_dir), run_name, per_min, per_max, test_freq, unit_type, os.path.abspath(consout_path))
 print(cmd1)
 
-time_beg = datetime.datetime.now()
-
-os.system(cmd1)
-
-time_end = datetime.datetime.now()
-diff = time_end - time_beg
-
-print("finished, with time: ", str(diff))
+with trace_run("_run_ls_params"):
+	with trace_stage("compute"):
+		os.system(cmd1)
 
-#WRITE OUT LOG FILE WITH TIME INFO
-log_path = resrun_dir + "/" + run_name + "_log.txt"
-log_file = open(log_path,"w")
-log_file.write(cmd1 + "\n\n")
-log_file.write("start:\t" + time_beg.strftime("%Y-%m-%d %H:%M:%S") + "\n")
-log_file.write("end:\t" + time_end.strftime("%Y-%m-%d %H:%M:%S") + "\n")
-log_file.write("time:\t" + str(diff) + "\n")
-log_file.write("time (S):\t" + str(diff.total_seconds()) + "\n")
-log_file.write("time (M):\t" + str(diff.total_seconds()/60) + "\n")
-log_file.write("time (H):\t" + str(diff.total_seconds()/(60*60)) + "\n")
-log_file.close()
+print("finished")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the bioclocks package lives in src, and its default paths ('../results', '../tmp') are relative to it
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+os.chdir(SRC_DIR)
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bioclocks import io as dataset_io
+from bioclocks.distributed import mpi_periodicity
+from bioclocks.jtk import jtk_cycle
+
+MPI = pytest.importorskip('mpi4py.MPI')
+
+
+def test_single_rank_matches_in_process_and_is_seeded(tmp_path):
+    dataset_df = dataset_io.load_dataset('Athaliana_LD').iloc[:200]
+    data_path = tmp_path / 'athaliana__1.tsv'
+    dataset_df.to_csv(data_path, sep='\t')
+
+    dl_results = list()
+    for prefix in ('first', 'second'):
+        pyjtk_outfile, pydl_outfile, ls_outdir = mpi_periodicity(str(data_path), 20, 28, 1, 24, prefix, numb_reg=2000, numb_per=500,
+                                                                 seed=7, results_dir=str(tmp_path), comm=MPI.COMM_SELF)
+        dl_results.append(pd.read_csv(tmp_path / pydl_outfile, sep='\t', index_col=0))
+
+    pd.testing.assert_frame_equal(dl_results[0], dl_results[1])
+    jtk_df = pd.read_csv(tmp_path / pyjtk_outfile, sep='\t', index_col=0)
+    expected_df = jtk_cycle(dataset_df, np.arange(20, 29).tolist())
+    np.testing.assert_allclose(jtk_df.loc[expected_df.index, 'p-value'], expected_df['p-value'])
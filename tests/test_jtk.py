@@ -0,0 +1,50 @@
+import itertools
+import math
+from collections import Counter
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from bioclocks.jtk import jtk_null_distribution, _jtk_null_counts, _jtk_upper_tail
+
+
+def brute_force_counts(group_sizes):
+    # the number of distinct orderings of the group labels by rank with each value of J, the number of pairs from different groups
+    # where the observation of the earlier group has the lower rank
+    labels = [group for group, size in enumerate(group_sizes) for _ in range(size)]
+    counts = Counter()
+    for ordering in set(itertools.permutations(labels)):
+        counts[sum(a < b for a, b in itertools.combinations(ordering, 2))] += 1
+    nr_pairs = (len(labels)**2 - sum(size**2 for size in group_sizes)) // 2
+
+    return [counts[j] for j in range(nr_pairs + 1)]
+
+
+@pytest.mark.parametrize('group_sizes', [[1, 1, 1], [1] * 6, [2, 2, 2], [3, 1, 2], [2, 3, 1, 2], [1, 4, 2]])
+def test_null_counts_match_enumeration(group_sizes):
+    expected = brute_force_counts(group_sizes)
+    assert list(_jtk_null_counts(group_sizes)) == expected
+
+    total = sum(expected)
+    tails = [Fraction(sum(expected[j:]), total) for j in range(len(expected))]
+    np.testing.assert_allclose(_jtk_upper_tail(group_sizes), [float(tail) for tail in tails], rtol=1e-14)
+    np.testing.assert_allclose(jtk_null_distribution(group_sizes), [count / total for count in expected], rtol=1e-14)
+
+
+@pytest.mark.parametrize('group_sizes', [[1] * 24, [2] * 24, [3] * 12, [1] * 50])
+def test_extreme_tails_are_exact(group_sizes):
+    # J = M only for the one ordering that sorts every group, and J >= M - 1 for it and the orderings that swap one adjacent pair
+    # of observations from neighbouring groups
+    total = math.factorial(sum(group_sizes))
+    for size in group_sizes:
+        total //= math.factorial(size)
+    nr_swaps = len(group_sizes) - 1
+    tail = _jtk_upper_tail(group_sizes)
+
+    assert tail[0] == 1.0
+    assert tail[-1] == pytest.approx(1 / total, rel=1e-14)
+    assert tail[-2] == pytest.approx((1 + nr_swaps) / total, rel=1e-14)
+    # the small tails stay positive and strictly decrease, so the strongest genes never tie
+    small = tail[tail < 1e-3]
+    assert np.all(small > 0) and np.all(np.diff(small) < 0)
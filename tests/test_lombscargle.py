@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bioclocks import io as dataset_io
+from bioclocks import lombscargle
+from bioclocks.lombscargle import FAST_TOLERANCE, lomb_scargle_periodogram
+
+
+@pytest.mark.parametrize('dataset_name', ['Athaliana_LD', 'Scerevisiae_RNAseq'])
+@pytest.mark.parametrize('test_freq', [4, 20])
+def test_fast_power_within_tolerance(dataset_name, test_freq):
+    dataset_df = dataset_io.load_dataset(dataset_name).dropna()
+    time_points = pd.to_numeric(dataset_df.columns).to_numpy(dtype=float)
+    values = dataset_df.to_numpy(dtype=float)[:2000]
+    values = values[values.var(axis=1) > 0]
+    frequencies = lombscargle.test_frequencies(2.5 * np.median(np.diff(time_points)), time_points[-1] - time_points[0], test_freq, len(time_points))
+
+    exact = lomb_scargle_periodogram(time_points, values, frequencies, method='exact')
+    fast = lomb_scargle_periodogram(time_points, values, frequencies, method='fast')
+
+    assert np.abs(fast - exact).max() < FAST_TOLERANCE
+
+
+def test_unevenly_sampled_power_matches_definition():
+    # the normalized periodogram of one sine, against its direct definition
+    rng = np.random.default_rng(0)
+    t = np.sort(rng.uniform(0, 100, 40))
+    y = np.sin(2 * np.pi * t / 24) + 0.1 * rng.normal(size=len(t))
+    frequencies = lombscargle.test_frequencies(10, 50, 4, len(t))
+
+    expected = list()
+    for frequency in frequencies:
+        omega = 2 * np.pi * frequency
+        tau = np.arctan2(np.sin(2 * omega * t).sum(), np.cos(2 * omega * t).sum()) / (2 * omega)
+        residuals = y - y.mean()
+        cos_t, sin_t = np.cos(omega * (t - tau)), np.sin(omega * (t - tau))
+        expected.append(((residuals @ cos_t)**2 / (cos_t @ cos_t) + (residuals @ sin_t)**2 / (sin_t @ sin_t)) / (2 * y.var(ddof=1)))
+
+    power = lomb_scargle_periodogram(t, y[None], frequencies)[0]
+    np.testing.assert_allclose(power, expected, rtol=1e-10)
+    assert 1 / frequencies[power.argmax()] == pytest.approx(24, rel=0.05)
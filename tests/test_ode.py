@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from bioclocks.ode import simulate_stochastic
+
+
+def repressilator():
+    # three nodes, each repressed by the previous one
+    return {'nodes': ['a', 'b', 'c'], 'gamma': [0.1] * 3, 'beta': [0.5] * 3, 'alpha': [5.0] * 3, 'K': [1.0] * 3, 'n': [3.0] * 3,
+            'type_reg': ['r'] * 3, 'reg_nr': [2, 0, 1]}
+
+
+@pytest.mark.parametrize('method', ['tau', 'ssa'])
+def test_trajectories_do_not_depend_on_their_number(method):
+    time_points = np.linspace(0, 10, 6)
+    few = simulate_stochastic(repressilator(), [1.0, 0.5, 0.2], time_points, n_trajectories=3, method=method, volume=5, seed=3)
+    many = simulate_stochastic(repressilator(), [1.0, 0.5, 0.2], time_points, n_trajectories=8, method=method, volume=5, seed=3)
+
+    assert few.shape == (3, len(time_points), 3)
+    np.testing.assert_array_equal(few, many[:3])
+    assert not np.array_equal(many[0], many[1])
+    assert (many >= 0).all()
@@ -0,0 +1,73 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from bioclocks.plasmodb import get_plasmodb_data
+
+
+class StubPlasmoDB(BaseHTTPRequestHandler):
+    # answers 'flaky' with a 503 the first time, 'broken' always with a 500, and every other gene with its gene_type
+    requests = Counter()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        gene = body['primaryKey'][0]['value']
+        self.requests[gene] += 1
+        if gene == 'broken' or (gene == 'flaky' and self.requests[gene] == 1):
+            self.send_response(500 if gene == 'broken' else 503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        response = json.dumps({'attributes': {attribute: f'{attribute} of {gene}' for attribute in body['attributes']}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def plasmodb_url():
+    StubPlasmoDB.requests = Counter()
+    server = HTTPServer(('127.0.0.1', 0), StubPlasmoDB)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/records'
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_failures_and_cache(plasmodb_url, tmp_path):
+    cache_path = str(tmp_path / 'plasmodb_cache.sqlite')
+    genes = ['PF3D7_0100100', 'flaky', 'broken', 'PF3D7_0100100']
+
+    data = get_plasmodb_data(genes, ['gene_type'], num_threads=2, cache_path=cache_path, timeout=5, retries=1, base_url=plasmodb_url)
+
+    assert data['failed'] == ['broken']
+    assert data['PF3D7_0100100'] == {'gene_type': 'gene_type of PF3D7_0100100'}
+    assert data['flaky'] == {'gene_type': 'gene_type of flaky'}
+    assert 'broken' not in data
+    # one request per distinct gene, plus one retry for each 5xx response
+    assert StubPlasmoDB.requests == Counter({'PF3D7_0100100': 1, 'flaky': 2, 'broken': 2})
+
+    StubPlasmoDB.requests.clear()
+    cached = get_plasmodb_data(['flaky', 'PF3D7_0100100'], ['gene_type'], cache_path=cache_path, base_url=plasmodb_url)
+
+    assert cached == {'failed': [], 'flaky': data['flaky'], 'PF3D7_0100100': data['PF3D7_0100100']}
+    assert sum(StubPlasmoDB.requests.values()) == 0
+
+
+def test_failed_genes_are_not_cached(plasmodb_url, tmp_path):
+    cache_path = str(tmp_path / 'plasmodb_cache.sqlite')
+
+    for _ in range(2):
+        data = get_plasmodb_data(['broken'], ['gene_type'], cache_path=cache_path, timeout=5, retries=0, base_url=plasmodb_url)
+        assert data == {'failed': ['broken']}
+
+    assert StubPlasmoDB.requests['broken'] == 2
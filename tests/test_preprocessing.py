@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bioclocks.preprocessing import interpolate_timepoints, resample_timepoints
+
+
+@pytest.mark.parametrize('method', ['pchip', 'linear', 'spline'])
+def test_resample_matches_observed_points(method):
+    dataset_df = pd.DataFrame([[1.0, 4.0, 2.0, 5.0], [0.0, 1.0, 0.0, 1.0]], columns=['0', '10', '20', '30'])
+
+    resampled_df = resample_timepoints(dataset_df, [0, 5, 10, 15, 20, 25, 30], method=method)
+
+    np.testing.assert_allclose(resampled_df[['0', '10', '20', '30']].to_numpy(), dataset_df.to_numpy())
+    assert not resampled_df.isna().any().any()
+
+
+def test_sparse_genes_keep_their_observed_values():
+    dataset_df = pd.DataFrame([[1.0, np.nan, np.nan], [np.nan, 5.0, np.nan], [1.0, 2.0, 3.0]], index=['once', 'middle', 'full'],
+                              columns=['0', '5', '10'])
+
+    interpolated_df = interpolate_timepoints(dataset_df, ['7', '12'])
+
+    assert interpolated_df.loc['once', '0'] == 1.0
+    assert interpolated_df.loc['once'].drop('0').isna().all()
+    assert interpolated_df.loc['middle', '5'] == 5.0
+    assert interpolated_df.loc['middle'].drop('5').isna().all()
+    assert interpolated_df.loc['full', '7'] == pytest.approx(2.4)
+    assert np.isnan(interpolated_df.loc['full', '12'])